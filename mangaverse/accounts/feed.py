@@ -0,0 +1,146 @@
+"""
+Feed de novedades: capítulos nuevos de creadores seguidos y mangas favoritos.
+
+Estrategia híbrida:
+
+- Fan-out on write: al publicarse un capítulo se insertan filas FeedEntry para
+  cada seguidor del creador y cada usuario que lo tiene en favoritos, en lotes
+  de FEED_FANOUT_BATCH_SIZE y en un hilo en segundo plano (FEED_FANOUT_ASYNC),
+  para no demorar la subida del capítulo.
+- Pull on read: si la audiencia supera FEED_FANOUT_MAX_AUDIENCE se registra un
+  único FeedBroadcast y cada lector lo incorpora al consultar su feed.
+
+El feed se pagina por cursor sobre el id del capítulo (los ids crecen con la
+publicación), de modo que ambas fuentes se mezclan en una sola consulta.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Case, Q, Value, When
+
+from catalogo.models import Chapter
+from .models import Profile, FeedEntry, FeedBroadcast
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'FEED_FANOUT_WORKERS', 2),
+            thread_name_prefix='feed-fanout',
+        )
+    return _executor
+
+
+def schedule_fanout(chapter_id):
+    """Reparte el capítulo en segundo plano, o en el mismo hilo si FEED_FANOUT_ASYNC es False."""
+    if getattr(settings, 'FEED_FANOUT_ASYNC', True):
+        _get_executor().submit(_fanout_task, chapter_id)
+    else:
+        fanout_chapter(chapter_id)
+
+
+def _fanout_task(chapter_id):
+    """Envoltorio para el hilo: registra errores y libera la conexión a la base de datos."""
+    try:
+        fanout_chapter(chapter_id)
+    except Exception:
+        logger.exception("Error repartiendo el capítulo %s a los feeds", chapter_id)
+    finally:
+        close_old_connections()
+
+
+def _followers(owner_id):
+    """Ids de usuario de quienes siguen al creador."""
+    return (
+        Profile.following.through.objects
+        .filter(to_profile__user_id=owner_id)
+        .values_list('from_profile__user_id', flat=True)
+    )
+
+
+def _favoriters(manga_id):
+    """Ids de usuario de quienes tienen el manga en favoritos."""
+    return (
+        Profile.favorites.through.objects
+        .filter(manga_id=manga_id)
+        .values_list('profile__user_id', flat=True)
+    )
+
+
+def fanout_chapter(chapter_id):
+    """
+    Escribe el capítulo en el feed de cada seguidor y cada lector que lo tiene en favoritos.
+
+    Si la audiencia supera FEED_FANOUT_MAX_AUDIENCE solo registra un FeedBroadcast.
+    Es idempotente (ignora filas ya existentes), así que puede reintentarse.
+    Retorna la cantidad de entradas escritas.
+    """
+    chapter = Chapter.objects.select_related('manga').filter(pk=chapter_id).first()
+    if chapter is None:
+        return 0
+    owner_id = chapter.manga.owner_id
+
+    # Cota superior barata (dos COUNT) antes de materializar la audiencia
+    audience_size = _followers(owner_id).count() + _favoriters(chapter.manga_id).count()
+    if audience_size > getattr(settings, 'FEED_FANOUT_MAX_AUDIENCE', 10000):
+        FeedBroadcast.objects.get_or_create(
+            chapter=chapter, defaults={'manga_id': chapter.manga_id, 'owner_id': owner_id}
+        )
+        return 0
+
+    # Si se cumplen ambos motivos, prevalece 'follow'
+    audience = {user_id: 'favorite' for user_id in _favoriters(chapter.manga_id)}
+    audience.update((user_id, 'follow') for user_id in _followers(owner_id))
+    audience.pop(owner_id, None)
+
+    batch_size = getattr(settings, 'FEED_FANOUT_BATCH_SIZE', 1000)
+    entries = [FeedEntry(user_id=user_id, chapter=chapter, reason=reason) for user_id, reason in audience.items()]
+    for start in range(0, len(entries), batch_size):
+        FeedEntry.objects.bulk_create(entries[start:start + batch_size], ignore_conflicts=True)
+    return len(entries)
+
+
+def timeline(user, before=None, limit=20):
+    """
+    Feed de un usuario, del capítulo más nuevo al más antiguo.
+
+    Une sus FeedEntry con los FeedBroadcast de los creadores que sigue y sus
+    favoritos en una sola consulta (UNION) paginada por id de capítulo; luego
+    trae los capítulos con su manga. Retorna (capítulos, siguiente_cursor),
+    cada capítulo con el atributo extra 'feed_reason'.
+    """
+    followed = Profile.following.through.objects.filter(from_profile__user=user).values('to_profile__user_id')
+    favorites = Profile.favorites.through.objects.filter(profile__user=user).values('manga_id')
+
+    pushed = FeedEntry.objects.filter(user=user)
+    pulled = FeedBroadcast.objects.filter(Q(owner_id__in=followed) | Q(manga_id__in=favorites)).exclude(owner=user)
+    if before is not None:
+        pushed = pushed.filter(chapter_id__lt=before)
+        pulled = pulled.filter(chapter_id__lt=before)
+    pulled = pulled.annotate(
+        reason=Case(When(owner_id__in=followed, then=Value('follow')), default=Value('favorite'))
+    )
+
+    rows = list(
+        pushed.order_by().values_list('chapter_id', 'reason')
+        .union(pulled.order_by().values_list('chapter_id', 'reason'))
+        .order_by('-chapter_id')[:limit + 1]
+    )
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    rows = rows[:limit]
+
+    chapters = Chapter.objects.select_related('manga').in_bulk([chapter_id for chapter_id, _ in rows])
+    result = []
+    for chapter_id, reason in rows:
+        chapter = chapters.get(chapter_id)
+        if chapter is not None:
+            chapter.feed_reason = reason
+            result.append(chapter)
+    return result, next_cursor
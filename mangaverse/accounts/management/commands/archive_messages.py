@@ -0,0 +1,106 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.models import Conversation, Message, MessageArchive
+
+
+class Command(BaseCommand):
+    """
+    Mueve los mensajes antiguos de cada conversación a MessageArchive.
+
+    Por conversación:
+    1. Elimina definitivamente los mensajes (y segmentos archivados) que ambos
+       participantes ya borraron de su lado.
+    2. Archiva, en segmentos NDJSON comprimidos, los mensajes con más de
+       --older-than-days días o que quedan fuera de los últimos --keep-latest.
+
+    Cada conversación se procesa en su propia transacción, así que el comando
+    puede interrumpirse y volver a correr sin perder ni duplicar mensajes.
+
+    Ejemplo (cron diario):
+        python manage.py archive_messages --older-than-days 90
+    """
+    help = "Archiva mensajes antiguos del chat y purga los borrados por ambos participantes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=getattr(settings, 'CHAT_ARCHIVE_AFTER_DAYS', 180))
+        parser.add_argument('--keep-latest', type=int, default=getattr(settings, 'CHAT_HOT_MESSAGES', 1000),
+                            help="Mensajes recientes que siempre quedan en la tabla Message.")
+        parser.add_argument('--segment-size', type=int, default=500, help="Mensajes por segmento archivado.")
+        parser.add_argument('--dry-run', action='store_true', help="Solo informa lo que haría.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        totals = {'purged': 0, 'archived': 0, 'segments': 0}
+
+        for conv in Conversation.objects.exclude(last_message_id=0).iterator():
+            with transaction.atomic():
+                stats = self.process(conv, cutoff, options)
+            for key, value in stats.items():
+                totals[key] += value
+
+        prefix = "[dry-run] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{totals['purged']} mensajes eliminados, {totals['archived']} archivados "
+            f"en {totals['segments']} segmentos."
+        ))
+
+    def process(self, conv, cutoff, options):
+        """Purga y archiva una conversación. Retorna los contadores de la operación."""
+        stats = {'purged': 0, 'archived': 0, 'segments': 0}
+        hot = Message.objects.between(conv.user_a_id, conv.user_b_id)
+
+        # 1. Borrado por ambos lados: ya nadie puede verlos
+        purge_upto = min(conv.cleared_a_upto, conv.cleared_b_upto)
+        if purge_upto:
+            if options['dry_run']:
+                stats['purged'] = hot.filter(id__lte=purge_upto).count()
+            else:
+                stats['purged'] = hot.filter(id__lte=purge_upto).delete()[0]
+                conv.archives.filter(last_id__lte=purge_upto).delete()
+            hot = hot.filter(id__gt=purge_upto)
+
+        # 2. Límite de archivado: lo más antiguo por edad o por exceder los últimos N
+        boundary = hot.filter(timestamp__lt=cutoff).aggregate(last=Max('id'))['last'] or 0
+        overflow = hot.order_by('-id').values_list('id', flat=True)[options['keep_latest']:options['keep_latest'] + 1]
+        if overflow:
+            boundary = max(boundary, overflow[0])
+        if not boundary:
+            return stats
+
+        to_archive = hot.filter(id__lte=boundary).order_by('id')
+        if options['dry_run']:
+            stats['archived'] = to_archive.count()
+            stats['segments'] = -(-stats['archived'] // options['segment_size'])
+            return stats
+
+        segment = []
+        for msg in to_archive.iterator(chunk_size=options['segment_size']):
+            segment.append(msg)
+            if len(segment) == options['segment_size']:
+                self.write_segment(conv, segment)
+                stats['segments'] += 1
+                stats['archived'] += len(segment)
+                segment = []
+        if segment:
+            self.write_segment(conv, segment)
+            stats['segments'] += 1
+            stats['archived'] += len(segment)
+        to_archive.delete()
+        return stats
+
+    def write_segment(self, conv, messages):
+        MessageArchive.objects.create(
+            conversation=conv,
+            first_id=messages[0].id,
+            last_id=messages[-1].id,
+            first_timestamp=messages[0].timestamp,
+            last_timestamp=messages[-1].timestamp,
+            count=len(messages),
+            payload=MessageArchive.encode(messages),
+        )
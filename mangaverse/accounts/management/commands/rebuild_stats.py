@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from accounts.stats import rebuild_all
+
+
+class Command(BaseCommand):
+    """
+    Recalcula desde cero MangaStats y CreatorStats.
+
+    Necesario tras cargas masivas (bulk_create, loaddata) que no disparan las
+    señales que mantienen los contadores, o para corregir cualquier desfase.
+    """
+    help = "Recalcula las estadísticas precalculadas de mangas y creadores."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        mangas, creators = rebuild_all(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Estadísticas recalculadas: {mangas} mangas, {creators} creadores."))
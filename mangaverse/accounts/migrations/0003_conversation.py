@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_conversations(apps, schema_editor):
+    """Genera el resumen de cada conversación a partir de los mensajes existentes."""
+    Message = apps.get_model('accounts', 'Message')
+    Conversation = apps.get_model('accounts', 'Conversation')
+    resumen = {}
+    for msg in Message.objects.order_by('timestamp', 'id').iterator():
+        a, b = sorted((msg.sender_id, msg.recipient_id))
+        conv = resumen.setdefault((a, b), Conversation(user_a_id=a, user_b_id=b))
+        conv.last_preview = msg.content[:140]
+        conv.last_sender_id = msg.sender_id
+        conv.last_message_at = msg.timestamp
+        if not msg.is_read and msg.sender_id != msg.recipient_id:
+            if msg.recipient_id == a:
+                conv.unread_a += 1
+            else:
+                conv.unread_b += 1
+    Conversation.objects.bulk_create(resumen.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_profile_following_message'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_preview', models.CharField(blank=True, max_length=140)),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('unread_a', models.PositiveIntegerField(default=0)),
+                ('unread_b', models.PositiveIntegerField(default=0)),
+                ('last_sender', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_a', '-last_message_at'], name='accounts_co_user_a__08eb5f_idx'), models.Index(fields=['user_b', '-last_message_at'], name='accounts_co_user_b__2b2101_idx')],
+                'unique_together': {('user_a', 'user_b')},
+            },
+        ),
+        migrations.RunPython(build_conversations, migrations.RunPython.noop),
+    ]
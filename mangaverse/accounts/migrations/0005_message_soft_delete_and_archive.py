@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def fill_last_message_id(apps, schema_editor):
+    """Guarda en cada conversación el id de su último mensaje (base del borrado por usuario)."""
+    Message = apps.get_model('accounts', 'Message')
+    Conversation = apps.get_model('accounts', 'Conversation')
+    ultimos = {}
+    rows = Message.objects.values('sender_id', 'recipient_id').annotate(last=Max('id')).order_by()
+    for row in rows:
+        pair = tuple(sorted((row['sender_id'], row['recipient_id'])))
+        ultimos[pair] = max(ultimos.get(pair, 0), row['last'])
+    for conv in Conversation.objects.only('id', 'user_a_id', 'user_b_id').iterator():
+        last = ultimos.get((conv.user_a_id, conv.user_b_id))
+        if last:
+            Conversation.objects.filter(pk=conv.pk).update(last_message_id=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_message_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='cleared_a_upto',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='cleared_b_upto',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_id',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='MessageArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_id', models.PositiveBigIntegerField()),
+                ('last_id', models.PositiveBigIntegerField()),
+                ('first_timestamp', models.DateTimeField()),
+                ('last_timestamp', models.DateTimeField()),
+                ('count', models.PositiveIntegerField()),
+                ('payload', models.BinaryField()),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archives', to='accounts.conversation')),
+            ],
+            options={
+                'ordering': ['first_id'],
+                'indexes': [models.Index(fields=['conversation', 'last_id'], name='accounts_me_convers_46c56a_idx')],
+            },
+        ),
+        migrations.RunPython(fill_last_message_id, migrations.RunPython.noop),
+    ]
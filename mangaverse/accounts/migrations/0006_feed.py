@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_message_soft_delete_and_archive'),
+        ('catalogo', '0009_mangatrigram'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedBroadcast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('chapter', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalogo.chapter')),
+                ('manga', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalogo.manga')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'chapter'], name='accounts_fe_owner_i_47c1f6_idx'), models.Index(fields=['manga', 'chapter'], name='accounts_fe_manga_i_5512de_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('follow', 'Creador que sigues'), ('favorite', 'Manga favorito')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('chapter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalogo.chapter')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-chapter'],
+                'unique_together': {('user', 'chapter')},
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:28
+
+import django.db.models.deletion
+from django.conf import settings
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def _grouped(queryset, key):
+    return dict(queryset.order_by().values_list(key).annotate(n=Count('pk')).values_list(key, 'n'))
+
+
+def build_stats(apps, schema_editor):
+    """Calcula MangaStats y CreatorStats para los datos existentes (igual que accounts.stats.rebuild_all)."""
+    Manga = apps.get_model('catalogo', 'Manga')
+    MangaStats = apps.get_model('catalogo', 'MangaStats')
+    Chapter = apps.get_model('catalogo', 'Chapter')
+    Panel = apps.get_model('catalogo', 'Panel')
+    Profile = apps.get_model('accounts', 'Profile')
+    CreatorStats = apps.get_model('accounts', 'CreatorStats')
+    Favorite = Profile.favorites.through
+    Follow = Profile.following.through
+
+    likes = _grouped(Favorite.objects, 'manga_id')
+    chapters = _grouped(Chapter.objects, 'manga_id')
+    pages = _grouped(Panel.objects, 'chapter__manga_id')
+    owners = dict(Manga.objects.values_list('id', 'owner_id'))
+    MangaStats.objects.bulk_create(
+        (MangaStats(manga_id=m, likes=likes.get(m, 0), chapters=chapters.get(m, 0), pages=pages.get(m, 0))
+         for m in owners),
+        batch_size=1000,
+    )
+
+    creators = {}
+    for manga_id, owner_id in owners.items():
+        row = creators.setdefault(owner_id, Counter())
+        row['mangas'] += 1
+        row['likes'] += likes.get(manga_id, 0)
+        row['chapters'] += chapters.get(manga_id, 0)
+        row['pages'] += pages.get(manga_id, 0)
+    for user_id, n in _grouped(Follow.objects, 'to_profile__user_id').items():
+        creators.setdefault(user_id, Counter())['followers'] = n
+    for user_id, n in _grouped(Follow.objects, 'from_profile__user_id').items():
+        creators.setdefault(user_id, Counter())['following'] = n
+    CreatorStats.objects.bulk_create(
+        (CreatorStats(user_id=user_id, **row) for user_id, row in creators.items()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_feed'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('catalogo', '0010_mangastats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreatorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='creator_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('mangas', models.PositiveIntegerField(default=0)),
+                ('likes', models.PositiveIntegerField(default=0)),
+                ('chapters', models.PositiveIntegerField(default=0)),
+                ('pages', models.PositiveIntegerField(default=0)),
+                ('followers', models.PositiveIntegerField(default=0)),
+                ('following', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
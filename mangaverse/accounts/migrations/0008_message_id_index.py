@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_creatorstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender', 'recipient', 'id'], name='accounts_me_sender__6b1987_idx'),
+        ),
+    ]
@@ -1,7 +1,15 @@
-from django.db import models
+import json
+import zlib
+
+from django.db import models, IntegrityError, transaction
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from django.db.models import F, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 class Profile(models.Model):
     """
@@ -54,6 +62,27 @@ def save_user_profile(sender, instance, **kwargs):
     instance.profile.save()
 
 # --- NUEVO: MODELO DE MENSAJERÍA ---
+class MessageQuerySet(models.QuerySet):
+    def between(self, user, other):
+        """Mensajes intercambiados entre dos usuarios (instancias o ids), en ambos sentidos."""
+        return self.filter(
+            (Q(sender=user) & Q(recipient=other)) |
+            (Q(sender=other) & Q(recipient=user))
+        )
+
+    def visible_to(self, user, other):
+        """
+        Mensajes del chat que 'user' no ha borrado de su lado.
+
+        El borrado es por participante: cada uno tiene en Conversation el id
+        hasta el cual vació el chat. Se resuelve en la misma consulta con una
+        subconsulta sobre esa fila.
+        """
+        a, b = Conversation.pair_ids(user, other)
+        cleared = Conversation.objects.filter(user_a_id=a, user_b_id=b).values(Conversation.side(user, a, 'cleared'))[:1]
+        return self.between(user, other).filter(id__gt=Coalesce(Subquery(cleared), 0))
+
+
 class Message(models.Model):
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='sent_messages', on_delete=models.CASCADE)
     recipient = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='received_messages', on_delete=models.CASCADE)
@@ -61,8 +90,437 @@ class Message(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
 
+    objects = MessageQuerySet.as_manager()
+
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # Límite por antigüedad de archive_messages
+            models.Index(fields=['sender', 'recipient', 'timestamp']),
+            # Historial paginado por cursor de una conversación (el cursor es el id)
+            models.Index(fields=['sender', 'recipient', 'id']),
+        ]
+
+    def __str__(self):
+        return f"De {self.sender} para {self.recipient}"
+
+    def as_event(self):
+        """Representación JSON del mensaje usada por el canal en tiempo real y las APIs del chat."""
+        return {
+            'id': self.id,
+            'sender_id': self.sender_id,
+            'content': self.content,
+            'timestamp': timezone.localtime(self.timestamp).strftime("%H:%M"),
+        }
+
+
+# --- RESUMEN DE CONVERSACIONES (BANDEJA DE ENTRADA) ---
+class ConversationQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """
+        Conversaciones en las que participa el usuario, de la más reciente a la más antigua.
+
+        Omite las que el usuario vació y no tienen mensajes nuevos desde entonces.
+        """
+        return self.filter(
+            Q(user_a=user, last_message_id__gt=F('cleared_a_upto')) |
+            Q(user_b=user, last_message_id__gt=F('cleared_b_upto'))
+        ).exclude(user_a=F('user_b')).order_by('-last_message_at')
+
+
+class Conversation(models.Model):
+    """
+    Una fila por par de usuarios con el resumen de su chat.
+
+    Guarda la vista previa del último mensaje, su fecha y los no leídos de cada
+    lado, para que la bandeja de entrada sea una sola consulta indexada en vez
+    de recorrer toda la tabla Message. 'user_a' es siempre el de menor id.
+
+    'cleared_*_upto' es el id del último mensaje que cada participante borró
+    de su lado (borrado lógico por usuario).
+    """
+    user_a = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+    user_b = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+    last_preview = models.CharField(max_length=140, blank=True)
+    last_sender = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.SET_NULL, null=True, blank=True)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    last_message_id = models.PositiveBigIntegerField(default=0)
+    unread_a = models.PositiveIntegerField(default=0)
+    unread_b = models.PositiveIntegerField(default=0)
+    cleared_a_upto = models.PositiveBigIntegerField(default=0)
+    cleared_b_upto = models.PositiveBigIntegerField(default=0)
+
+    objects = ConversationQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ('user_a', 'user_b')
+        indexes = [
+            models.Index(fields=['user_a', '-last_message_at']),
+            models.Index(fields=['user_b', '-last_message_at']),
+        ]
+
+    def __str__(self):
+        return f"Chat {self.user_a_id} ↔ {self.user_b_id}"
+
+    @staticmethod
+    def pair_ids(user1, user2):
+        """Ids del par ordenados (menor, mayor), tal como se guardan en la tabla."""
+        return tuple(sorted((user1.pk, user2.pk)))
+
+    @classmethod
+    def between(cls, user1, user2):
+        """QuerySet con la conversación (si existe) entre dos usuarios."""
+        a, b = cls.pair_ids(user1, user2)
+        return cls.objects.filter(user_a_id=a, user_b_id=b)
+
+    @staticmethod
+    def side(user, user_a_id, prefix):
+        """Nombre del campo ('unread_a', 'cleared_b_upto', ...) que corresponde al usuario."""
+        suffix = '_upto' if prefix == 'cleared' else ''
+        return f"{prefix}_{'a' if user.pk == user_a_id else 'b'}{suffix}"
+
+    def cleared_for(self, user):
+        return getattr(self, self.side(user, self.user_a_id, 'cleared'))
+
+    def other(self, user):
+        """El otro participante (usar con select_related de user_a/user_b)."""
+        return self.user_b if user.pk == self.user_a_id else self.user_a
+
+    def unread_for(self, user):
+        return self.unread_a if user.pk == self.user_a_id else self.unread_b
+
+    @classmethod
+    def record_message(cls, message):
+        """
+        Actualiza el resumen al enviarse un mensaje.
+
+        En el caso habitual es un único UPDATE (con incremento atómico del
+        contador de no leídos del destinatario); la fila se crea solo la
+        primera vez que el par conversa.
+        """
+        a, b = cls.pair_ids(message.sender, message.recipient)
+        values = {
+            'last_preview': message.content[:140],
+            'last_sender_id': message.sender_id,
+            'last_message_at': message.timestamp,
+            'last_message_id': message.id,
+        }
+        unread_field = None
+        if message.sender_id != message.recipient_id:
+            unread_field = 'unread_a' if message.recipient_id == a else 'unread_b'
+
+        updates = dict(values, **({unread_field: F(unread_field) + 1} if unread_field else {}))
+        if cls.objects.filter(user_a_id=a, user_b_id=b).update(**updates):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_a_id=a, user_b_id=b, **dict(values, **({unread_field: 1} if unread_field else {})))
+        except IntegrityError:
+            # Otro proceso creó la fila entre el UPDATE y el INSERT
+            cls.objects.filter(user_a_id=a, user_b_id=b).update(**updates)
+
+    @classmethod
+    def mark_read(cls, reader, other):
+        """
+        Marca como leídos los mensajes de 'other' hacia 'reader'.
+
+        Si el contador ya está en cero no se toca la tabla Message.
+        """
+        a, b = cls.pair_ids(reader, other)
+        unread_field = cls.side(reader, a, 'unread')
+        if cls.objects.filter(user_a_id=a, user_b_id=b, **{f'{unread_field}__gt': 0}).update(**{unread_field: 0}):
+            Message.objects.filter(sender=other, recipient=reader, is_read=False).update(is_read=True)
+            from .unread import invalidate
+            invalidate(reader.pk)
+
+    def archived_before(self, user, before=None, limit=50):
+        """
+        Mensajes archivados (MessageArchive) visibles para 'user', del más nuevo al más antiguo.
+
+        Solo descomprime los segmentos necesarios para llenar 'limit' mensajes
+        con id menor a 'before'. Retorna hasta limit + 1 elementos, para que el
+        llamador sepa si quedan más.
+        """
+        cleared = self.cleared_for(user)
+        segments = self.archives.filter(last_id__gt=cleared).order_by('-last_id')
+        if before is not None:
+            segments = segments.filter(first_id__lt=before)
+        result = []
+        for segment in segments.iterator():
+            for msg in reversed(segment.messages()):
+                if msg.id > cleared and (before is None or msg.id < before):
+                    result.append(msg)
+            if len(result) > limit:
+                break
+        return result[:limit + 1]
+
+    @classmethod
+    def clear_for(cls, user, other):
+        """
+        Vacía el chat solo para 'user' (el otro participante conserva su historial).
+
+        Es un único UPDATE que mueve la marca de borrado hasta el último mensaje;
+        los mensajes borrados por ambos lados los elimina el comando archive_messages.
+        """
+        a, b = cls.pair_ids(user, other)
+        cls.objects.filter(user_a_id=a, user_b_id=b).update(**{
+            cls.side(user, a, 'cleared'): F('last_message_id'),
+            cls.side(user, a, 'unread'): 0,
+        })
+        from .unread import invalidate
+        invalidate(user.pk)
+
+
+class MessageArchive(models.Model):
+    """
+    Segmento de mensajes antiguos de una conversación, fuera de la tabla Message.
+
+    Los mensajes se guardan como NDJSON comprimido con zlib. La tabla Message
+    queda pequeña (y sus consultas rápidas) mientras el historial viejo sigue
+    disponible bajo demanda desde chat_history.
+    """
+    conversation = models.ForeignKey(Conversation, related_name='archives', on_delete=models.CASCADE)
+    first_id = models.PositiveBigIntegerField()
+    last_id = models.PositiveBigIntegerField()
+    first_timestamp = models.DateTimeField()
+    last_timestamp = models.DateTimeField()
+    count = models.PositiveIntegerField()
+    payload = models.BinaryField()
+
+    class Meta:
+        ordering = ['first_id']
+        indexes = [models.Index(fields=['conversation', 'last_id'])]
+
+    def __str__(self):
+        return f"Archivo {self.conversation_id} ({self.first_id}-{self.last_id})"
+
+    @staticmethod
+    def encode(messages):
+        """Comprime una lista de Message en NDJSON + zlib."""
+        lines = (
+            json.dumps({
+                'id': m.id,
+                'sender_id': m.sender_id,
+                'recipient_id': m.recipient_id,
+                'content': m.content,
+                'timestamp': m.timestamp.isoformat(),
+                'is_read': m.is_read,
+            }, ensure_ascii=False, separators=(',', ':'))
+            for m in messages
+        )
+        return zlib.compress('\n'.join(lines).encode('utf-8'), 9)
+
+    def messages(self):
+        """Mensajes del segmento como instancias de Message (sin guardar), en orden cronológico."""
+        result = []
+        for line in zlib.decompress(bytes(self.payload)).decode('utf-8').splitlines():
+            data = json.loads(line)
+            data['timestamp'] = parse_datetime(data['timestamp'])
+            result.append(Message(**data))
+        return result
+
+
+@receiver(post_save, sender=Message)
+def update_conversation(sender, instance, created, **kwargs):
+    """Signal que actualiza el resumen de la conversación con cada mensaje nuevo."""
+    if created:
+        Conversation.record_message(instance)
+
+
+@receiver(post_save, sender=Message)
+def count_unread(sender, instance, created, **kwargs):
+    """Signal que suma el mensaje al contador de no leídos del destinatario (tras el commit)."""
+    if created and instance.sender_id != instance.recipient_id:
+        from .unread import increment
+        recipient_id = instance.recipient_id
+        transaction.on_commit(lambda: increment(recipient_id))
+
+
+@receiver(post_save, sender=Message)
+def push_message(sender, instance, created, **kwargs):
+    """Signal que entrega el mensaje nuevo a las conexiones en tiempo real (tras el commit)."""
+    if created:
+        from .realtime import get_broker
+        transaction.on_commit(lambda: get_broker().publish(instance))
+
+
+# --- FEED DE NOVEDADES (CAPÍTULOS NUEVOS) ---
+class FeedEntry(models.Model):
+    """
+    Entrada del feed de un usuario: un capítulo nuevo de un creador que sigue
+    o de un manga en sus favoritos.
+
+    Se escribe al publicar el capítulo (fan-out on write, ver accounts/feed.py),
+    así leer el feed es una consulta indexada por (user, chapter) en vez de
+    cruzar seguidos × mangas × capítulos en cada visita.
+    """
+    REASONS = [
+        ('follow', 'Creador que sigues'),
+        ('favorite', 'Manga favorito'),
+    ]
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='feed_entries', on_delete=models.CASCADE)
+    chapter = models.ForeignKey('catalogo.Chapter', related_name='+', on_delete=models.CASCADE)
+    reason = models.CharField(max_length=10, choices=REASONS)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # El índice único (user, chapter) también sirve la paginación por cursor
+        unique_together = ('user', 'chapter')
+        ordering = ['-chapter']
 
     def __str__(self):
-        return f"De {self.sender} para {self.recipient}"
\ No newline at end of file
+        return f"{self.user} ← {self.chapter_id}"
+
+
+class FeedBroadcast(models.Model):
+    """
+    Capítulo cuya audiencia superó FEED_FANOUT_MAX_AUDIENCE.
+
+    No se copia a cada lector: el feed lo incorpora al leer (pull on read),
+    filtrando por los creadores seguidos y los favoritos del usuario.
+    """
+    chapter = models.OneToOneField('catalogo.Chapter', related_name='+', on_delete=models.CASCADE)
+    manga = models.ForeignKey('catalogo.Manga', related_name='+', on_delete=models.CASCADE)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'chapter']),
+            models.Index(fields=['manga', 'chapter']),
+        ]
+
+
+@receiver(post_save, sender='catalogo.Chapter')
+def fanout_new_chapter(sender, instance, created, **kwargs):
+    """Signal que reparte un capítulo nuevo a los feeds de su audiencia (tras el commit)."""
+    if created:
+        from .feed import schedule_fanout
+        chapter_id = instance.pk
+        transaction.on_commit(lambda: schedule_fanout(chapter_id))
+
+
+# --- ESTADÍSTICAS DE CREADOR (DASHBOARD) ---
+class CreatorStats(models.Model):
+    """
+    Totales precalculados de un usuario: obras, likes, capítulos, páginas y seguidores.
+
+    Se actualizan de forma incremental con señales (ver accounts/stats.py); el
+    perfil los lee como una sola fila en vez de contar tablas relacionadas.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, primary_key=True, related_name='creator_stats', on_delete=models.CASCADE)
+    mangas = models.PositiveIntegerField(default=0)
+    likes = models.PositiveIntegerField(default=0)
+    chapters = models.PositiveIntegerField(default=0)
+    pages = models.PositiveIntegerField(default=0)
+    followers = models.PositiveIntegerField(default=0)
+    following = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Estadísticas de {self.user_id}"
+
+
+@receiver(post_save, sender='catalogo.Manga')
+def stats_manga_saved(sender, instance, created, **kwargs):
+    """Signal que suma una obra al creador al publicar un manga."""
+    if created:
+        from . import stats
+        stats.manga_created(instance)
+
+
+@receiver(pre_delete, sender='catalogo.Manga')
+def stats_manga_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Signal que descuenta la obra con todos sus totales (likes, capítulos y páginas).
+
+    Los capítulos y páginas borrados en cascada no descuentan nada por su
+    cuenta. Si se borra el dueño, su fila de estadísticas se va con él.
+    """
+    if isinstance(origin, get_user_model()) and origin.pk == instance.owner_id:
+        return
+    from . import stats
+    stats.manga_deleted(instance)
+
+
+@receiver(post_save, sender='catalogo.Chapter')
+def stats_chapter_saved(sender, instance, created, **kwargs):
+    if created:
+        from . import stats
+        stats.chapters_changed(instance.manga_id, +1)
+
+
+@receiver(pre_delete, sender='catalogo.Chapter')
+def stats_chapter_deleted(sender, instance, origin=None, **kwargs):
+    """Signal que descuenta el capítulo y sus páginas (antes de borrarlas, para contarlas)."""
+    from catalogo.models import deleted_in_cascade
+    if deleted_in_cascade(instance, 'manga', origin):
+        return
+    from . import stats
+    stats.chapter_deleted(instance)
+
+
+@receiver(post_save, sender='catalogo.Panel')
+def stats_panel_saved(sender, instance, created, **kwargs):
+    if created:
+        from . import stats
+        stats.pages_changed(instance.chapter_id, +1)
+
+
+@receiver(post_delete, sender='catalogo.Panel')
+def stats_panel_deleted(sender, instance, origin=None, **kwargs):
+    from catalogo.models import deleted_in_cascade
+    if deleted_in_cascade(instance, 'chapter', origin):
+        return
+    from . import stats
+    stats.pages_changed(instance.chapter_id, -1)
+
+
+@receiver(pre_delete, sender=Profile)
+def stats_profile_deleted(sender, instance, **kwargs):
+    """Signal que descuenta los likes y seguimientos del perfil (su borrado en cascada no emite m2m_changed)."""
+    from . import stats
+    stats.profile_deleted(instance)
+
+
+@receiver(m2m_changed, sender=Profile.favorites.through)
+def stats_favorites_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Signal que mantiene los likes de mangas y creadores.
+
+    Las altas se cuentan en 'post_add' (Django ya excluye las existentes); las
+    bajas en 'pre_remove'/'pre_clear', cuando aún se puede ver cuáles existen.
+    """
+    if action in ('post_add', 'pre_remove', 'pre_clear'):
+        from . import stats
+        stats.favorites_changed(instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=Profile.following.through)
+def stats_following_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Signal que mantiene los contadores de seguidores y seguidos (mismo criterio que los likes)."""
+    if action in ('post_add', 'pre_remove', 'pre_clear'):
+        from . import stats
+        stats.following_changed(instance, action, reverse, pk_set)
+
+
+# --- INVALIDACIÓN DE CACHÉ (ver catalogo/cache.py) ---
+
+@receiver(m2m_changed, sender=Profile.favorites.through)
+def invalidate_favorites_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    """Un like cambia al lector, al manga y el ranking de populares."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    from catalogo.cache import bump, manga_tag, user_tag, POPULARITY
+    if reverse:
+        # instance es el Manga; pk_set, los perfiles (None al vaciar)
+        users = Profile.objects.filter(pk__in=pk_set).values_list('user_id', flat=True) if pk_set else []
+        bump(manga_tag(instance.pk), POPULARITY, *(user_tag(uid) for uid in users))
+    else:
+        bump(user_tag(instance.user_id), POPULARITY, *(manga_tag(pk) for pk in pk_set or ()))
+
+
+@receiver(post_save, sender=Message)
+def invalidate_message_cache(sender, instance, created, **kwargs):
+    if created:
+        from catalogo.cache import bump, user_tag
+        bump(user_tag(instance.sender_id), user_tag(instance.recipient_id))
@@ -0,0 +1,156 @@
+"""
+Canal de envío en tiempo real (push) de mensajes del chat.
+
+Los clientes abren una conexión Server-Sent Events (ver views.chat_stream) y
+reciben solo los mensajes nuevos de su conversación, en vez de recargar el
+historial completo. El reparto (fan-out) lo hace un "broker" configurable con
+CHAT_PUSH_BACKEND:
+
+- 'memory': colas asyncio dentro del proceso. Sin dependencias externas, ideal
+  para un único proceso ASGI (uvicorn/daphne).
+- 'db': cada conexión consulta la tabla Message por ids nuevos cada
+  CHAT_POLL_INTERVAL segundos. Funciona con varios workers sin broker externo.
+
+Sin configurar (None) se usa 'memory' solo si el proceso se sirve con
+mangaverse/asgi.py, y 'db' en cualquier otro caso. Bajo WSGI cada conexión
+ocuparía un worker síncrono durante CHAT_STREAM_TIMEOUT segundos: ahí la vista
+responde lo pendiente y cierra, y el navegador reconecta (sondeo).
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Message
+
+# Cada cuánto (segundos) se envía un latido para mantener viva la conexión
+HEARTBEAT_INTERVAL = 15
+
+
+def pair_key(user1_id, user2_id):
+    """Clave del canal de una conversación (independiente del orden de los usuarios)."""
+    return tuple(sorted((user1_id, user2_id)))
+
+
+async def fetch_after(pair, last_id, limit=200):
+    """Mensajes de la conversación con id mayor a 'last_id' (para ponerse al día)."""
+    a, b = pair
+    qs = Message.objects.filter(
+        Q(sender_id=a, recipient_id=b) | Q(sender_id=b, recipient_id=a),
+        id__gt=last_id,
+    ).order_by('id')[:limit]
+    return [msg.as_event() async for msg in qs]
+
+
+class InMemoryBroker:
+    """
+    Reparte los mensajes a las conexiones abiertas del mismo proceso.
+
+    'publish' puede llamarse desde cualquier hilo (las vistas síncronas corren
+    fuera del event loop); la entrega a cada cola se agenda con
+    call_soon_threadsafe en el loop de la conexión.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, message):
+        event = message.as_event()
+        with self._lock:
+            targets = list(self._subscribers.get(pair_key(message.sender_id, message.recipient_id), ()))
+        for loop, queue in targets:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    async def listen(self, pair, last_id, timeout):
+        """
+        Genera los eventos de la conversación durante 'timeout' segundos.
+
+        Se suscribe antes de consultar lo pendiente en la base de datos, así no
+        se pierde un mensaje creado entre ambas operaciones. Genera None como
+        latido cuando no hay actividad.
+        """
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers[pair].add(entry)
+        try:
+            for event in await fetch_after(pair, last_id):
+                last_id = event['id']
+                yield event
+
+            deadline = time.monotonic() + timeout
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    event = await asyncio.wait_for(entry[1].get(), min(remaining, HEARTBEAT_INTERVAL))
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event['id'] > last_id:
+                    last_id = event['id']
+                    yield event
+        finally:
+            with self._lock:
+                self._subscribers[pair].discard(entry)
+                if not self._subscribers[pair]:
+                    del self._subscribers[pair]
+
+
+class DatabasePollingBroker:
+    """
+    Usa la propia tabla Message como canal: cada conexión pregunta por ids nuevos.
+
+    Es una consulta indexada y liviana (solo filas nuevas), pero con latencia de
+    hasta CHAT_POLL_INTERVAL segundos. Útil con varios workers de gunicorn.
+    """
+    def __init__(self, interval=None):
+        self.interval = interval or getattr(settings, 'CHAT_POLL_INTERVAL', 1.0)
+
+    def publish(self, message):
+        """No hace nada: los suscriptores leen directamente de la base de datos."""
+
+    async def listen(self, pair, last_id, timeout):
+        """Con timeout=0 solo retorna lo pendiente (una consulta)."""
+        deadline = time.monotonic() + timeout
+        idle = 0.0
+        while True:
+            events = await fetch_after(pair, last_id)
+            for event in events:
+                last_id = event['id']
+                yield event
+            if time.monotonic() >= deadline:
+                return
+            idle = 0.0 if events else idle + self.interval
+            if idle >= HEARTBEAT_INTERVAL:
+                idle = 0.0
+                yield None
+            await asyncio.sleep(self.interval)
+
+
+BACKENDS = {
+    'memory': InMemoryBroker,
+    'db': DatabasePollingBroker,
+}
+
+_broker = None
+
+
+def serving_asgi():
+    """True si el proceso se levantó con mangaverse/asgi.py (uvicorn, daphne...)."""
+    return os.environ.get('MANGAVERSE_ASGI') == '1'
+
+
+def get_broker():
+    """
+    Retorna el broker de CHAT_PUSH_BACKEND (instancia única por proceso).
+
+    Sin configurar, 'memory' bajo ASGI y 'db' en otro caso: el reparto en
+    memoria no llega a los demás procesos.
+    """
+    global _broker
+    if _broker is None:
+        backend = getattr(settings, 'CHAT_PUSH_BACKEND', None) or ('memory' if serving_asgi() else 'db')
+        _broker = BACKENDS[backend]()
+    return _broker
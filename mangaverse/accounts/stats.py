@@ -0,0 +1,227 @@
+"""
+Estadísticas precalculadas de mangas (MangaStats) y creadores (CreatorStats).
+
+Las señales de accounts/models.py llaman a estas funciones con cada cambio
+(favoritos, seguidores, capítulos y páginas). Cada cambio es un UPDATE con
+F() sobre una sola fila, así que el dashboard del perfil no vuelve a contar
+tablas relacionadas. Si una fila no existe (datos cargados con bulk_create,
+o anteriores a esta tabla) se calcula desde cero la primera vez que se
+necesita; rebuild_all() (comando rebuild_stats) recalcula todo.
+"""
+from collections import Counter
+
+from django.db import models, IntegrityError, transaction
+from django.db.models import Count, F, Subquery
+from django.db.models.functions import Greatest
+
+from catalogo.models import Manga, MangaStats, Chapter, Panel
+from .models import Profile, CreatorStats
+
+Favorite = Profile.favorites.through
+Follow = Profile.following.through
+
+
+def compute_manga(manga_id):
+    """Calcula desde cero las estadísticas de un manga (sin guardar)."""
+    return MangaStats(
+        manga_id=manga_id,
+        likes=Favorite.objects.filter(manga_id=manga_id).count(),
+        chapters=Chapter.objects.filter(manga_id=manga_id).count(),
+        pages=Panel.objects.filter(chapter__manga_id=manga_id).count(),
+    )
+
+
+def compute_creator(user_id):
+    """Calcula desde cero las estadísticas de un creador (sin guardar)."""
+    return CreatorStats(
+        user_id=user_id,
+        mangas=Manga.objects.filter(owner_id=user_id).count(),
+        likes=Favorite.objects.filter(manga__owner_id=user_id).count(),
+        chapters=Chapter.objects.filter(manga__owner_id=user_id).count(),
+        pages=Panel.objects.filter(chapter__manga__owner_id=user_id).count(),
+        followers=Follow.objects.filter(to_profile__user_id=user_id).count(),
+        following=Follow.objects.filter(from_profile__user_id=user_id).count(),
+    )
+
+
+def get_creator_stats(user):
+    """Fila de estadísticas del usuario (la crea si aún no existe)."""
+    try:
+        return CreatorStats.objects.get(user=user)
+    except CreatorStats.DoesNotExist:
+        stats = compute_creator(user.pk)
+        try:
+            with transaction.atomic():
+                stats.save(force_insert=True)
+        except IntegrityError:
+            stats = CreatorStats.objects.get(user=user)
+        return stats
+
+
+def _bump(model, key, compute, **deltas):
+    """
+    Suma 'deltas' a una fila de 'model' con un único UPDATE.
+
+    'key' es la pk, o un queryset values_list(flat=True) que la resuelve dentro
+    del mismo UPDATE como subconsulta. Si la fila no existe y el cambio es un
+    alta, se crea calculándola desde cero (el cálculo ya incluye el cambio).
+    """
+    updates = {
+        field: F(field) + delta if delta > 0 else Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items() if delta
+    }
+    if not updates:
+        return
+    is_queryset = isinstance(key, models.QuerySet)
+    if model.objects.filter(pk=Subquery(key) if is_queryset else key).update(**updates):
+        return
+    if all(delta <= 0 for delta in deltas.values()):
+        return
+    pk = key.first() if is_queryset else key
+    if pk is None:
+        return
+    try:
+        with transaction.atomic():
+            compute(pk).save(force_insert=True)
+    except IntegrityError:
+        # Otro proceso creó la fila entretanto
+        model.objects.filter(pk=pk).update(**updates)
+
+
+def bump_manga(manga_id, **deltas):
+    _bump(MangaStats, manga_id, compute_manga, **deltas)
+
+
+def bump_creator(user_key, **deltas):
+    _bump(CreatorStats, user_key, compute_creator, **deltas)
+
+
+def manga_created(manga):
+    MangaStats.objects.get_or_create(manga=manga)
+    bump_creator(manga.owner_id, mangas=1)
+
+
+def manga_deleted(manga):
+    """
+    Descuenta del creador la obra y todos sus totales con un solo UPDATE.
+
+    Los totales salen de MangaStats: en cascada, ni los capítulos y páginas ni
+    los favoritos (que no emiten señales) descuentan nada por su cuenta.
+    """
+    totals = MangaStats.objects.filter(manga_id=manga.pk).first() or compute_manga(manga.pk)
+    bump_creator(manga.owner_id, mangas=-1, likes=-totals.likes, chapters=-totals.chapters, pages=-totals.pages)
+
+
+def chapters_changed(manga_id, delta, pages=0):
+    bump_manga(manga_id, chapters=delta, pages=pages)
+    bump_creator(Manga.objects.filter(pk=manga_id).values_list('owner_id', flat=True), chapters=delta, pages=pages)
+
+
+def chapter_deleted(chapter):
+    """Descuenta el capítulo y sus páginas (las páginas borradas en cascada no descuentan nada)."""
+    chapters_changed(chapter.manga_id, -1, pages=-Panel.objects.filter(chapter_id=chapter.pk).count())
+
+
+def pages_changed(chapter_id, delta):
+    chapter = Chapter.objects.filter(pk=chapter_id)
+    bump_manga(chapter.values_list('manga_id', flat=True), pages=delta)
+    bump_creator(chapter.values_list('manga__owner_id', flat=True), pages=delta)
+
+
+def profile_deleted(profile):
+    """Descuenta los likes del perfil y sus seguimientos en ambos sentidos."""
+    favorites_changed(profile, 'pre_clear', False, None)
+    following_changed(profile, 'pre_clear', False, None)
+    following_changed(profile, 'pre_clear', True, None)
+
+
+def _relation_rows(through, instance, action, reverse, pk_set, source, target):
+    """
+    Pares (source_id, target_id) afectados por un cambio m2m.
+
+    En 'post_add' pk_set ya trae solo las filas nuevas. En 'pre_remove' y
+    'pre_clear' se consulta cuáles existen realmente, para no descontar
+    relaciones que no estaban.
+    """
+    if action == 'post_add':
+        ids = pk_set or ()
+        return [(pk, instance.pk) if reverse else (instance.pk, pk) for pk in ids]
+    rows = through.objects.filter(**{f'{target if reverse else source}_id': instance.pk})
+    if action == 'pre_remove':
+        rows = rows.filter(**{f'{source if reverse else target}_id__in': pk_set})
+    return list(rows.values_list(f'{source}_id', f'{target}_id'))
+
+
+def favorites_changed(instance, action, reverse, pk_set):
+    sign = 1 if action == 'post_add' else -1
+    pairs = _relation_rows(Favorite, instance, action, reverse, pk_set, 'profile', 'manga')
+    per_manga = Counter(manga_id for _, manga_id in pairs)
+    if not per_manga:
+        return
+    owners = dict(Manga.objects.filter(id__in=per_manga).values_list('id', 'owner_id'))
+    per_owner = Counter()
+    for manga_id, count in per_manga.items():
+        bump_manga(manga_id, likes=sign * count)
+        if manga_id in owners:
+            per_owner[owners[manga_id]] += count
+    for owner_id, count in per_owner.items():
+        bump_creator(owner_id, likes=sign * count)
+
+
+def following_changed(instance, action, reverse, pk_set):
+    sign = 1 if action == 'post_add' else -1
+    pairs = _relation_rows(Follow, instance, action, reverse, pk_set, 'from_profile', 'to_profile')
+    if not pairs:
+        return
+    users = dict(Profile.objects.filter(id__in={pk for pair in pairs for pk in pair}).values_list('id', 'user_id'))
+    following = Counter(users[from_id] for from_id, _ in pairs if from_id in users)
+    followers = Counter(users[to_id] for _, to_id in pairs if to_id in users)
+    for user_id, count in following.items():
+        bump_creator(user_id, following=sign * count)
+    for user_id, count in followers.items():
+        bump_creator(user_id, followers=sign * count)
+
+
+def _grouped(queryset, key):
+    """Diccionario {key: conteo} con una consulta agrupada."""
+    return dict(queryset.order_by().values_list(key).annotate(n=Count('pk')).values_list(key, 'n'))
+
+
+@transaction.atomic
+def rebuild_all(batch_size=1000):
+    """
+    Recalcula todas las estadísticas con consultas agrupadas (una por contador).
+
+    Necesario tras cargas masivas (bulk_create, loaddata) que no disparan señales.
+    Retorna (mangas, creadores) recalculados.
+    """
+    likes = _grouped(Favorite.objects, 'manga_id')
+    chapters = _grouped(Chapter.objects, 'manga_id')
+    pages = _grouped(Panel.objects, 'chapter__manga_id')
+    owners = dict(Manga.objects.values_list('id', 'owner_id'))
+
+    MangaStats.objects.all().delete()
+    MangaStats.objects.bulk_create(
+        (MangaStats(manga_id=manga_id, likes=likes.get(manga_id, 0), chapters=chapters.get(manga_id, 0),
+                    pages=pages.get(manga_id, 0)) for manga_id in owners),
+        batch_size=batch_size,
+    )
+
+    creators = {}
+    for manga_id, owner_id in owners.items():
+        row = creators.setdefault(owner_id, Counter())
+        row['mangas'] += 1
+        row['likes'] += likes.get(manga_id, 0)
+        row['chapters'] += chapters.get(manga_id, 0)
+        row['pages'] += pages.get(manga_id, 0)
+    for user_id, n in _grouped(Follow.objects, 'to_profile__user_id').items():
+        creators.setdefault(user_id, Counter())['followers'] = n
+    for user_id, n in _grouped(Follow.objects, 'from_profile__user_id').items():
+        creators.setdefault(user_id, Counter())['following'] = n
+
+    CreatorStats.objects.all().delete()
+    CreatorStats.objects.bulk_create(
+        (CreatorStats(user_id=user_id, **row) for user_id, row in creators.items()),
+        batch_size=batch_size,
+    )
+    return len(owners), len(creators)
@@ -1,3 +1,143 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 
-# Create your tests here.
+from catalogo.models import Manga, MangaStats, Chapter, Panel
+from catalogo.testing import PerformanceTestCase
+from . import stats
+from .models import CreatorStats, Message
+
+
+class AccountsPerformanceTests(PerformanceTestCase):
+    """
+    Presupuestos de consultas y tiempo de las vistas de cuentas y mensajes.
+
+    Comparan contra catalogo/perf_baseline.json (ver catalogo/testing.py).
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.reader)
+
+    def test_inbox(self):
+        response = self.assertPerformance('accounts:inbox', reverse('accounts:inbox'))
+        self.assertContains(response, 'creador')
+
+    def test_chat_detail(self):
+        self.assertPerformance('accounts:chat_detail', reverse('accounts:chat_detail', args=['creador']))
+
+    def test_chat_history(self):
+        self.assertPerformance('accounts:chat_history', reverse('accounts:chat_history', args=['creador']))
+
+    def test_unread_count(self):
+        self.assertPerformance('accounts:unread_count', reverse('accounts:unread_count'))
+
+    def test_user_fragment(self):
+        favorite = self.reader.profile.favorites.order_by('id').first()
+        url = reverse('accounts:user_fragment') + f'?manga={self.manga.slug}&manga={favorite.slug}'
+        data = self.assertPerformance('accounts:user_fragment', url).json()
+        self.assertEqual(data['username'], 'lector')
+        self.assertEqual(data['favorites'], [favorite.slug])
+        self.assertEqual(data['editable'], [])
+        self.assertTrue(data['unread'])
+
+    def test_profile(self):
+        self.assertPerformance('accounts:profile', reverse('accounts:profile'))
+
+    def test_public_profile(self):
+        self.assertPerformance('accounts:public_profile', reverse('accounts:public_profile', args=['creador']))
+
+    def test_feed(self):
+        self.assertPerformance('accounts:feed', reverse('accounts:feed'))
+
+    def test_add_favorite(self):
+        url = reverse('accounts:add_favorite', args=[self.manga.slug])
+        response = self.assertPerformance('accounts:add_favorite', url, method='post', repeat=False)
+        self.assertTrue(response.json()['liked'])
+        self.assertTrue(self.reader.profile.favorites.filter(pk=self.manga.pk).exists())
+
+
+class CreatorStatsTests(TestCase):
+    """Los contadores precalculados (accounts/stats.py) siguen a los borrados en cascada."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.creator = User.objects.create_user('creador', password='clave-segura-123')
+        cls.fans = [User.objects.create_user(f'fan{n}', password='clave-segura-123') for n in range(3)]
+        cls.manga = Manga.objects.create(owner=cls.creator, titulo='Vagabond', autor='Takehiko Inoue', genero='seinen')
+        other = Manga.objects.create(owner=cls.creator, titulo='Slam Dunk', autor='Takehiko Inoue', genero='shonen')
+        for manga in (cls.manga, other):
+            for n in range(1, 6):
+                chapter = Chapter.objects.create(manga=manga, title=f'Capítulo {n}', chapter_number=n)
+                Panel.objects.bulk_create(
+                    Panel(chapter=chapter, image=f'manga_panels/{n}/{p}.jpg', position=p * 1024) for p in range(1, 21)
+                )
+        stats.rebuild_all()
+        for fan in cls.fans:
+            fan.profile.favorites.add(cls.manga, other)
+            fan.profile.following.add(cls.creator.profile)
+
+    def assertStatsConsistent(self, user):
+        row = CreatorStats.objects.get(user=user)
+        expected = stats.compute_creator(user.pk)
+        for field in ('mangas', 'likes', 'chapters', 'pages', 'followers', 'following'):
+            self.assertEqual(getattr(row, field), getattr(expected, field), field)
+
+    def test_borrar_manga_no_actualiza_por_fila(self):
+        with CaptureQueriesContext(connection) as ctx:
+            Manga.objects.get(pk=self.manga.pk).delete()
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1, updates)
+        self.assertStatsConsistent(self.creator)
+
+    def test_borrar_capitulo_descuenta_sus_paginas(self):
+        Chapter.objects.get(manga=self.manga, chapter_number=1).delete()
+        self.assertStatsConsistent(self.creator)
+        self.assertEqual(MangaStats.objects.get(pk=self.manga.pk).pages, 80)
+
+    def test_borrar_usuario_descuenta_likes_y_seguidores(self):
+        self.fans[0].delete()
+        self.assertStatsConsistent(self.creator)
+        self.assertEqual(CreatorStats.objects.get(user=self.creator).followers, 2)
+
+
+class ChatHistoryTests(TestCase):
+    """El historial se pagina por id aunque los timestamps no sigan ese orden."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.reader = User.objects.create_user('lector', password='clave-segura-123')
+        cls.creator = User.objects.create_user('creador', password='clave-segura-123')
+        for n in range(10):
+            sender, recipient = (cls.creator, cls.reader) if n % 2 else (cls.reader, cls.creator)
+            Message.objects.create(sender=sender, recipient=recipient, content=f'Mensaje {n}')
+        # Fechas al revés del orden de envío, como en los datos sintéticos
+        now = timezone.now()
+        for n, pk in enumerate(Message.objects.order_by('id').values_list('id', flat=True)):
+            Message.objects.filter(pk=pk).update(timestamp=now - timezone.timedelta(hours=n))
+
+    def test_paginas_hacia_atras_sin_saltos(self):
+        self.client.force_login(self.reader)
+        url = reverse('accounts:chat_history', args=['creador'])
+        seen, before = [], None
+        while True:
+            data = self.client.get(url, {'limit': 3, 'before': before or ''}).json()
+            seen = [m['id'] for m in data['messages']] + seen
+            if not data['has_more']:
+                break
+            before = data['messages'][0]['id']
+        self.assertEqual(seen, list(Message.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_paginas_hacia_adelante_sin_saltos(self):
+        self.client.force_login(self.reader)
+        url = reverse('accounts:chat_history', args=['creador'])
+        first = Message.objects.order_by('id').first().id
+        data = self.client.get(url, {'limit': 3, 'after': first}).json()
+        self.assertEqual([m['id'] for m in data['messages']],
+                         list(Message.objects.filter(id__gt=first).order_by('id').values_list('id', flat=True)[:3]))
+        self.assertTrue(data['has_more'])
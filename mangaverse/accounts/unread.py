@@ -0,0 +1,60 @@
+"""
+Contador de mensajes no leídos por usuario, guardado en caché.
+
+El globo de la barra de navegación aparece en todas las páginas; en vez de
+contar filas de Message en cada visita se lee una clave de caché por usuario:
+
+- Se incrementa al crear un mensaje (señal en accounts/models.py).
+- Se invalida al abrir o vaciar una conversación.
+- Si la clave no existe, se reconstruye con la suma de los contadores de
+  Conversation (una consulta agregada sobre el índice del usuario).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, IntegerField, Q, Sum, When
+
+from .models import Conversation
+
+# Segundos que vive el contador en caché antes de reconciliarse con la base de datos
+UNREAD_CACHE_TIMEOUT = getattr(settings, 'UNREAD_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def _key(user_id):
+    return f'accounts:unread:{user_id}'
+
+
+def count_from_db(user_id):
+    """Total de no leídos del usuario según la tabla Conversation."""
+    total = Conversation.objects.filter(Q(user_a_id=user_id) | Q(user_b_id=user_id)).aggregate(
+        total=Sum(Case(
+            When(user_a_id=user_id, then='unread_a'),
+            default='unread_b',
+            output_field=IntegerField(),
+        ))
+    )['total']
+    return total or 0
+
+
+def get_unread_count(user):
+    """Mensajes no leídos del usuario (desde la caché; reconcilia si falta la clave)."""
+    if not user.is_authenticated:
+        return 0
+    count = cache.get(_key(user.pk))
+    if count is None:
+        count = count_from_db(user.pk)
+        # add() no pisa un valor que otro proceso haya escrito entretanto
+        cache.add(_key(user.pk), count, UNREAD_CACHE_TIMEOUT)
+    return count
+
+
+def increment(user_id):
+    """Suma un mensaje no leído. Si la clave no está en caché no hace nada (se reconcilia al leer)."""
+    try:
+        cache.incr(_key(user_id))
+    except ValueError:
+        pass
+
+
+def invalidate(user_id):
+    """Descarta el contador (tras marcar mensajes como leídos o vaciar un chat)."""
+    cache.delete(_key(user_id))
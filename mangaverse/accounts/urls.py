@@ -17,6 +17,8 @@ urlpatterns = [
     path("logout/", views.logout_confirm, name="logout"),
     path("register/", views.register, name="register"),
     path("profile/", views.profile, name="profile"),
+    # Datos del usuario para las páginas compartidas (JSON)
+    path("me/", views.user_fragment, name="user_fragment"),
     path("favoritos/<slug:manga_slug>/", views.add_favorite, name="add_favorite"),
     # --- NUEVAS RUTAS SOCIALES ---
     # Ver perfil público de otro usuario (ej: /accounts/u/vicente/)
@@ -25,9 +27,16 @@ urlpatterns = [
     # Seguir/Dejar de seguir
     path("u/<str:username>/follow/", views.follow_toggle, name="follow_toggle"),
     
+    # Feed de novedades (JSON)
+    path("feed/", views.feed, name="feed"),
+
     # Mensajería
     path("mensajes/", views.inbox, name="inbox"),
+    # Debe ir antes de las rutas con <username>
+    path("mensajes/no-leidos/", views.unread_count, name="unread_count"),
     path("mensajes/<str:username>/", views.chat_detail, name="chat_detail"),
+    path("mensajes/<str:username>/stream/", views.chat_stream, name="chat_stream"),
+    path("mensajes/<str:username>/historial/", views.chat_history, name="chat_history"),
     
     path("favoritos/<slug:manga_slug>/", views.add_favorite, name="add_favorite"),
     path("mensajes/<str:username>/eliminar/", views.delete_chat, name="delete_chat"),
@@ -1,17 +1,31 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib import messages
 from django.contrib.auth import login, logout, get_user_model
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
 from django.views.decorators.clickjacking import xframe_options_sameorigin
-from django.http import JsonResponse
-from django.db.models import Count, Q
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.middleware.csrf import get_token
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.conf import settings
+import json
+from asgiref.sync import sync_to_async
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 
 # Importamos modelos necesarios
 from catalogo.models import Manga
+from catalogo.cache import cached, user_tag, CATALOG, POPULARITY
+from catalogo.images import thumbnail_url
 from .forms import RegisterForm, UserUpdateForm, ProfileUpdateForm
-from .models import Profile, Message
+from .models import Profile, Message, Conversation
+from .realtime import get_broker, pair_key
+from .feed import timeline
+from .unread import get_unread_count
+from .stats import get_creator_stats
 
 # Definimos la variable User para usarla en las consultas
 User = get_user_model()
@@ -20,6 +34,18 @@ User = get_user_model()
 # HELPER DE VISTAS (SOLUCIÓN AL ERROR)
 # ------------------------------------
 
+def with_stats(mangas):
+    """
+    Anota likes y capítulos desde MangaStats (un JOIN uno a uno).
+
+    Reemplaza a Count('favorited_by') + Count('chapters') sobre el mismo
+    queryset, que multiplicaba las filas y entregaba conteos inflados.
+    """
+    return mangas.annotate(
+        total_likes=Coalesce('stats__likes', 0),
+        total_caps=Coalesce('stats__chapters', 0),
+    )
+
 def get_template_base(request):
     """Selecciona la plantilla base (base.html o base_min.html) según el parámetro GET 'mini'."""
     if request.GET.get('mini'):
@@ -66,12 +92,14 @@ def profile(request):
         u_form = UserUpdateForm(instance=request.user)
         p_form = ProfileUpdateForm(instance=request.user.profile)
 
-    # DATOS PARA EL DASHBOARD
-    favoritos = request.user.profile.favorites.all()
-    mis_mangas = Manga.objects.filter(owner=request.user).annotate(
-        total_likes=Count('favorited_by'),
-        total_caps=Count('chapters')
-    )
+    # DATOS PARA EL DASHBOARD (contadores precalculados, ver accounts/stats.py)
+    # Cacheados hasta que cambien los mangas o favoritos del usuario, el
+    # catálogo o los likes (catalogo/cache.py)
+    tags = [user_tag(request.user.pk), CATALOG, POPULARITY]
+    favoritos = cached('accounts:favorites', tags, lambda: list(request.user.profile.favorites.all()), request.user.pk)
+    mis_mangas = cached('accounts:dashboard', tags, lambda: list(
+        with_stats(Manga.objects.filter(owner=request.user))
+    ), request.user.pk)
     chart_labels = [m.titulo for m in mis_mangas]
     chart_likes = [m.total_likes for m in mis_mangas]
     chart_caps = [m.total_caps for m in mis_mangas]
@@ -84,6 +112,7 @@ def profile(request):
         'chart_labels': chart_labels,
         'chart_likes': chart_likes,
         'chart_caps': chart_caps,
+        'creator_stats': get_creator_stats(request.user),
     }
     return render(request, "accounts/profile.html", context)
 
@@ -125,14 +154,14 @@ def logout_confirm(request):
 @require_POST 
 def delete_chat(request, username):
     """
-    Elimina todo el historial de mensajes con un usuario específico.
+    Elimina el historial de mensajes con un usuario, solo para quien lo pide.
+
+    El otro participante conserva su copia; los mensajes se borran de verdad
+    cuando ambos los eliminaron (ver el comando archive_messages).
     """
     other_user = get_object_or_404(User, username=username)
     
-    Message.objects.filter(
-        (Q(sender=request.user) & Q(recipient=other_user)) |
-        (Q(sender=other_user) & Q(recipient=request.user))
-    ).delete()
+    Conversation.clear_for(request.user, other_user)
     
     messages.success(request, f"Chat con {username} eliminado.")
     
@@ -152,10 +181,8 @@ def public_profile(request, username):
     if request.user.is_authenticated and request.user == target_user:
         return redirect('accounts:profile')
         
-    mis_mangas = Manga.objects.filter(owner=target_user).annotate(
-        total_likes=Count('favorited_by'),
-        total_caps=Count('chapters')
-    )
+    mis_mangas = with_stats(Manga.objects.filter(owner=target_user))
+    stats = get_creator_stats(target_user)
 
     is_following = False
     if request.user.is_authenticated:
@@ -167,8 +194,9 @@ def public_profile(request, username):
         'target_user': target_user,
         'mis_mangas': mis_mangas,
         'is_following': is_following,
-        'followers_count': target_user.profile.followers.count(),
-        'following_count': target_user.profile.following.count()
+        'creator_stats': stats,
+        'followers_count': stats.followers,
+        'following_count': stats.following,
     }
     return render(request, 'accounts/public_profile.html', context)
 
@@ -198,19 +226,112 @@ def follow_toggle(request, username):
         
     return redirect('accounts:public_profile', username=username)
 
+@login_required
+def unread_count(request):
+    """API JSON mínima con el total de mensajes no leídos (para refrescar el globo del navbar)."""
+    return JsonResponse({'unread': get_unread_count(request.user)})
+
+# Máximo de mangas por los que puede preguntar una página
+USER_FRAGMENT_MAX_MANGAS = 50
+
+@never_cache
+@ensure_csrf_cookie
+def user_fragment(request):
+    """
+    API JSON con la parte de las páginas que depende del usuario.
+
+    base.html, la ficha del manga y el lector se renderizan iguales para
+    todos (se pueden cachear completos); el navbar, los avisos de
+    django.contrib.messages, los globos de no leídos y los botones de
+    favoritos y de edición se completan en el navegador con esta respuesta.
+    También deja la cookie CSRF y retorna el token para los formularios.
+
+    Parámetros GET:
+        manga: slug de un manga mostrado en la página (se repite, máximo 50).
+            La respuesta indica cuáles son favoritos del usuario y cuáles
+            puede editar.
+    """
+    data = {
+        'authenticated': request.user.is_authenticated,
+        'csrf_token': get_token(request),
+        'messages': [{'text': str(m), 'tags': m.tags} for m in messages.get_messages(request)],
+    }
+    if not request.user.is_authenticated:
+        return JsonResponse(data)
+
+    user = request.user
+    profile = Profile.objects.filter(user=user).only('avatar').first()
+    data.update({
+        'username': user.username,
+        'is_superuser': user.is_superuser,
+        'avatar': thumbnail_url(profile.avatar, 'avatar-sm') if profile else '',
+        'unread': get_unread_count(user),
+        'favorites': [],
+        'editable': [],
+    })
+
+    slugs = request.GET.getlist('manga')[:USER_FRAGMENT_MAX_MANGAS]
+    if slugs:
+        # Una consulta para los dos datos: dueño y si está en favoritos
+        favorite = Profile.favorites.through.objects.filter(profile=profile, manga=OuterRef('pk'))
+        rows = Manga.objects.filter(slug__in=slugs).annotate(is_favorite=Exists(favorite)) \
+            .values_list('slug', 'owner_id', 'is_favorite')
+        for slug, owner_id, is_favorite in rows:
+            if is_favorite:
+                data['favorites'].append(slug)
+            if user.is_superuser or owner_id == user.pk:
+                data['editable'].append(slug)
+    return JsonResponse(data)
+
+@login_required
+def feed(request):
+    """
+    API JSON del feed de novedades: capítulos nuevos de creadores seguidos y mangas favoritos.
+
+    Parámetros GET:
+        before: cursor (id de capítulo) devuelto como 'next' por la página anterior.
+        limit: tamaño de página (máximo 50).
+    """
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 20)), 50))
+        before = int(request.GET['before']) if request.GET.get('before') else None
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Parámetros inválidos'}, status=400)
+
+    chapters, next_cursor = timeline(request.user, before=before, limit=limit)
+    return JsonResponse({
+        'entries': [{
+            'chapter_id': chapter.id,
+            'chapter_number': chapter.chapter_number,
+            'title': chapter.title,
+            'manga': chapter.manga.titulo,
+            'manga_slug': chapter.manga.slug,
+            'url': reverse('catalogo:chapter-detail', args=[chapter.manga.slug, chapter.slug]),
+            'reason': chapter.feed_reason,
+            'created_at': chapter.created_at.isoformat(),
+        } for chapter in chapters],
+        'next': next_cursor,
+    })
+
 @login_required
 @xframe_options_sameorigin
 def inbox(request):
     """
     Bandeja de entrada: Muestra lista de usuarios con chats activos.
+
+    Lee la tabla Conversation (una consulta indexada, ordenada por actividad
+    reciente) con el último mensaje y los no leídos de cada chat.
     """
-    chat_partners = User.objects.filter(
-        Q(received_messages__sender=request.user) | 
-        Q(sent_messages__recipient=request.user)
-    ).distinct().exclude(id=request.user.id)
+    conversations = list(
+        Conversation.objects.for_user(request.user)
+        .select_related('user_a__profile', 'user_b__profile')
+    )
+    for conv in conversations:
+        conv.partner = conv.other(request.user)
+        conv.unread = conv.unread_for(request.user)
     
     return render(request, 'accounts/inbox.html', {
-        'users': chat_partners,
+        'conversations': conversations,
         'layout': get_template_base(request)
     })
 
@@ -229,23 +350,125 @@ def chat_detail(request, username):
             
             # Devolver JSON si es AJAX (para el envío fluido)
             if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-                return JsonResponse({
-                    'status': 'ok',
-                    'content': msg.content,
-                    'timestamp': msg.timestamp.strftime("%H:%M"),
-                    'sender': request.user.username
-                })
+                return JsonResponse(dict(msg.as_event(), status='ok', sender=request.user.username))
             
             return redirect('accounts:chat_detail', username=username)
     
-    # Historial de mensajes
-    messages_list = Message.objects.filter(
-        (Q(sender=request.user) & Q(recipient=other_user)) |
-        (Q(sender=other_user) & Q(recipient=request.user))
-    ).order_by('timestamp')
+    # Al abrir el chat, los mensajes recibidos quedan leídos
+    Conversation.mark_read(request.user, other_user)
+
+    # Historial: solo la ventana más reciente; lo anterior se pide a chat_history al hacer scroll
+    page_size = settings.CHAT_PAGE_SIZE
+    latest = list(
+        Message.objects.visible_to(request.user, other_user).order_by('-id')[:page_size + 1]
+    )
+    messages_list = latest[:page_size][::-1]
+    has_more = len(latest) > page_size
+    if not has_more:
+        # El historial reciente es corto: puede haber mensajes más antiguos archivados
+        conv = Conversation.between(request.user, other_user).first()
+        has_more = bool(conv) and conv.archives.filter(last_id__gt=conv.cleared_for(request.user)).exists()
     
     return render(request, 'accounts/chat.html', {
         'other_user': other_user, 
         'messages_list': messages_list,
+        'has_more': has_more,
         'layout': get_template_base(request)
-    })
\ No newline at end of file
+    })
+
+@login_required
+def chat_history(request, username):
+    """
+    API JSON del historial de una conversación, paginada por cursor.
+
+    Parámetros GET:
+        before: id de mensaje; retorna los anteriores (scroll hacia arriba).
+        after: id de mensaje; retorna los posteriores (sondeo incremental).
+        limit: tamaño de página (máximo 100).
+
+    Los mensajes se retornan en orden de id (el orden de envío) junto con
+    'has_more'. El cursor es el id, así que se ordena solo por id: los
+    timestamps pueden no seguir ese orden (p. ej. datos sintéticos con fechas
+    anteriores) y ordenar por ellos saltaría o repetiría mensajes entre páginas.
+    Cada página es una consulta acotada sobre el índice (sender, recipient, id),
+    sin importar qué tan larga sea la conversación. Al agotarse la tabla Message,
+    la paginación hacia atrás continúa con los segmentos de MessageArchive.
+    Nunca se retornan mensajes que el usuario borró de su lado.
+    """
+    other_user = get_object_or_404(User, username=username)
+    try:
+        limit = max(1, min(int(request.GET.get('limit', settings.CHAT_PAGE_SIZE)), 100))
+        before = int(request.GET['before']) if request.GET.get('before') else None
+        after = int(request.GET['after']) if request.GET.get('after') else None
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Parámetros inválidos'}, status=400)
+
+    conv = Conversation.between(request.user, other_user).first()
+    if conv is None:
+        return JsonResponse({'messages': [], 'has_more': False})
+    qs = Message.objects.between(request.user, other_user).filter(id__gt=conv.cleared_for(request.user))
+    if after is not None:
+        page = list(qs.filter(id__gt=after).order_by('id')[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+    else:
+        if before is not None:
+            qs = qs.filter(id__lt=before)
+        page = list(qs.order_by('-id')[:limit + 1])
+        if len(page) <= limit:
+            # Se agotó la tabla caliente: completar con el historial archivado
+            cursor = page[-1].id if page else before
+            page += conv.archived_before(request.user, before=cursor, limit=limit - len(page))
+        has_more = len(page) > limit
+        page = page[:limit][::-1]
+
+    return JsonResponse({'messages': [msg.as_event() for msg in page], 'has_more': has_more})
+
+@login_required
+async def chat_stream(request, username):
+    """
+    Canal Server-Sent Events con los mensajes nuevos de una conversación.
+
+    Envía solo los mensajes con id mayor al último recibido por el cliente
+    (cabecera Last-Event-ID o parámetro 'after'), en vez de recargar el
+    historial completo. La conexión se cierra tras CHAT_STREAM_TIMEOUT
+    segundos y EventSource reconecta solo, retomando desde el último id.
+
+    Bajo WSGI no se mantiene abierta (ocuparía un worker síncrono): responde
+    lo pendiente y el navegador reconecta tras CHAT_WSGI_RETRY segundos.
+
+    Los mensajes del otro usuario entregados por el canal quedan leídos
+    (contador de la conversación y badge), como al abrir el chat.
+    """
+    user = await request.auser()
+    other_user = await aget_object_or_404(User, username=username)
+    try:
+        last_id = int(request.headers.get('Last-Event-ID') or request.GET.get('after') or 0)
+    except ValueError:
+        last_id = 0
+    # Nunca reenviar mensajes que el usuario borró de su lado
+    conv = await Conversation.between(user, other_user).afirst()
+    if conv:
+        last_id = max(last_id, conv.cleared_for(user))
+
+    if isinstance(request, ASGIRequest):
+        timeout, retry = settings.CHAT_STREAM_TIMEOUT, 1
+    else:
+        timeout, retry = 0, settings.CHAT_WSGI_RETRY
+
+    async def events():
+        yield f'retry: {int(retry * 1000)}\n\n'
+        stream = get_broker().listen(pair_key(user.pk, other_user.pk), last_id, timeout)
+        async for event in stream:
+            if event is None:
+                yield ': ping\n\n'
+            else:
+                yield f"id: {event['id']}\nevent: message\ndata: {json.dumps(event)}\n\n"
+                if event['sender_id'] == other_user.pk:
+                    # Entregado con el chat abierto: leído, igual que al abrir chat_detail
+                    await sync_to_async(Conversation.mark_read)(user, other_user)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Evita que nginx acumule el stream
+    return response
@@ -44,12 +44,9 @@ class ChapterAdminForm(forms.ModelForm):
         if commit and self.files:
             images = self.files.getlist('imagenes_masivas')
             if images:
-                # Calculamos el número de página inicial para no sobrescribir
-                inicio = chapter.panels.count() + 1
-                
-                # Creamos un objeto Panel por cada imagen subida
-                for i, img in enumerate(images):
-                    Panel.objects.create(chapter=chapter, image=img, page_number=inicio + i)
+                # Creamos un objeto Panel por cada imagen subida (se agregan al final del capítulo)
+                for img in images:
+                    Panel.objects.create(chapter=chapter, image=img)
         
         return chapter
 
@@ -62,7 +59,7 @@ class PanelInline(admin.TabularInline):
     """
     model = Panel
     extra = 0  # No muestra formularios vacíos extra por defecto
-    fields = ('image', 'page_number')
+    fields = ('image', 'position')
 
 class ArcInline(admin.TabularInline):
     """
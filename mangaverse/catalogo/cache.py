@@ -0,0 +1,198 @@
+"""
+Caché con invalidación por etiquetas (versiones).
+
+Cada dato cacheado declara de qué etiquetas depende: un manga
+('manga:<id>'), un capítulo ('chapter:<id>'), un usuario ('user:<id>'), un
+género ('genre:<código>'), las recomendaciones de un manga
+('recommendations:<id>') o el catálogo completo ('catalog'). Cada etiqueta
+tiene un número de versión guardado en la caché, y la clave del dato incluye
+las versiones de sus etiquetas. Invalidar es cambiar la versión (bump): las
+claves viejas dejan de leerse y expiran solas, sin buscar ni borrar nada.
+
+Las señales de catalogo/models.py y accounts/models.py hacen el bump al
+confirmarse la transacción, así que un lector nunca guarda datos anteriores
+al cambio bajo la versión nueva. Las escrituras masivas que no disparan
+señales (bulk_create, update()) llaman a bump() o bump_all() por su cuenta.
+
+Uso:
+    mangas = cached('catalogo:home-recent', [CATALOG], lambda: list(...))
+
+    # Fragmentos de plantilla: la vista pasa la versión y el template la
+    # usa como parte de la clave de {% cache %}
+    context['fragment_version'] = version_string(manga_tag(manga.pk))
+
+Las mismas versiones sirven de ETag para el GET condicional (conditional()):
+el navegador revalida la página y recibe un 304 mientras no cambien.
+"""
+import hashlib
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+# Segundos que vive un dato cacheado; la invalidación no depende de este plazo
+CACHE_TAG_TIMEOUT = getattr(settings, 'CACHE_TAG_TIMEOUT', 60 * 60 * 24)
+
+VERSION_PREFIX = 'cachetag'
+# Todas las claves dependen de esta etiqueta: bump_all() invalida todo
+GLOBAL = 'all'
+CATALOG = 'catalog'
+# Likes: cambian mucho más seguido que el resto del catálogo
+POPULARITY = 'popularity'
+
+_MISSING = object()
+
+
+def manga_tag(pk):
+    return f'manga:{pk}'
+
+
+def chapter_tag(pk):
+    return f'chapter:{pk}'
+
+
+def user_tag(pk):
+    return f'user:{pk}'
+
+
+def genre_tag(code):
+    return f'genre:{code}'
+
+
+def recommendations_tag(pk):
+    """Recomendaciones de un manga (las recalcula build_recommendations)."""
+    return f'recommendations:{pk}'
+
+
+def _new_version():
+    return format(time.time_ns(), 'x')
+
+
+def versions(tags):
+    """Versiones actuales de las etiquetas (más la global), creando las que falten."""
+    keys = [f'{VERSION_PREFIX}:{tag}' for tag in (GLOBAL, *tags)]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            value = _new_version()
+            # add() no pisa la versión que otro proceso haya creado entretanto
+            if not cache.add(key, value, None):
+                value = cache.get(key, value)
+            found[key] = value
+    return [found[key] for key in keys]
+
+
+def version_string(*tags):
+    """Versiones de las etiquetas en un texto, para usar como parte de una clave."""
+    return '.'.join(versions(tags))
+
+
+def _digest(tags, parts):
+    return hashlib.md5(':'.join([*versions(tags), *map(str, parts)]).encode('utf-8')).hexdigest()
+
+
+def make_key(name, tags, *parts):
+    return f'{name}:{_digest(tags, parts)}'
+
+
+def cached(name, tags, compute, *parts, timeout=CACHE_TAG_TIMEOUT):
+    """
+    Retorna el valor cacheado de 'name' (y 'parts') o lo calcula con compute().
+
+    El valor se invalida cuando cambia la versión de cualquiera de 'tags'.
+    """
+    key = make_key(name, tags, *parts)
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+def _set_versions(tags):
+    version = _new_version()
+    cache.set_many({f'{VERSION_PREFIX}:{tag}': version for tag in tags}, None)
+
+
+class _PendingBump:
+    """Etiquetas que se invalidan juntas al confirmarse una transacción (un solo set_many)."""
+
+    def __init__(self):
+        self.tags = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        _set_versions(self.tags)
+
+
+# Bump pendiente por conexión y bloque atomic (savepoints activos), en el hilo
+# actual. Son referencias débiles: si la transacción se revierte, Django
+# descarta el on_commit y la entrada desaparece con él.
+_local = threading.local()
+
+
+def _pending_bump(connection):
+    registry = _local.__dict__.setdefault('pending', weakref.WeakValueDictionary())
+    key = (id(connection), tuple(connection.savepoint_ids))
+    pending = registry.get(key)
+    if pending is None or pending.done:
+        pending = registry[key] = _PendingBump()
+        transaction.on_commit(pending)
+    return pending
+
+
+def bump(*tags):
+    """
+    Invalida todo lo que depende de 'tags' (al confirmarse la transacción en curso).
+
+    Los bumps de un mismo bloque atomic se juntan en un solo on_commit: un
+    borrado en cascada de miles de filas hace un solo viaje a la caché.
+    """
+    tags = {tag for tag in tags if tag}
+    if not tags:
+        return
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        _pending_bump(connection).tags.update(tags)
+    else:
+        _set_versions(tags)
+
+
+def bump_all():
+    """Invalida todo lo cacheado con etiquetas (ej: tras cargas masivas)."""
+    bump(GLOBAL)
+
+
+# --------------------------
+# GET CONDICIONAL (ETag / Last-Modified)
+# --------------------------
+
+def make_etag(tags, *parts):
+    """ETag de una respuesta que cambia con las versiones de 'tags' (y con 'parts')."""
+    return f'"{_digest(tags, parts)}"'
+
+
+def conditional(request, etag, respond, last_modified=None):
+    """
+    Responde un GET condicional sin renderizar si el cliente ya tiene la página.
+
+    Si If-None-Match (o If-Modified-Since) coincide con 'etag' (o
+    'last_modified', un datetime) retorna 304; si no, llama a respond().
+    Ambas respuestas llevan los validadores y 'Cache-Control: no-cache': el
+    navegador o un proxy guardan la página, pero la revalidan en cada visita.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = respond()
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    patch_cache_control(response, no_cache=True)
+    return response
@@ -0,0 +1,386 @@
+"""
+Miniaturas de portadas y avatares generadas bajo demanda.
+
+Los listados nunca descargan el original: piden /miniaturas/<tamaño>/<archivo>,
+que en la primera petición redimensiona la imagen y la guarda en un caché en
+disco (THUMBNAIL_CACHE_DIR). Las siguientes peticiones sirven el archivo ya
+generado. La URL es estable (depende solo del tamaño y del nombre del archivo
+original, que Django nunca sobrescribe), así que el navegador puede cachearla
+por mucho tiempo.
+
+El caché tiene un tamaño máximo (THUMBNAIL_CACHE_MAX_BYTES) y se recorta
+eliminando los archivos usados hace más tiempo (LRU): cada acierto actualiza
+la fecha de modificación del archivo.
+
+También calcula los placeholders (LQIP) de portadas y páginas: una grilla de
+pocos píxeles que se guarda en el modelo y se pinta al instante, antes de que
+llegue la imagen real; y corta en segmentos (PanelTile) las páginas muy altas.
+"""
+import base64
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Tamaños permitidos: nombre -> (ancho, alto, recortar). Sin recorte, la imagen
+# se ajusta dentro de la caja conservando su proporción.
+SIZES = {
+    'avatar-sm': (64, 64, True),
+    'avatar': (160, 160, True),
+    'cover-sm': (96, 136, True),
+    'cover': (360, 510, True),
+    'cover-lg': (720, 1020, False),
+}
+
+# Carpetas de MEDIA_ROOT desde las que se pueden generar miniaturas
+ALLOWED_PREFIXES = ('portadas/', 'avatars/', 'images/')
+
+CACHE_DIR = Path(getattr(settings, 'THUMBNAIL_CACHE_DIR', Path(settings.BASE_DIR) / 'media_cache' / 'thumbs'))
+CACHE_MAX_BYTES = getattr(settings, 'THUMBNAIL_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+# Cada cuántas miniaturas nuevas se revisa el tamaño total del caché
+EVICT_EVERY = 50
+
+_lock = threading.Lock()
+_writes_since_check = EVICT_EVERY  # La primera escritura del proceso revisa el caché
+
+
+def thumbnail_url(image, size):
+    """
+    URL de la miniatura de un ImageField (o '' si no tiene archivo).
+
+    Si el tamaño no está en SIZES, o el archivo no está en una carpeta
+    permitida, retorna la URL del original.
+    """
+    if not image:
+        return ''
+    name = image.name if hasattr(image, 'name') else str(image)
+    if size not in SIZES or not name.startswith(ALLOWED_PREFIXES):
+        return image.url
+    return reverse('catalogo:thumbnail', args=[size, name])
+
+
+def is_allowed(size, name):
+    """Valida el tamaño y que el archivo esté dentro de una carpeta permitida."""
+    return (
+        size in SIZES
+        and name.startswith(ALLOWED_PREFIXES)
+        and '..' not in Path(name).parts
+        and not os.path.isabs(name)
+    )
+
+
+def cache_path(size, name):
+    digest = hashlib.sha1(f'{size}:{name}'.encode('utf-8')).hexdigest()
+    return CACHE_DIR / digest[:2] / f'{digest}.webp'
+
+
+def get_thumbnail(size, name):
+    """
+    Ruta en disco de la miniatura, generándola si aún no existe.
+
+    Retorna None si el original no existe o no es una imagen válida.
+    """
+    path = cache_path(size, name)
+    try:
+        os.utime(path)  # Marca de uso para el LRU
+        return path
+    except FileNotFoundError:
+        pass
+
+    if not default_storage.exists(name):
+        return None
+    try:
+        with default_storage.open(name, 'rb') as fh:
+            image = render(Image.open(fh), *SIZES[size])
+    except (OSError, Image.DecompressionBombError):
+        return None
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Escritura atómica: otra petición nunca ve un archivo a medio escribir
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            image.save(out, format='WEBP', quality=80, method=4)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    _maybe_evict()
+    return path
+
+
+def render(image, width, height, crop):
+    """Redimensiona (y opcionalmente recorta al centro) una imagen PIL."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    if crop:
+        return ImageOps.fit(image, (width, height), Image.LANCZOS)
+    image.thumbnail((width, height), Image.LANCZOS)
+    return image
+
+
+def _maybe_evict():
+    global _writes_since_check
+    with _lock:
+        _writes_since_check += 1
+        if _writes_since_check < EVICT_EVERY:
+            return
+        _writes_since_check = 0
+    evict()
+
+
+def evict(max_bytes=None):
+    """
+    Recorta el caché al 90% de su tamaño máximo, eliminando primero lo menos usado.
+
+    Retorna (archivos eliminados, bytes liberados).
+    """
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries, total = [], 0
+    for shard in CACHE_DIR.glob('*'):
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+    if total <= max_bytes:
+        return 0, 0
+
+    removed, freed = 0, 0
+    target = total - int(max_bytes * 0.9)
+    for _, size, path in sorted(entries):
+        if freed >= target:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        removed += 1
+        freed += size
+    return removed, freed
+
+
+# --------------------------
+# PLACEHOLDERS (LQIP)
+# --------------------------
+
+# Ancho de la grilla del placeholder; el alto sigue la proporción de la imagen
+LQIP_COLUMNS = 4
+LQIP_MAX_ROWS = 16
+
+
+def compute_placeholder(source):
+    """
+    Placeholder de una imagen: 'ANCHOxALTO:<rgb en base64>'.
+
+    'source' es un archivo (o ruta) que PIL pueda abrir. Guarda las
+    dimensiones originales (útiles para reservar el espacio y evitar saltos de
+    diseño) y una grilla de LQIP_COLUMNS píxeles de ancho (48 bytes para una
+    portada). Retorna '' si no es una imagen válida.
+    """
+    try:
+        image = Image.open(source)
+        width, height = image.size
+        columns = LQIP_COLUMNS
+        rows = max(1, min(LQIP_MAX_ROWS, round(columns * height / width)))
+        image.draft('RGB', (columns * 8, rows * 8))  # JPEG: decodifica a baja resolución
+        grid = ImageOps.exif_transpose(image).convert('RGB').resize((columns, rows), Image.BOX)
+    except (OSError, ValueError, ZeroDivisionError, Image.DecompressionBombError):
+        return ''
+    finally:
+        if hasattr(source, 'seek'):
+            source.seek(0)
+    return f"{width}x{height}:{base64.b64encode(grid.tobytes()).decode('ascii')}"
+
+
+def parse_placeholder(value):
+    """Retorna (ancho, alto, columnas, filas, bytes rgb) o None si el valor no es válido."""
+    try:
+        size, data = value.split(':', 1)
+        width, height = (int(n) for n in size.split('x'))
+        pixels = base64.b64decode(data)
+    except (AttributeError, ValueError):
+        return None
+    columns = LQIP_COLUMNS
+    if not pixels or len(pixels) % (columns * 3):
+        return None
+    return width, height, columns, len(pixels) // (columns * 3), pixels
+
+
+def placeholder_data_uri(value):
+    """
+    Convierte un placeholder en un BMP de 24 bits como data URI.
+
+    El navegador lo escala suavizado, lo que da el efecto borroso sin JavaScript.
+    """
+    parsed = parse_placeholder(value)
+    if parsed is None:
+        return ''
+    _, _, columns, rows, pixels = parsed
+    row_size = (columns * 3 + 3) & ~3
+    body = bytearray()
+    for y in range(rows - 1, -1, -1):  # BMP guarda las filas de abajo hacia arriba
+        row = pixels[y * columns * 3:(y + 1) * columns * 3]
+        for x in range(columns):
+            r, g, b = row[x * 3:x * 3 + 3]
+            body += bytes((b, g, r))
+        body += b'\0' * (row_size - columns * 3)
+    header = struct.pack('<2sIHHI', b'BM', 54 + len(body), 0, 0, 54)
+    info = struct.pack('<IiiHHIIiiII', 40, columns, rows, 1, 24, 0, len(body), 2835, 2835, 0, 0)
+    return 'data:image/bmp;base64,' + base64.b64encode(header + info + bytes(body)).decode('ascii')
+
+
+# --------------------------
+# SEGMENTOS DE PÁGINAS MUY ALTAS
+# --------------------------
+
+# Alto de cada segmento en píxeles de la imagen original (múltiplo de 16 para
+# que los bloques JPEG no crucen el corte y no se note la unión)
+TILE_HEIGHT = getattr(settings, 'PANEL_TILE_HEIGHT', 1600)
+# Se corta una página cuando su alto supera este múltiplo de su ancho
+TILE_MAX_ASPECT = getattr(settings, 'PANEL_TILE_MAX_ASPECT', 3)
+# Páginas más grandes no se cortan al subirlas (quedan para el comando tile_panels)
+TILE_MAX_PIXELS = getattr(settings, 'PANEL_TILE_MAX_PIXELS', 50_000_000)
+
+_tile_executor = None
+
+
+def needs_tiling(width, height):
+    return height > max(width * TILE_MAX_ASPECT, TILE_HEIGHT * 2)
+
+
+def tile_bounds(height, tile_height=TILE_HEIGHT):
+    """
+    Cortes (arriba, abajo) de cada segmento. Un resto menor a un cuarto de
+    segmento se suma al anterior en vez de quedar como una tira diminuta.
+    """
+    bounds = [(top, min(top + tile_height, height)) for top in range(0, height, tile_height)]
+    if len(bounds) > 1 and bounds[-1][1] - bounds[-1][0] < tile_height // 4:
+        last = bounds.pop()
+        bounds[-1] = (bounds[-1][0], last[1])
+    return bounds
+
+
+def tile_panel(panel):
+    """
+    Corta la imagen de un Panel muy alto (tira tipo webtoon) en segmentos.
+
+    Reemplaza los PanelTile existentes del panel. Si la imagen no es lo
+    bastante alta solo borra los segmentos anteriores. Retorna la cantidad de
+    segmentos creados.
+    """
+    from .models import PanelTile
+
+    clear_tiles(panel)
+    try:
+        with panel.image.storage.open(panel.image.name, 'rb') as fh:
+            image = Image.open(fh)
+            fmt = 'PNG' if image.format == 'PNG' else 'JPEG'
+            width, height = image.size
+            if not needs_tiling(width, height):
+                return 0
+            image.load()
+    except (OSError, Image.DecompressionBombError):
+        return 0
+    if fmt == 'JPEG' and image.mode not in ('L', 'RGB'):
+        image = image.convert('RGB')
+
+    base = Path(panel.image.name).stem
+    extension = 'png' if fmt == 'PNG' else 'jpg'
+    tiles = []
+    for index, (top, bottom) in enumerate(tile_bounds(height)):
+        buffer = BytesIO()
+        image.crop((0, top, width, bottom)).save(
+            buffer, format=fmt, **({'optimize': True} if fmt == 'PNG' else {'quality': 90})
+        )
+        tile = PanelTile(panel=panel, index=index, width=width, height=bottom - top)
+        tile.image.save(f'{base}_{index:03d}.{extension}', ContentFile(buffer.getvalue()), save=False)
+        tiles.append(tile)
+    PanelTile.objects.bulk_create(tiles)
+    return len(tiles)
+
+
+def clear_tiles(panel):
+    """Borra los segmentos del panel y sus archivos (estos, al confirmarse la transacción)."""
+    names = [name for name in panel.tiles.values_list('image', flat=True) if name]
+    if not names:
+        return
+    panel.tiles.all().delete()
+    storage = panel.image.storage
+
+    def delete_files():
+        for name in names:
+            storage.delete(name)
+
+    transaction.on_commit(delete_files)
+
+
+def schedule_tiling(panel, created):
+    """
+    Agenda el corte de una página recién subida, después del commit.
+
+    Decide con las dimensiones del placeholder, sin decodificar la imagen. El
+    corte corre en un hilo aparte (PANEL_TILE_ASYNC) para no alargar la
+    petición; las páginas de más de TILE_MAX_PIXELS no se cortan aquí y
+    quedan para el comando tile_panels. Si la imagen nueva no necesita
+    segmentos, solo se borran los anteriores.
+    """
+    parsed = parse_placeholder(panel.lqip)
+    if parsed:
+        width, height = parsed[:2]
+        if not needs_tiling(width, height):
+            if not created:
+                clear_tiles(panel)
+            return
+        if width * height > TILE_MAX_PIXELS:
+            if not created:
+                clear_tiles(panel)
+            logger.warning("Página %s de %sx%s px: no se corta al subirla (usar tile_panels).",
+                           panel.pk, width, height)
+            return
+    panel_id = panel.pk
+    transaction.on_commit(lambda: _submit_tiling(panel_id))
+
+
+def _submit_tiling(panel_id):
+    global _tile_executor
+    if not getattr(settings, 'PANEL_TILE_ASYNC', True):
+        _tile_task(panel_id)
+        return
+    if _tile_executor is None:
+        _tile_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='panel-tiles')
+    _tile_executor.submit(_tile_task, panel_id)
+
+
+def _tile_task(panel_id):
+    """Corta la página e invalida el visor; registra errores y libera la conexión."""
+    from .cache import bump, chapter_tag, manga_tag
+    from .models import Panel, touch
+    try:
+        panel = Panel.objects.select_related('chapter__manga').filter(pk=panel_id).first()
+        if panel and tile_panel(panel):
+            touch(chapter_id=panel.chapter_id)
+            bump(chapter_tag(panel.chapter_id), manga_tag(panel.chapter.manga_id))
+    except Exception:
+        logger.exception("Error cortando en segmentos la página %s", panel_id)
+    finally:
+        close_old_connections()
@@ -0,0 +1,168 @@
+import json
+import platform
+import time
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from catalogo.models import Manga
+from catalogo.synthetic import seed_catalog
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano (sin interpolar) de una lista de números."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class QueryCounter:
+    """
+    Cuenta las consultas SQL ejecutadas (vía connection.execute_wrapper).
+
+    A diferencia de CaptureQueriesContext no guarda el SQL, así que no tiene
+    límite de 9000 consultas ni agrega costo de registro a la medición.
+    """
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    """
+    Benchmark de las vistas de catálogo y búsqueda sobre un catálogo sintético.
+
+    Crea una base de datos de prueba (igual que 'manage.py test'), la puebla con
+    seed_catalog y recorre las vistas con el cliente de pruebas de Django,
+    registrando latencia (p50/p95) y número de consultas SQL por vista.
+    El resultado se emite en JSON para comparar corridas en el tiempo.
+
+    Ejemplo:
+        python manage.py bench_catalog --mangas 100000 --chapters 2000000 --output bench.json
+    """
+    help = "Mide latencia y consultas de search, search_suggest, lista_mangas y manga_detail_view."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--mangas', type=int, default=10000)
+        parser.add_argument('--chapters', type=int, default=100000)
+        parser.add_argument('--favorites', type=int, default=50000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument('--skew', type=float, default=1.1, help="Exponente de la ley de potencia.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--iterations', type=int, default=20, help="Peticiones por escenario.")
+        parser.add_argument('--cold', action='store_true', help="Vacía la caché antes de cada petición.")
+        parser.add_argument('--output', help="Archivo JSON de salida (por defecto, stdout).")
+        parser.add_argument('--keepdb', action='store_true', help="Reutiliza la base de prueba si ya existe (no la vuelve a poblar).")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            if options['keepdb'] and Manga.objects.exists():
+                sizes = {'mangas': Manga.objects.count()}
+            else:
+                self.stderr.write("Poblando catálogo sintético...")
+                started = time.perf_counter()
+                sizes = seed_catalog(
+                    users=options['users'], mangas=options['mangas'], chapters=options['chapters'],
+                    favorites=options['favorites'], follows=options['follows'],
+                    skew=options['skew'], seed=options['seed'], log=self.stderr.write,
+                )
+                sizes['seed_seconds'] = round(time.perf_counter() - started, 2)
+            report = {
+                'meta': {
+                    'timestamp': timezone.now().isoformat(),
+                    'database': connection.vendor,
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'seed': options['seed'],
+                    'skew': options['skew'],
+                    'iterations': options['iterations'],
+                    'cache': 'cold' if options['cold'] else 'warm',
+                    'sizes': sizes,
+                },
+                'results': [self.measure(name, url, options) for name, url in self.scenarios()],
+            }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                fh.write(output)
+            self.stderr.write(self.style.SUCCESS(f"Resultados guardados en {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def scenarios(self):
+        """
+        Escenarios a medir: (nombre, URL).
+
+        Usa el manga más popular (más favoritos) y el menos popular para el detalle,
+        y como textos de búsqueda un título existente, una palabra común y un error de tipeo.
+        """
+        popular = Manga.objects.annotate(n=Count('favorited_by')).order_by('-n').first()
+        raro = Manga.objects.order_by('-id').first()
+        palabra = popular.titulo.split()[0]
+        typo = palabra[:-1] + ('x' if palabra[-1] != 'x' else 'z')
+        genero = popular.genero
+        return [
+            ('lista_mangas', reverse('catalogo:lista-mangas')),
+            ('lista_mangas:genero', f"{reverse('catalogo:lista-mangas')}?genero={genero}"),
+            ('search:titulo', f"{reverse('catalogo:search')}?q={popular.titulo}"),
+            ('search:palabra', f"{reverse('catalogo:search')}?q={palabra[:3]}"),
+            ('search:typo', f"{reverse('catalogo:search')}?q={typo}"),
+            ('search:pagina-2', f"{reverse('catalogo:search')}?q={palabra[:3]}&page=2"),
+            ('search_suggest', f"{reverse('catalogo:search-suggest')}?q={palabra[:3]}"),
+            ('search_suggest:typo', f"{reverse('catalogo:search-suggest')}?q={typo}"),
+            ('manga_detail_view:popular', popular.get_absolute_url()),
+            ('manga_detail_view:raro', raro.get_absolute_url()),
+        ]
+
+    def measure(self, name, url, options):
+        """Ejecuta un escenario 'iterations' veces y resume latencia y consultas."""
+        client = Client()
+        user = get_user_model().objects.filter(username__startswith='lector').first()
+        if user:
+            client.force_login(user)
+
+        client.get(url)  # Calentamiento (imports, plantillas compiladas)
+        timings, queries, statuses = [], [], set()
+        for _ in range(options['iterations']):
+            if options['cold']:
+                cache.clear()
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(counter.count)
+            statuses.add(response.status_code)
+
+        result = {
+            'view': name,
+            'url': url,
+            'status': sorted(statuses),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'max_ms': round(max(timings), 2),
+            'queries_p50': percentile(queries, 50),
+            'queries_max': max(queries),
+        }
+        self.stderr.write(f"{name:<28} p50={result['p50_ms']:>8} ms  p95={result['p95_ms']:>8} ms  "
+                          f"queries={result['queries_max']}")
+        return result
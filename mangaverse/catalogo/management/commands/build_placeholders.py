@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+
+from catalogo.cache import bump_all
+from catalogo.models import Manga, Panel, placeholder_for
+
+
+class Command(BaseCommand):
+    """
+    Calcula los placeholders (LQIP) de portadas y páginas que aún no lo tienen.
+
+    Las subidas nuevas lo calculan al guardarse; este comando completa los
+    datos anteriores o cargados en bloque. Guarda con bulk_update, así que no
+    dispara señales (invalida la caché completa al terminar). Un mismo archivo compartido por varias filas se lee una
+    sola vez.
+
+    Ejemplo:
+        python manage.py build_placeholders --force
+    """
+    help = "Calcula los placeholders (LQIP) de portadas y páginas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Recalcula también los que ya existen.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        mangas = Manga.objects.exclude(portada='').exclude(portada__isnull=True)
+        panels = Panel.objects.exclude(image='')
+        if not options['force']:
+            mangas = mangas.filter(portada_lqip='')
+            panels = panels.filter(lqip='')
+
+        total_mangas = self._fill(mangas.only('id', 'portada'), 'portada', 'portada_lqip', options['batch_size'])
+        total_panels = self._fill(panels.only('id', 'image'), 'image', 'lqip', options['batch_size'])
+        if total_mangas or total_panels:
+            bump_all()  # Las portadas y páginas cacheadas llevan el placeholder
+        self.stdout.write(self.style.SUCCESS(
+            f"Placeholders calculados: {total_mangas} portadas, {total_panels} páginas."
+        ))
+
+    def _fill(self, queryset, file_field, lqip_field, batch_size):
+        model = queryset.model
+        done, batch, seen = 0, [], {}
+        for obj in queryset.iterator(chunk_size=batch_size):
+            field_file = getattr(obj, file_field)
+            if field_file.name not in seen:
+                seen[field_file.name] = placeholder_for(field_file)
+            setattr(obj, lqip_field, seen[field_file.name])
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                done += len(batch)
+                model.objects.bulk_update(batch, [lqip_field])
+                batch = []
+        if batch:
+            done += len(batch)
+            model.objects.bulk_update(batch, [lqip_field])
+        return done
@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from catalogo.recommendations import build_recommendations
+
+
+class Command(BaseCommand):
+    """
+    Calcula las recomendaciones "quienes leyeron esto también leyeron".
+
+    Pensado para correr periódicamente (cron), fuera del ciclo de las
+    peticiones. Reemplaza todas las filas de MangaRecommendation en una
+    transacción, así la ficha nunca muestra un cálculo a medias.
+
+    Ejemplo:
+        python manage.py build_recommendations --top-k 12 --min-common 3
+    """
+    help = "Recalcula las recomendaciones de mangas a partir de los favoritos en común."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=getattr(settings, 'RECOMMENDATIONS_TOP_K', 8))
+        parser.add_argument('--min-common', type=int, default=2,
+                            help="Lectores en común mínimos para considerar dos mangas similares.")
+        parser.add_argument('--max-user-favorites', type=int, default=1000,
+                            help="Se omiten los lectores con más favoritos que esto.")
+        parser.add_argument('--chunk-pairs', type=int, default=5_000_000,
+                            help="Pares procesados por bloque (acota la memoria).")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        totals = build_recommendations(
+            k=options['top_k'], min_common=options['min_common'],
+            max_user_favorites=options['max_user_favorites'], chunk_pairs=options['chunk_pairs'],
+            batch_size=options['batch_size'], log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['favorites']} por favoritos, {totals['autor']} por autor y {totals['genero']} por género "
+            f"({totals['edges']} favoritos, {totals['changed']} fichas cambiadas, {time.perf_counter() - started:.1f} s)."
+        ))
@@ -0,0 +1,43 @@
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from catalogo.models import Panel
+from catalogo.ordering import needs_rebalance, rebalance
+
+
+class Command(BaseCommand):
+    """
+    Reparte de nuevo las posiciones de las páginas de cada capítulo.
+
+    Los movimientos insertan páginas entre dos posiciones vecinas; tras muchos
+    movimientos en el mismo lugar el espacio se agota (ver
+    catalogo/ordering.py). Pensado para correr periódicamente (cron): solo
+    reescribe los capítulos que tienen vecinas demasiado juntas, o todos con
+    --all.
+
+    Ejemplo:
+        python manage.py rebalance_panels --min-gap 16
+    """
+    help = "Reparte las posiciones de las páginas de los capítulos que se quedaron sin espacio."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-gap', type=int, default=16,
+                            help="Distancia mínima entre páginas vecinas antes de repartir el capítulo.")
+        parser.add_argument('--all', action='store_true', help="Reparte todos los capítulos.")
+
+    def handle(self, *args, **options):
+        rows = Panel.objects.order_by('chapter_id', 'position', 'id').values_list('chapter_id', 'position')
+        chapters = [
+            chapter_id for chapter_id, group in groupby(rows.iterator(chunk_size=5000), key=lambda row: row[0])
+            if options['all'] or needs_rebalance([position for _, position in group], options['min_gap'])
+        ]
+
+        updated = 0
+        for chapter_id in chapters:
+            with transaction.atomic():
+                updated += rebalance(chapter_id)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(chapters)} capítulos repartidos ({updated} páginas actualizadas)."
+        ))
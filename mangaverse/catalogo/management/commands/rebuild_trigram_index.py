@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from catalogo.models import Manga, MangaTrigram
+from catalogo.search import trigrams
+
+
+class Command(BaseCommand):
+    """
+    Reconstruye desde cero el índice de trigramas de la búsqueda difusa.
+
+    Necesario tras cargas masivas (bulk_create, loaddata) que no disparan
+    las señales post_save de Manga.
+    """
+    help = "Reconstruye el índice de trigramas (título y autor) de todos los mangas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        MangaTrigram.objects.all().delete()
+
+        rows, total = [], 0
+        for manga_id, titulo, autor in Manga.objects.values_list('id', 'titulo', 'autor').iterator(chunk_size=batch_size):
+            rows.extend(MangaTrigram(manga_id=manga_id, gram=g) for g in trigrams(titulo) | trigrams(autor))
+            total += 1
+            if len(rows) >= batch_size * 20:
+                MangaTrigram.objects.bulk_create(rows, batch_size=batch_size)
+                rows = []
+        MangaTrigram.objects.bulk_create(rows, batch_size=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(f"Índice reconstruido para {total} mangas."))
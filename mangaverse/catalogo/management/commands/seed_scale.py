@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from catalogo.synthetic import seed_scale, SYNTHETIC_PASSWORD
+
+
+class Command(BaseCommand):
+    """
+    Puebla la base de datos con un catálogo sintético a escala.
+
+    Crea usuarios (con Profile), mangas de todos los géneros, arcos,
+    capítulos, páginas, favoritos, seguidores y mensajes, todo con
+    bulk_create en lotes. Los repartos siguen una ley de potencia (--skew):
+    pocos creadores publican mucho, pocos mangas concentran los favoritos y
+    pocas conversaciones concentran los mensajes. Las páginas apuntan a unas
+    pocas imágenes compartidas (--blobs), así que millones de filas no ocupan
+    espacio en disco. Con la misma --seed y los mismos tamaños el resultado es
+    idéntico.
+
+    Los usuarios sintéticos se llaman 'lector<N>' y su contraseña es
+    'mangaverse' (sirven para las pruebas de carga con login).
+
+    Ejemplo (unos 4 millones de filas):
+        python manage.py seed_scale --mangas 50000 --chapters 150000 --pages-per-chapter 20 --messages 500000
+    """
+    help = "Genera un catálogo sintético grande y determinista para pruebas de carga."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--mangas', type=int, default=10000)
+        parser.add_argument('--chapters', type=int, default=100000)
+        parser.add_argument('--chapters-per-arc', type=int, default=12,
+                            help="Capítulos por arco (0: sin arcos).")
+        parser.add_argument('--pages-per-chapter', type=int, default=20,
+                            help="Promedio de páginas por capítulo (0: sin páginas).")
+        parser.add_argument('--blobs', type=int, default=8, help="Imágenes distintas compartidas por las páginas.")
+        parser.add_argument('--favorites', type=int, default=50000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument('--messages', type=int, default=100000)
+        parser.add_argument('--conversations', type=int, default=10000)
+        parser.add_argument('--message-days', type=int, default=365,
+                            help="Días hacia atrás en los que se reparten las fechas de los mensajes.")
+        parser.add_argument('--skew', type=float, default=1.1, help="Exponente de la ley de potencia.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        sizes = seed_scale(
+            users=options['users'], mangas=options['mangas'], chapters=options['chapters'],
+            chapters_per_arc=options['chapters_per_arc'], pages_per_chapter=options['pages_per_chapter'],
+            blobs=options['blobs'], favorites=options['favorites'], follows=options['follows'],
+            messages=options['messages'], conversations=options['conversations'],
+            message_days=options['message_days'],
+            skew=options['skew'], seed=options['seed'], batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
+        elapsed = time.perf_counter() - started
+        rows = sum(sizes.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"{rows} filas en {elapsed:.1f} s ({rows / elapsed:.0f} filas/s). "
+            f"Contraseña de los usuarios: '{SYNTHETIC_PASSWORD}'."
+        ))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from catalogo.cache import bump_all
+from catalogo.images import tile_panel
+from catalogo.models import Chapter, Panel
+
+
+class Command(BaseCommand):
+    """
+    Corta en segmentos (PanelTile) las páginas muy altas ya subidas.
+
+    Las subidas nuevas se cortan en segundo plano al guardarse; este comando
+    procesa las anteriores y las que superan PANEL_TILE_MAX_PIXELS (que no se
+    cortan al subirlas). Por defecto omite las páginas que ya tienen segmentos.
+
+    Ejemplo:
+        python manage.py tile_panels --chapter 12
+    """
+    help = "Genera los segmentos de las páginas muy altas (tiras tipo webtoon)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chapter', type=int, help="Procesa solo las páginas de este capítulo (id).")
+        parser.add_argument('--force', action='store_true', help="Vuelve a cortar también las que ya tienen segmentos.")
+
+    def handle(self, *args, **options):
+        panels = Panel.objects.select_related('chapter__manga').exclude(image='').order_by('id')
+        if options['chapter']:
+            panels = panels.filter(chapter_id=options['chapter'])
+        if not options['force']:
+            panels = panels.filter(tiles__isnull=True)
+
+        tiled, tiles, chapter_ids = 0, 0, set()
+        for panel in panels.iterator(chunk_size=200):
+            created = tile_panel(panel)
+            if created:
+                tiled += 1
+                tiles += created
+                chapter_ids.add(panel.chapter_id)
+        if tiled:
+            # Los capítulos cacheados deben mostrar los segmentos nuevos
+            Chapter.objects.filter(pk__in=chapter_ids).update(updated_at=timezone.now())
+            bump_all()
+        self.stdout.write(self.style.SUCCESS(f"{tiled} páginas cortadas en {tiles} segmentos."))
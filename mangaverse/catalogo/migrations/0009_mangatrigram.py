@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_trigram_index(apps, schema_editor):
+    """Indexa los mangas existentes (el índice nuevo parte vacío)."""
+    from catalogo.search import trigrams
+
+    Manga = apps.get_model('catalogo', 'Manga')
+    MangaTrigram = apps.get_model('catalogo', 'MangaTrigram')
+    rows = []
+    for manga in Manga.objects.all():
+        rows.extend(MangaTrigram(manga=manga, gram=g) for g in trigrams(manga.titulo) | trigrams(manga.autor))
+    MangaTrigram.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0008_alter_arc_options_alter_arc_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MangaTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=3)),
+                ('manga', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='catalogo.manga')),
+            ],
+            options={
+                'unique_together': {('gram', 'manga')},
+            },
+        ),
+        migrations.RunPython(build_trigram_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0009_mangatrigram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MangaStats',
+            fields=[
+                ('manga', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='catalogo.manga')),
+                ('likes', models.PositiveIntegerField(default=0)),
+                ('chapters', models.PositiveIntegerField(default=0)),
+                ('pages', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
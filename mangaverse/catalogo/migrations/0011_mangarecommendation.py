@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0010_mangastats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MangaRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField(default=0)),
+                ('source', models.CharField(choices=[('favorites', 'Favoritos en común'), ('autor', 'Mismo autor'), ('genero', 'Mismo género')], max_length=10)),
+                ('manga', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='catalogo.manga')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalogo.manga')),
+            ],
+            options={
+                'ordering': ['rank'],
+                'unique_together': {('manga', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0011_mangarecommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='manga',
+            name='portada_lqip',
+            field=models.CharField(blank=True, editable=False, max_length=300),
+        ),
+        migrations.AddField(
+            model_name='panel',
+            name='lqip',
+            field=models.CharField(blank=True, editable=False, max_length=300),
+        ),
+    ]
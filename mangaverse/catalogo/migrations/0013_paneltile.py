@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:38
+
+import catalogo.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0012_image_placeholders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PanelTile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('image', models.ImageField(upload_to=catalogo.models.PanelTile.get_upload_path)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('panel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tiles', to='catalogo.panel')),
+            ],
+            options={
+                'ordering': ['index'],
+                'unique_together': {('panel', 'index')},
+            },
+        ),
+    ]
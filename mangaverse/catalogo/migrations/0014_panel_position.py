@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:40
+
+from django.db import migrations, models
+from django.db.models import F
+
+# Mismo valor que catalogo.ordering.POSITION_GAP al crear la migración
+POSITION_GAP = 1024
+
+
+def fill_positions(apps, schema_editor):
+    Panel = apps.get_model('catalogo', 'Panel')
+    Panel.objects.update(position=F('page_number') * POSITION_GAP)
+
+
+def fill_page_numbers(apps, schema_editor):
+    Panel = apps.get_model('catalogo', 'Panel')
+    Panel.objects.update(page_number=F('position') / POSITION_GAP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0013_paneltile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='panel',
+            name='position',
+            field=models.BigIntegerField(default=0, blank=True, verbose_name='Posición',
+                                         help_text='Orden dentro del capítulo (se asigna al final si se deja vacío).'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_positions, fill_page_numbers),
+        migrations.RemoveField(
+            model_name='panel',
+            name='page_number',
+        ),
+        migrations.AlterModelOptions(
+            name='panel',
+            options={'ordering': ['position', 'id']},
+        ),
+        migrations.AddIndex(
+            model_name='panel',
+            index=models.Index(fields=['chapter', 'position'], name='catalogo_pa_chapter_5ba6b5_idx'),
+        ),
+    ]
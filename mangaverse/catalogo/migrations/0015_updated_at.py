@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:15
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_chapters(apps, schema_editor):
+    # Sin historial: un capítulo se considera modificado por última vez al crearse
+    Chapter = apps.get_model('catalogo', 'Chapter')
+    Chapter.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0014_panel_position'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='manga',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='chapter',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_chapters, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,11 @@ from django.db import models
 from django.conf import settings
 from django.utils.text import slugify
 from django.urls import reverse
+from django.utils import timezone
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
 
 # --- DEFINICIÓN DE GÉNEROS (IMPORTANTE: Fuera de la clase) ---
 GENEROS = [
@@ -50,7 +55,12 @@ class Manga(models.Model):
     
     descripcion = models.TextField(blank=True, verbose_name="Sinopsis", help_text="Breve descripción de la trama.")
     portada = models.ImageField(upload_to='portadas/', blank=True, null=True, verbose_name="Portada Oficial")
+    # Placeholder (LQIP) de la portada, ver catalogo/images.py
+    portada_lqip = models.CharField(max_length=300, blank=True, editable=False)
     slug = models.SlugField(max_length=255, unique=True, blank=True, help_text="Identificador único para URLs.")
+    # Último cambio del manga o de sus arcos, capítulos y páginas (ver touch()):
+    # es el Last-Modified de la ficha
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Manga"
@@ -60,6 +70,13 @@ class Manga(models.Model):
     def __str__(self):
         return self.titulo
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Género con el que se leyó: si cambia, se invalidan las cachés de ambos géneros
+        instance._loaded_genero = instance.__dict__.get('genero')
+        return instance
+
     def save(self, *args, **kwargs):
         """Genera slug automáticamente si no existe."""
         if not self.slug:
@@ -70,12 +87,74 @@ class Manga(models.Model):
                 unique_slug = f"{base_slug}-{num}"
                 num += 1
             self.slug = unique_slug
+        # Portada nueva (archivo aún no guardado) o sin placeholder: se recalcula
+        if not self.portada:
+            self.portada_lqip = ''
+        elif not self.portada._committed or not self.portada_lqip:
+            self.portada_lqip = placeholder_for(self.portada)
         super().save(*args, **kwargs)
 
     def get_absolute_url(self):
         return reverse('catalogo:manga-detail', kwargs={'manga_slug': self.slug})
 
 
+class MangaTrigram(models.Model):
+    """
+    Índice de trigramas del título y autor de un manga.
+
+    Cada fila es un trigrama distinto del manga. Permite la búsqueda difusa
+    (tolerante a errores de tipeo) consultando solo las filas de los trigramas
+    buscados, sin recorrer toda la tabla de mangas.
+    """
+    manga = models.ForeignKey(Manga, related_name='trigrams', on_delete=models.CASCADE)
+    gram = models.CharField(max_length=3)
+
+    class Meta:
+        unique_together = ('gram', 'manga')
+
+
+class MangaStats(models.Model):
+    """
+    Contadores precalculados de un manga: likes, capítulos y páginas.
+
+    Se mantienen de forma incremental con señales (ver accounts/stats.py), así
+    los listados y el dashboard no necesitan contar filas relacionadas.
+    """
+    manga = models.OneToOneField(Manga, primary_key=True, related_name='stats', on_delete=models.CASCADE)
+    likes = models.PositiveIntegerField(default=0)
+    chapters = models.PositiveIntegerField(default=0)
+    pages = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Estadísticas de {self.manga_id}"
+
+
+class MangaRecommendation(models.Model):
+    """
+    Manga recomendado para otro ("quienes leyeron esto también leyeron").
+
+    Lo calcula fuera de línea el comando build_recommendations; la ficha del
+    manga solo lee sus filas por el índice (manga, rank).
+    """
+    SOURCES = [
+        ('favorites', 'Favoritos en común'),
+        ('autor', 'Mismo autor'),
+        ('genero', 'Mismo género'),
+    ]
+    manga = models.ForeignKey(Manga, related_name='recommendations', on_delete=models.CASCADE)
+    recommended = models.ForeignKey(Manga, related_name='+', on_delete=models.CASCADE)
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField(default=0)
+    source = models.CharField(max_length=10, choices=SOURCES)
+
+    class Meta:
+        ordering = ['rank']
+        unique_together = ('manga', 'rank')
+
+    def __str__(self):
+        return f"{self.manga_id} → {self.recommended_id} (#{self.rank})"
+
+
 class Arc(models.Model):
     """
     Agrupa capítulos en arcos argumentales (Sagas).
@@ -103,6 +182,8 @@ class Chapter(models.Model):
     chapter_number = models.PositiveIntegerField(verbose_name="Número")
     slug = models.SlugField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Último cambio del capítulo o de sus páginas (ver touch())
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['chapter_number']
@@ -117,18 +198,231 @@ class Chapter(models.Model):
         super().save(*args, **kwargs)
 
 
+class PanelQuerySet(models.QuerySet):
+    def in_reading_order(self):
+        """
+        Páginas en orden de lectura, con su número de página ('page_number')
+        derivado de la posición dentro de cada capítulo.
+        """
+        return self.order_by('chapter_id', 'position', 'id').annotate(
+            page_number=Window(RowNumber(), partition_by=F('chapter_id'), order_by=(F('position'), F('id')))
+        )
+
+
 class Panel(models.Model):
     """
     Imagen individual (página) de un capítulo.
+
+    El orden lo da 'position', una clave dispersa (ver catalogo/ordering.py):
+    mover o borrar una página no renumera las demás.
     """
     chapter = models.ForeignKey(Chapter, related_name='panels', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='manga_panels/')
-    page_number = models.PositiveIntegerField(verbose_name="Número de Página")
+    position = models.BigIntegerField(verbose_name="Posición", blank=True,
+                                      help_text="Orden dentro del capítulo (se asigna al final si se deja vacío).")
+    # Placeholder (LQIP) con las dimensiones de la página, ver catalogo/images.py
+    lqip = models.CharField(max_length=300, blank=True, editable=False)
+
+    objects = PanelQuerySet.as_manager()
 
     class Meta:
-        ordering = ['page_number']
+        ordering = ['position', 'id']
+        indexes = [models.Index(fields=['chapter', 'position'])]
 
     def get_upload_path(instance, filename):
         return f'manga_panels/{instance.chapter.manga.slug}/{instance.chapter.slug}/{filename}'
     
-    image.upload_to = get_upload_path
\ No newline at end of file
+    image.upload_to = get_upload_path
+
+    def save(self, *args, **kwargs):
+        if self.position is None:
+            from .ordering import next_position
+            self.position = next_position(self.chapter_id)
+        new_image = bool(self.image) and not self.image._committed
+        created = self._state.adding
+        if self.image and (new_image or not self.lqip):
+            self.lqip = placeholder_for(self.image)
+        super().save(*args, **kwargs)
+        if new_image:
+            # Las tiras muy altas se cortan en segmentos para el visor (tras el commit)
+            from .images import schedule_tiling
+            schedule_tiling(self, created)
+
+
+class PanelTile(models.Model):
+    """
+    Segmento de altura fija de una página muy alta (tira vertical tipo webtoon).
+
+    El visor muestra los segmentos uno debajo del otro en lugar de la imagen
+    completa, así el navegador no decodifica la tira entera de una vez. Se
+    generan en segundo plano al subir la página (catalogo/images.py,
+    schedule_tiling) o con el comando tile_panels.
+    """
+    panel = models.ForeignKey(Panel, related_name='tiles', on_delete=models.CASCADE)
+    index = models.PositiveIntegerField()
+    image = models.ImageField(upload_to='manga_panels/')
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['index']
+        unique_together = ('panel', 'index')
+
+    def get_upload_path(instance, filename):
+        chapter = instance.panel.chapter
+        return f'manga_panels/{chapter.manga.slug}/{chapter.slug}/tiles/{filename}'
+
+    image.upload_to = get_upload_path
+
+
+def placeholder_for(field_file):
+    """Placeholder de un ImageField, leyendo el archivo subido o el ya guardado."""
+    from .images import compute_placeholder
+    try:
+        if field_file._committed:
+            with field_file.storage.open(field_file.name, 'rb') as fh:
+                return compute_placeholder(fh)
+        return compute_placeholder(field_file.file)
+    except (OSError, ValueError):
+        return ''
+
+
+def touch(chapter_id=None, manga_id=None):
+    """
+    Marca como modificados un capítulo y su manga (updated_at).
+
+    Con solo 'chapter_id' también marca el manga del capítulo. Usa update(),
+    así que no dispara señales ni vuelve a guardar las instancias.
+    """
+    now = timezone.now()
+    if chapter_id is not None:
+        Chapter.objects.filter(pk=chapter_id).update(updated_at=now)
+        if manga_id is None:
+            Manga.objects.filter(chapters=chapter_id).update(updated_at=now)
+            return
+    if manga_id is not None:
+        Manga.objects.filter(pk=manga_id).update(updated_at=now)
+
+
+def deleted_in_cascade(instance, parent, origin=None):
+    """
+    True si 'instance' se borra en cascada al borrar otro objeto (su padre o un ancestro).
+
+    Las vistas cargan el padre antes de borrar (panel.chapter); en cascada
+    Django no lo carga. 'origin' (el argumento de pre_delete/post_delete)
+    cubre el borrado directo sin el padre cargado, como el del admin.
+    """
+    if instance._meta.get_field(parent).is_cached(instance):
+        return False
+    if origin is instance or (isinstance(origin, models.QuerySet) and origin.model is type(instance)):
+        return False
+    return True
+
+
+# --- SEÑALES (SIGNALS) ---
+
+@receiver(post_save, sender=Manga)
+def update_manga_trigrams(sender, instance, update_fields=None, **kwargs):
+    """
+    Mantiene actualizado el índice de trigramas al guardar un Manga.
+
+    Si el guardado no toca 'titulo' ni 'autor' (update_fields explícito),
+    el índice no se recalcula.
+    """
+    if update_fields is not None and not {'titulo', 'autor'} & set(update_fields):
+        return
+    from .search import index_manga_trigrams
+    index_manga_trigrams(instance)
+
+
+# --- INVALIDACIÓN DE CACHÉ (ver catalogo/cache.py) ---
+
+@receiver(post_save, sender=Manga)
+@receiver(post_delete, sender=Manga)
+def invalidate_manga_cache(sender, instance, **kwargs):
+    from .cache import bump, manga_tag, user_tag, genre_tag, CATALOG
+    bump(manga_tag(instance.pk), user_tag(instance.owner_id), genre_tag(instance.genero),
+         genre_tag(getattr(instance, '_loaded_genero', None) or ''), CATALOG)
+
+
+@receiver(post_init, sender=settings.AUTH_USER_MODEL)
+def remember_username(sender, instance, **kwargs):
+    # Nombre con el que se leyó el usuario: si cambia, se invalidan sus mangas
+    instance._loaded_username = instance.__dict__.get('username')
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_cache(sender, instance, created, update_fields=None, **kwargs):
+    """
+    El nombre del dueño aparece en la grilla del catálogo y en la ficha de sus mangas.
+
+    Iniciar sesión (solo 'last_login') no invalida nada; el catálogo solo se
+    invalida si el nombre cambió.
+    """
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    from .cache import bump, manga_tag, user_tag, genre_tag, CATALOG
+    tags = [user_tag(instance.pk)]
+    if instance.username != getattr(instance, '_loaded_username', None):
+        for manga_id, genero in Manga.objects.filter(owner_id=instance.pk).values_list('id', 'genero'):
+            tags += [manga_tag(manga_id), genre_tag(genero)]
+        tags.append(CATALOG)
+    bump(*tags)
+    instance._loaded_username = instance.username
+
+
+@receiver(post_save, sender=Arc)
+@receiver(post_delete, sender=Arc)
+def invalidate_arc_cache(sender, instance, **kwargs):
+    from .cache import bump, manga_tag
+    bump(manga_tag(instance.manga_id))
+
+
+@receiver(post_save, sender=Chapter)
+@receiver(post_delete, sender=Chapter)
+def invalidate_chapter_cache(sender, instance, **kwargs):
+    """Los títulos de capítulos entran en la búsqueda: también cambia el catálogo."""
+    from .cache import bump, manga_tag, chapter_tag, CATALOG
+    bump(manga_tag(instance.manga_id), chapter_tag(instance.pk), CATALOG)
+
+
+@receiver(post_save, sender=Panel)
+@receiver(post_delete, sender=Panel)
+def invalidate_panel_cache(sender, instance, **kwargs):
+    """
+    El visor depende del capítulo; la ficha del manga muestra las páginas por capítulo.
+
+    El manga solo se invalida si el capítulo ya está cargado en la instancia
+    (subidas y borrados desde las vistas): al borrar un capítulo en cascada
+    no se consulta uno por página, y la señal del capítulo ya invalida el manga.
+    """
+    from .cache import bump, manga_tag, chapter_tag
+    chapter_loaded = Panel._meta.get_field('chapter').is_cached(instance)
+    bump(chapter_tag(instance.chapter_id), manga_tag(instance.chapter.manga_id) if chapter_loaded else None)
+
+
+# --- FECHAS DE MODIFICACIÓN (updated_at, ver touch()) ---
+
+@receiver(post_save, sender=Arc)
+@receiver(post_delete, sender=Arc)
+@receiver(post_save, sender=Chapter)
+@receiver(post_delete, sender=Chapter)
+def touch_manga(sender, instance, origin=None, **kwargs):
+    """Al borrar el manga en cascada no se marca una vez por capítulo o arco un manga que desaparece."""
+    if kwargs.get('signal') is post_delete and deleted_in_cascade(instance, 'manga', origin):
+        return
+    touch(manga_id=instance.manga_id)
+
+
+@receiver(post_save, sender=Panel)
+@receiver(post_delete, sender=Panel)
+def touch_chapter(sender, instance, origin=None, **kwargs):
+    """
+    Las páginas cambian el capítulo y su manga.
+
+    Al borrar en cascada no se hace nada: no se escribe una vez por página, y
+    la señal del capítulo ya marca el manga.
+    """
+    if kwargs.get('signal') is post_delete and deleted_in_cascade(instance, 'chapter', origin):
+        return
+    touch(chapter_id=instance.chapter_id)
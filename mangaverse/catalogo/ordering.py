@@ -0,0 +1,128 @@
+"""
+Orden de las páginas (Panel) de un capítulo con claves dispersas.
+
+Cada página tiene una 'position' entera; las posiciones se asignan separadas
+por POSITION_GAP, así que mover una página es escribir una sola fila con un
+valor entre el de sus nuevas vecinas, y borrar una no obliga a renumerar el
+resto. El número de página que se muestra se deriva del orden
+(Panel.objects.in_reading_order()).
+
+Cuando dos vecinas quedan sin espacio entre ellas se reparte de nuevo todo el
+capítulo (rebalance). El comando rebalance_panels lo hace de forma periódica.
+"""
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Chapter, Panel, touch
+from .cache import bump, chapter_tag
+
+POSITION_GAP = 1024
+
+
+def next_position(chapter_id):
+    """Posición para una página agregada al final del capítulo."""
+    last = Panel.objects.filter(chapter_id=chapter_id).aggregate(last=Max('position'))['last']
+    return POSITION_GAP if last is None else last + POSITION_GAP
+
+
+def rebalance(chapter_id):
+    """
+    Reparte las posiciones del capítulo cada POSITION_GAP, conservando el orden.
+
+    Solo escribe las filas cuya posición cambia. Retorna cuántas se actualizaron.
+    """
+    panels = list(Panel.objects.filter(chapter_id=chapter_id).order_by('position', 'id').only('id', 'position'))
+    changed = []
+    for index, panel in enumerate(panels, start=1):
+        if panel.position != index * POSITION_GAP:
+            panel.position = index * POSITION_GAP
+            changed.append(panel)
+    Panel.objects.bulk_update(changed, ['position'], batch_size=500)
+    if changed:
+        touch(chapter_id=chapter_id)
+        bump(chapter_tag(chapter_id))
+    return len(changed)
+
+
+def needs_rebalance(positions, min_gap=2):
+    """Indica si dos posiciones consecutivas (ya ordenadas) están a menos de 'min_gap'."""
+    return any(b - a < min_gap for a, b in zip(positions, positions[1:]))
+
+
+class InvalidMove(ValueError):
+    pass
+
+
+def move_panels(chapter, panel_ids, after_id=None):
+    """
+    Mueve las páginas 'panel_ids' (en ese orden) justo después de 'after_id'.
+
+    Con after_id=None las deja al principio del capítulo; pasar todas las
+    páginas del capítulo equivale a fijar su orden completo. Todo ocurre en
+    una transacción: o se aplica el movimiento entero o nada. Escribe solo las
+    filas movidas, salvo que no haya espacio entre las vecinas y haga falta
+    repartir el capítulo.
+
+    Lanza InvalidMove si alguna página no pertenece al capítulo.
+    """
+    panel_ids = list(dict.fromkeys(panel_ids))
+    if not panel_ids or (after_id is not None and after_id in panel_ids):
+        raise InvalidMove("Movimiento inválido.")
+
+    with transaction.atomic():
+        # Serializa los reordenamientos concurrentes del mismo capítulo
+        Chapter.objects.select_for_update().filter(pk=chapter.pk).exists()
+        moving = Panel.objects.filter(chapter=chapter, id__in=panel_ids).in_bulk()
+        if len(moving) != len(panel_ids):
+            raise InvalidMove("Alguna página no pertenece al capítulo.")
+
+        for attempt in range(2):
+            lower, upper = _neighbors(chapter, panel_ids, after_id)
+            count = len(panel_ids)
+            if lower is None and upper is None:
+                positions = [POSITION_GAP * (i + 1) for i in range(count)]
+            elif lower is None:
+                positions = [upper - POSITION_GAP * (count - i) for i in range(count)]
+            elif upper is None:
+                positions = [lower + POSITION_GAP * (i + 1) for i in range(count)]
+            else:
+                step = (upper - lower) // (count + 1)
+                if step < 1:
+                    if attempt:
+                        raise InvalidMove("No se pudo ubicar la página.")
+                    rebalance(chapter.pk)
+                    # Las posiciones cargadas antes de repartir ya no sirven para comparar
+                    moving = Panel.objects.filter(chapter=chapter, id__in=panel_ids).in_bulk()
+                    continue
+                positions = [lower + step * (i + 1) for i in range(count)]
+            break
+
+        panels = []
+        for panel_id, position in zip(panel_ids, positions):
+            panel = moving[panel_id]
+            if panel.position != position:
+                panel.position = position
+                panels.append(panel)
+        Panel.objects.bulk_update(panels, ['position'])
+        if panels:
+            # bulk_update no dispara señales: updated_at y la caché del capítulo se actualizan aquí
+            touch(chapter_id=chapter.pk)
+            bump(chapter_tag(chapter.pk))
+    return len(panels)
+
+
+def _neighbors(chapter, panel_ids, after_id):
+    """Posiciones (anterior, siguiente) entre las que se insertan las páginas movidas."""
+    others = Panel.objects.filter(chapter=chapter).exclude(id__in=panel_ids).order_by('position', 'id')
+    if after_id is None:
+        first = others.values_list('position', flat=True).first()
+        return None, first
+    after = others.filter(pk=after_id).values_list('position', 'id').first()
+    if after is None:
+        raise InvalidMove("La página de referencia no pertenece al capítulo.")
+    position, pk = after
+    following = (
+        others.filter(position__gte=position).exclude(position=position, id__lte=pk)
+        .values_list('position', flat=True).first()
+    )
+    return position, following
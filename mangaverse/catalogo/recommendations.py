@@ -0,0 +1,216 @@
+"""
+Recomendaciones item a item ("quienes leyeron esto también leyeron").
+
+Se calculan fuera de línea (comando build_recommendations) a partir de
+Profile.favorites:
+
+1. Se cargan las aristas (perfil, manga) en arreglos NumPy.
+2. Se genera la matriz dispersa de co-ocurrencias (cuántos lectores tienen a
+   la vez los mangas i y j) por bloques de usuarios, como pares codificados
+   i * n + j que se agregan ordenando y sumando (sin bucles en Python).
+3. La similitud es el coseno: co(i, j) / sqrt(n_i * n_j).
+4. Se conservan los top-K por manga; si faltan, se completan con mangas del
+   mismo autor y luego del mismo género, por popularidad.
+"""
+import itertools
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models.functions import Coalesce
+
+from accounts.models import Profile
+from .models import Manga, MangaRecommendation
+from .cache import bump, recommendations_tag
+
+
+def load_favorites(chunk_size=10000):
+    """Aristas de favoritos como dos arreglos (profile_ids, manga_ids)."""
+    Favorite = Profile.favorites.through
+    rows = Favorite.objects.order_by().values_list('profile_id', 'manga_id').iterator(chunk_size=chunk_size)
+    flat = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64)
+    edges = flat.reshape(-1, 2)
+    return edges[:, 0], edges[:, 1]
+
+
+def _merge(keys, weights):
+    """Agrupa claves repetidas sumando sus pesos (keys queda ordenado y sin duplicados)."""
+    if not len(keys):
+        return keys, weights
+    order = np.argsort(keys, kind='stable')
+    keys, weights = keys[order], weights[order]
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+    return keys[starts], np.add.reduceat(weights, starts)
+
+
+def cooccurrence(users, items, n_items, max_user_favorites=1000, chunk_pairs=5_000_000):
+    """
+    Co-ocurrencias de pares de mangas (i < j) entre los favoritos de cada lector.
+
+    'items' son índices densos 0..n_items-1. Los lectores con un solo favorito
+    no aportan pares y los que superan 'max_user_favorites' se omiten (son
+    pocos, generan la mayoría de los pares y casi no informan). Los lectores se
+    procesan en bloques de hasta 'chunk_pairs' pares para acotar la memoria.
+
+    Retorna (i, j, conteo) como arreglos.
+    """
+    order = np.argsort(users, kind='stable')
+    users, items = users[order], items[order]
+    _, starts, counts = np.unique(users, return_index=True, return_counts=True)
+    keep = (counts >= 2) & (counts <= max_user_favorites)
+    starts, counts = starts[keep], counts[keep]
+
+    # Bloques consecutivos de lectores con hasta 'chunk_pairs' pares cada uno
+    pairs = np.cumsum(counts * counts)
+    block = (pairs - 1) // chunk_pairs
+    cuts = np.concatenate(([0], np.flatnonzero(np.diff(block)) + 1, [len(counts)]))
+
+    partial_keys, partial_weights = [], []
+    for a, b in zip(cuts[:-1], cuts[1:]):
+        if a == b:
+            continue
+        g_starts, g_counts = starts[a:b], counts[a:b]
+
+        # Índices de las aristas del bloque y, por cada una, el inicio y tamaño de su grupo
+        edge_group_start = np.repeat(g_starts, g_counts)
+        edge_deg = np.repeat(g_counts, g_counts)
+        edge_idx = edge_group_start + (np.arange(g_counts.sum()) - np.repeat(np.cumsum(g_counts) - g_counts, g_counts))
+
+        # Cada arista se empareja con todas las de su lector (producto cartesiano por grupo)
+        left = np.repeat(items[edge_idx], edge_deg)
+        offsets = np.arange(edge_deg.sum()) - np.repeat(np.cumsum(edge_deg) - edge_deg, edge_deg)
+        right = items[np.repeat(edge_group_start, edge_deg) + offsets]
+        mask = left < right
+
+        chunk_keys = left[mask] * n_items + right[mask]
+        chunk_keys, chunk_weights = _merge(chunk_keys, np.ones(len(chunk_keys), dtype=np.int64))
+        partial_keys.append(chunk_keys)
+        partial_weights.append(chunk_weights)
+
+    if not partial_keys:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    keys, weights = _merge(np.concatenate(partial_keys), np.concatenate(partial_weights))
+    return keys // n_items, keys % n_items, weights
+
+
+def top_k_similar(users, items, k=8, min_common=2, **kwargs):
+    """
+    Top-K mangas más similares (coseno) para cada manga con favoritos.
+
+    Retorna {manga_id: [(manga_id_recomendado, score), ...]} ordenado por score.
+    """
+    if not len(items):
+        return {}
+    manga_ids, dense = np.unique(items, return_inverse=True)
+    n = len(manga_ids)
+    i, j, co = cooccurrence(users, dense, n, **kwargs)
+    keep = co >= min_common
+    i, j, co = i[keep], j[keep], co[keep]
+
+    popularity = np.bincount(dense, minlength=n).astype(np.float64)
+    score = co / np.sqrt(popularity[i] * popularity[j])
+
+    # La matriz es simétrica: cada par aporta una recomendación en cada sentido
+    src = np.concatenate((i, j))
+    dst = np.concatenate((j, i))
+    score = np.concatenate((score, score))
+
+    order = np.lexsort((dst, -score, src))
+    src, dst, score = src[order], dst[order], score[order]
+    group_start = np.concatenate(([0], np.flatnonzero(np.diff(src)) + 1))
+    rank = np.arange(len(src)) - np.repeat(group_start, np.diff(np.append(group_start, len(src))))
+    top = rank < k
+    src, dst, score = manga_ids[src[top]], manga_ids[dst[top]], score[top]
+
+    result = defaultdict(list)
+    for a, b, s in zip(src.tolist(), dst.tolist(), score.tolist()):
+        result[a].append((b, s))
+    return result
+
+
+def _fallback_candidates(k):
+    """
+    Candidatos de relleno: por autor y por género, del más al menos popular.
+
+    Guarda como máximo 2k + 1 por grupo (lo justo para completar k excluyendo
+    al propio manga y a los ya recomendados).
+    """
+    rows = (
+        Manga.objects.annotate(likes=Coalesce('stats__likes', 0))
+        .order_by('-likes', 'id')
+        .values_list('id', 'autor', 'genero')
+    )
+    by_autor, by_genero, mangas = defaultdict(list), defaultdict(list), []
+    limit = 2 * k + 1
+    for manga_id, autor, genero in rows.iterator(chunk_size=10000):
+        mangas.append((manga_id, autor, genero))
+        if len(by_autor[autor]) < limit:
+            by_autor[autor].append(manga_id)
+        if len(by_genero[genero]) < limit:
+            by_genero[genero].append(manga_id)
+    return mangas, by_autor, by_genero
+
+
+def build_recommendations(k=8, min_common=2, max_user_favorites=1000, chunk_pairs=5_000_000,
+                          batch_size=2000, log=None):
+    """
+    Recalcula y reemplaza todas las filas de MangaRecommendation.
+
+    Retorna un diccionario con la cantidad de aristas leídas y de
+    recomendaciones guardadas por fuente.
+    """
+    log = log or (lambda msg: None)
+    users, items = load_favorites()
+    log(f"{len(items)} favoritos cargados.")
+    similar = top_k_similar(users, items, k=k, min_common=min_common,
+                            max_user_favorites=max_user_favorites, chunk_pairs=chunk_pairs)
+    log(f"Similitudes calculadas para {len(similar)} mangas.")
+
+    mangas, by_autor, by_genero = _fallback_candidates(k)
+    totals = {'edges': int(len(items)), 'favorites': 0, 'autor': 0, 'genero': 0}
+
+    def rows():
+        for manga_id, autor, genero in mangas:
+            chosen = similar.get(manga_id, [])
+            recs = [(other, score, 'favorites') for other, score in chosen]
+            seen = {manga_id} | {other for other, _ in chosen}
+            for source, candidates in (('autor', by_autor[autor]), ('genero', by_genero[genero])):
+                for other in candidates:
+                    if len(recs) >= k:
+                        break
+                    if other not in seen:
+                        seen.add(other)
+                        recs.append((other, 0.0, source))
+            for rank, (other, score, source) in enumerate(recs, start=1):
+                totals[source] += 1
+                yield MangaRecommendation(manga_id=manga_id, recommended_id=other, rank=rank,
+                                          score=round(score, 6), source=source)
+
+    with transaction.atomic():
+        # Solo se invalidan las fichas cuyas recomendaciones cambian
+        previous = _current_lists()
+        MangaRecommendation.objects.all().delete()
+        batch = []
+        current = defaultdict(list)
+        for rec in rows():
+            batch.append(rec)
+            current[rec.manga_id].append((rec.recommended_id, rec.source))
+            if len(batch) >= batch_size:
+                MangaRecommendation.objects.bulk_create(batch)
+                batch = []
+        MangaRecommendation.objects.bulk_create(batch)
+        changed = {manga_id for manga_id in previous.keys() | current.keys()
+                   if previous.get(manga_id) != current.get(manga_id)}
+        bump(*(recommendations_tag(manga_id) for manga_id in changed))
+    totals['changed'] = len(changed)
+    return totals
+
+
+def _current_lists():
+    """Recomendaciones guardadas: {manga_id: [(recomendado, fuente), ...]} en orden de rank."""
+    lists = defaultdict(list)
+    rows = MangaRecommendation.objects.order_by('manga_id', 'rank').values_list('manga_id', 'recommended_id', 'source')
+    for manga_id, recommended_id, source in rows.iterator(chunk_size=10000):
+        lists[manga_id].append((recommended_id, source))
+    return lists
@@ -0,0 +1,158 @@
+import math
+import re
+import unicodedata
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Count, Q
+
+from .cache import cached, CATALOG
+from .models import Manga, MangaTrigram, Chapter, GENEROS
+
+# Similitud mínima (0-1) para aceptar un resultado de la búsqueda difusa
+FUZZY_THRESHOLD = getattr(settings, 'SEARCH_FUZZY_THRESHOLD', 0.3)
+
+# Máximo de candidatos que se leen del índice antes de calcular la similitud exacta
+FUZZY_CANDIDATES = 200
+
+
+def normalize_query(query):
+    """
+    Normaliza el texto buscado para usarlo como clave de caché.
+
+    Colapsa espacios y pasa a minúsculas, de modo que "  One  Piece" y
+    "one piece" compartan los mismos conteos cacheados.
+    """
+    return ' '.join((query or '').split()).lower()
+
+
+def manga_search_queryset(query):
+    """
+    Construye el queryset de mangas que coinciden con la búsqueda.
+
+    Busca en título, descripción, autor y en los títulos de capítulos.
+    La coincidencia por capítulo se resuelve con una subconsulta, por lo que
+    no hace falta DISTINCT (no se generan filas duplicadas).
+    """
+    chapter_manga_ids = Chapter.objects.filter(title__icontains=query).values('manga_id')
+    return Manga.objects.filter(
+        Q(titulo__icontains=query) |
+        Q(descripcion__icontains=query) |
+        Q(autor__icontains=query) |
+        Q(id__in=chapter_manga_ids)
+    )
+
+
+def genre_facets(query=''):
+    """
+    Retorna los conteos por género de una búsqueda (o del catálogo completo).
+
+    Se calcula con una única consulta agrupada (GROUP BY genero) y se cachea
+    por texto normalizado hasta que cambie el catálogo. El resultado es un
+    diccionario {'total': int, 'counts': {codigo: int}} que sirve tanto para
+    pintar los filtros como para alimentar el conteo del paginador.
+    """
+    def compute():
+        qs = manga_search_queryset(query) if query else Manga.objects.all()
+        rows = qs.order_by().values('genero').annotate(total=Count('id'))
+        counts = {row['genero']: row['total'] for row in rows}
+        return {'total': sum(counts.values()), 'counts': counts}
+
+    return cached('catalogo:facets', [CATALOG], compute, normalize_query(query))
+
+
+def genre_choices_with_counts(facets):
+    """Combina GENEROS con los conteos, omitiendo los géneros sin resultados."""
+    counts = facets['counts']
+    return [(codigo, nombre, counts[codigo]) for codigo, nombre in GENEROS if counts.get(codigo)]
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginador que recibe el total ya calculado.
+
+    Evita el SELECT COUNT(*) propio de Paginator cuando el total ya se obtuvo
+    de los conteos por género.
+    """
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
+
+# --------------------------
+# BÚSQUEDA DIFUSA (TRIGRAMAS)
+# --------------------------
+
+def trigrams(text):
+    """
+    Descompone un texto en su conjunto de trigramas.
+
+    Quita tildes y mayúsculas, y rellena cada palabra con espacios
+    ("  palabra ") igual que pg_trgm, para que los inicios de palabra pesen más.
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    grams = set()
+    for word in re.findall(r'\w+', text):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def index_manga_trigrams(manga):
+    """Regenera las filas de MangaTrigram de un manga (título + autor)."""
+    grams = trigrams(manga.titulo) | trigrams(manga.autor)
+    MangaTrigram.objects.filter(manga=manga).delete()
+    MangaTrigram.objects.bulk_create([MangaTrigram(manga=manga, gram=g) for g in grams])
+
+
+def _similarity(query_grams, text):
+    """
+    Similitud (Jaccard) entre la búsqueda y un texto.
+
+    Se compara contra el texto completo y contra cada palabra por separado,
+    para que "Shingeky" encuentre "Shingeki no Kyojin" aunque el título sea largo.
+    """
+    best = 0.0
+    for chunk in [text] + (text or '').split():
+        grams = trigrams(chunk)
+        if grams:
+            best = max(best, len(query_grams & grams) / len(query_grams | grams))
+    return best
+
+
+def fuzzy_search(query, limit=48, threshold=None):
+    """
+    Busca mangas por título o autor tolerando errores de tipeo.
+
+    1. Cuenta, con una consulta agrupada sobre el índice (gram, manga), cuántos
+       trigramas de la búsqueda comparte cada manga. Solo se leen las filas de
+       esos trigramas, nunca la tabla completa.
+    2. Descarta los candidatos que no pueden alcanzar el umbral.
+    3. Calcula la similitud real y ordena de mayor a menor.
+
+    Retorna una lista de Manga con el atributo extra 'similarity'.
+    """
+    threshold = FUZZY_THRESHOLD if threshold is None else threshold
+    query_grams = trigrams(query)
+    if not query_grams:
+        return []
+
+    # Una palabra del título con similitud >= umbral comparte al menos esta cantidad
+    min_hits = max(1, math.ceil(threshold * len(query_grams) / (1 + threshold)))
+    candidates = (
+        MangaTrigram.objects.filter(gram__in=query_grams)
+        .values('manga_id')
+        .annotate(hits=Count('gram'))
+        .filter(hits__gte=min_hits)
+        .order_by('-hits')[:FUZZY_CANDIDATES]
+    )
+    mangas = Manga.objects.in_bulk([row['manga_id'] for row in candidates])
+
+    results = []
+    for manga in mangas.values():
+        manga.similarity = max(_similarity(query_grams, manga.titulo), _similarity(query_grams, manga.autor))
+        if manga.similarity >= threshold:
+            results.append(manga)
+    results.sort(key=lambda m: (-m.similarity, m.titulo))
+    return results[:limit]
@@ -0,0 +1,409 @@
+"""
+Generador de catálogos sintéticos para benchmarks y pruebas de escala.
+
+Todo se inserta con bulk_create en lotes y de forma determinista a partir de
+una semilla, de modo que dos corridas con los mismos parámetros producen
+exactamente los mismos datos y sus tiempos son comparables.
+
+seed_catalog crea usuarios, mangas, capítulos, favoritos y seguidores;
+seed_scale agrega sobre eso arcos, páginas y mensajes para pruebas de carga.
+"""
+import io
+import itertools
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Max, IntegerField
+from django.db.models.functions import Cast, Substr
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from accounts.models import Profile, Message, Conversation
+from .cache import bump_all
+from .images import compute_placeholder
+from .models import Manga, Arc, Chapter, Panel, GENEROS
+from .ordering import POSITION_GAP
+
+# Contraseña común de los usuarios sintéticos (útil para pruebas de carga con login)
+SYNTHETIC_PASSWORD = 'mangaverse'
+
+SILABAS = ['ka', 'shi', 'no', 'ki', 'yo', 'jin', 'ber', 'sek', 'ru', 'to', 'mi', 'ra', 'dra',
+           'gon', 'ten', 'sei', 'ha', 'na', 'ko', 'ma', 'zen', 'ri', 'tsu', 'ya', 'hi', 'ro']
+
+
+def zipf_cum_weights(n, skew):
+    """Pesos acumulados de una ley de potencia: el elemento de rango r pesa 1 / r^skew."""
+    return list(itertools.accumulate(1.0 / (rank ** skew) for rank in range(1, n + 1)))
+
+
+def _palabra(rng):
+    return ''.join(rng.choice(SILABAS) for _ in range(rng.randint(2, 4)))
+
+
+def _titulo(rng):
+    return ' '.join(_palabra(rng).capitalize() for _ in range(rng.randint(1, 3)))
+
+
+def _repartir(total, n, skew, rng):
+    """Reparte 'total' elementos entre n grupos siguiendo una ley de potencia (mínimo 1 por grupo)."""
+    if n == 0:
+        return []
+    pesos = [1.0 / (rank ** skew) for rank in range(1, n + 1)]
+    rng.shuffle(pesos)
+    suma = sum(pesos)
+    restante = max(total - n, 0)
+    return [1 + int(restante * p / suma) for p in pesos]
+
+
+def _siguiente_sufijo(queryset, field, prefix):
+    """
+    Primer número libre para nombres '<prefix><n>' (usuarios y slugs sintéticos).
+
+    Continúa desde el mayor sufijo existente: con count() las corridas
+    repetidas o los borrados previos generarían nombres que ya existen.
+    """
+    last = queryset.filter(**{f'{field}__regex': rf'^{prefix}[0-9]+$'}).aggregate(
+        last=Max(Cast(Substr(field, len(prefix) + 1), IntegerField()))
+    )['last']
+    return 0 if last is None else last + 1
+
+
+def _en_lotes(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        lote = list(itertools.islice(iterator, size))
+        if not lote:
+            return
+        yield lote
+
+
+@transaction.atomic
+def seed_catalog(users=100, mangas=1000, chapters=10000, favorites=5000, follows=1000,
+                 skew=1.1, seed=42, batch_size=2000, log=None, chapters_per_arc=0, rebuild=True):
+    """
+    Puebla la base de datos con un catálogo sintético.
+
+    Args:
+        users: Usuarios a crear (cada uno con su Profile).
+        mangas: Mangas, repartidos entre los usuarios con sesgo (pocos creadores publican mucho).
+        chapters: Capítulos totales, repartidos entre los mangas con sesgo.
+        favorites: Relaciones Profile.favorites (los mangas populares concentran los likes).
+        follows: Relaciones Profile.following (los creadores populares concentran seguidores).
+        skew: Exponente de la ley de potencia usada en todos los repartos.
+        seed: Semilla del generador aleatorio.
+        batch_size: Tamaño de lote de bulk_create.
+        log: Función opcional para reportar avance (ej: self.stdout.write).
+        chapters_per_arc: Si es mayor que 0, agrupa los capítulos de cada manga en arcos de ese tamaño.
+        rebuild: Reconstruye al final el índice de búsqueda y las estadísticas
+            (seed_scale lo desactiva para hacerlo una sola vez, al terminar).
+
+    Retorna un diccionario con la cantidad de filas creadas por tipo.
+    """
+    log = log or (lambda msg: None)
+    rng = random.Random(seed)
+    User = get_user_model()
+
+    # --- USUARIOS Y PERFILES (bulk_create no dispara la señal que crea el Profile) ---
+    password = make_password(SYNTHETIC_PASSWORD)
+    offset = _siguiente_sufijo(User.objects.all(), 'username', 'lector')
+    User.objects.bulk_create(
+        (User(username=f'lector{offset + i}', email=f'lector{offset + i}@example.com', password=password)
+         for i in range(users)),
+        batch_size=batch_size,
+    )
+    user_ids = list(User.objects.filter(username__startswith='lector').order_by('-id').values_list('id', flat=True)[:users])
+    user_ids.reverse()
+    Profile.objects.bulk_create((Profile(user_id=uid) for uid in user_ids), batch_size=batch_size)
+    profile_ids = dict(Profile.objects.filter(user_id__in=user_ids).values_list('user_id', 'id'))
+    log(f"{users} usuarios creados.")
+
+    # --- MANGAS ---
+    owners_cum = zipf_cum_weights(len(user_ids), skew)
+    generos = [codigo for codigo, _ in GENEROS]
+    manga_offset = _siguiente_sufijo(Manga.objects.all(), 'slug', 'sintetico-')
+
+    def mangas_gen():
+        for i in range(mangas):
+            titulo = _titulo(rng)
+            yield Manga(
+                owner_id=rng.choices(user_ids, cum_weights=owners_cum)[0],
+                titulo=titulo,
+                autor=f'{_palabra(rng).capitalize()} {_palabra(rng).capitalize()}',
+                genero=rng.choice(generos),
+                descripcion=' '.join(_palabra(rng) for _ in range(rng.randint(10, 40))),
+                slug=f'sintetico-{manga_offset + i}',
+            )
+
+    for lote in _en_lotes(mangas_gen(), batch_size):
+        Manga.objects.bulk_create(lote)
+    manga_ids = list(Manga.objects.filter(slug__startswith='sintetico-').order_by('-id').values_list('id', flat=True)[:mangas])
+    manga_ids.reverse()
+    log(f"{mangas} mangas creados.")
+
+    cantidades = _repartir(chapters, len(manga_ids), skew, rng)
+
+    # --- ARCOS (bloques de capítulos consecutivos) ---
+    arc_ids = {}
+    if chapters_per_arc > 0:
+        def arcs_gen():
+            for manga_id, cantidad in zip(manga_ids, cantidades):
+                for orden in range(1, (cantidad - 1) // chapters_per_arc + 2):
+                    yield Arc(manga_id=manga_id, title=f'Arco {orden}', order=orden)
+
+        for lote in _en_lotes(arcs_gen(), batch_size):
+            Arc.objects.bulk_create(lote)
+        arc_ids = {
+            (manga_id, orden): arc_id
+            for manga_id, orden, arc_id in Arc.objects.filter(
+                manga_id__gte=manga_ids[0], manga__slug__startswith='sintetico-'
+            ).values_list('manga_id', 'order', 'id')
+        } if manga_ids else {}
+        log(f"{len(arc_ids)} arcos creados.")
+
+    # --- CAPÍTULOS ---
+    def chapters_gen():
+        for manga_id, cantidad in zip(manga_ids, cantidades):
+            for numero in range(1, cantidad + 1):
+                arc_id = arc_ids.get((manga_id, (numero - 1) // chapters_per_arc + 1)) if arc_ids else None
+                yield Chapter(manga_id=manga_id, arc_id=arc_id, title=f'{_palabra(rng).capitalize()} {numero}',
+                              chapter_number=numero, slug=f'capitulo-{numero}')
+
+    total_chapters = 0
+    for lote in _en_lotes(chapters_gen(), batch_size):
+        Chapter.objects.bulk_create(lote)
+        total_chapters += len(lote)
+    log(f"{total_chapters} capítulos creados.")
+
+    # --- FAVORITOS (popularidad sesgada, independiente del orden de creación) ---
+    populares = manga_ids[:]
+    rng.shuffle(populares)
+    manga_cum = zipf_cum_weights(len(populares), skew)
+    lectores_cum = zipf_cum_weights(len(user_ids), skew)
+    pares = set(zip(
+        rng.choices(user_ids, cum_weights=lectores_cum, k=favorites),
+        rng.choices(populares, cum_weights=manga_cum, k=favorites),
+    ))
+    Favorite = Profile.favorites.through
+    Favorite.objects.bulk_create(
+        (Favorite(profile_id=profile_ids[uid], manga_id=mid) for uid, mid in pares),
+        batch_size=batch_size, ignore_conflicts=True,
+    )
+    log(f"{len(pares)} favoritos creados.")
+
+    # --- SEGUIDORES (los creadores con más obras concentran seguidores) ---
+    seguidos = [profile_ids[uid] for uid in user_ids]
+    seguidos_cum = zipf_cum_weights(len(seguidos), skew)
+    seguidores = rng.choices(seguidos, k=follows)
+    pares_follow = {
+        (a, b) for a, b in zip(seguidores, rng.choices(seguidos, cum_weights=seguidos_cum, k=follows)) if a != b
+    }
+    Follow = Profile.following.through
+    Follow.objects.bulk_create(
+        (Follow(from_profile_id=a, to_profile_id=b) for a, b in pares_follow),
+        batch_size=batch_size, ignore_conflicts=True,
+    )
+    log(f"{len(pares_follow)} seguimientos creados.")
+
+    if rebuild:
+        rebuild_derived(batch_size)
+
+    return {
+        'users': users,
+        'mangas': mangas,
+        'arcs': len(arc_ids),
+        'chapters': total_chapters,
+        'favorites': len(pares),
+        'follows': len(pares_follow),
+    }
+
+
+def rebuild_derived(batch_size=2000):
+    """
+    Reconstruye los datos derivados que mantienen las señales.
+
+    bulk_create no dispara señales: el índice de búsqueda difusa y las
+    estadísticas se reconstruyen aparte, y la caché se invalida completa.
+    """
+    call_command('rebuild_trigram_index', batch_size=batch_size, stdout=io.StringIO())
+    call_command('rebuild_stats', batch_size=batch_size, stdout=io.StringIO())
+    bump_all()
+
+
+# --------------------------
+# ESCALA: PÁGINAS Y MENSAJES
+# --------------------------
+
+def panel_blobs(count, seed=42):
+    """
+    Imágenes de página compartidas por todas las páginas sintéticas.
+
+    Genera 'count' páginas en blanco y negro con viñetas al azar y las guarda
+    una sola vez en el storage (si ya existen, las reutiliza). Retorna una
+    lista de (nombre, placeholder). Ninguna señal borra el archivo al
+    eliminar un Panel, así que compartirlo entre millones de filas es seguro.
+    """
+    rng = random.Random(seed)
+    blobs = []
+    for i in range(1, count + 1):
+        name = f'manga_panels/sintetico/pagina-{i}.jpg'
+        if not default_storage.exists(name):
+            image = Image.new('L', (800, 1150), 255)
+            draw = ImageDraw.Draw(image)
+            top = 30
+            while top < 1090:
+                bottom = min(top + rng.randint(180, 420), 1120)
+                split = rng.randint(200, 600) if rng.random() < 0.5 else None
+                for left, right in ([(30, split - 10), (split + 10, 770)] if split else [(30, 770)]):
+                    draw.rectangle((left, top, right, bottom), outline=0, width=4,
+                                   fill=rng.randint(200, 255))
+                top = bottom + 20
+            draw.text((380, 1125), str(i), fill=0)
+            buffer = io.BytesIO()
+            image.save(buffer, format='JPEG', quality=80)
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+        with default_storage.open(name, 'rb') as fh:
+            blobs.append((name, compute_placeholder(fh)))
+    return blobs
+
+
+def seed_panels(chapter_ids, pages_per_chapter, blobs, rng, batch_size=2000):
+    """
+    Crea entre la mitad y 1,5 veces 'pages_per_chapter' páginas por capítulo.
+
+    Las páginas apuntan a los archivos compartidos de 'blobs' (con su
+    placeholder ya calculado) y reciben posiciones separadas por POSITION_GAP,
+    como las que asigna Panel.save. Retorna la cantidad creada.
+    """
+    low, high = max(1, pages_per_chapter // 2), max(1, pages_per_chapter * 3 // 2)
+
+    def panels_gen():
+        for chapter_id in chapter_ids:
+            for n in range(1, rng.randint(low, high) + 1):
+                name, lqip = blobs[rng.randrange(len(blobs))]
+                yield Panel(chapter_id=chapter_id, image=name, lqip=lqip, position=n * POSITION_GAP)
+
+    total = 0
+    for lote in _en_lotes(panels_gen(), batch_size):
+        Panel.objects.bulk_create(lote)
+        total += len(lote)
+    return total
+
+
+def seed_messages(user_ids, messages, conversations, skew, rng, batch_size=2000, read_ratio=0.9, days=365):
+    """
+    Crea 'messages' mensajes repartidos entre 'conversations' pares de usuarios.
+
+    Los usuarios populares reciben más conversaciones y las conversaciones
+    largas concentran la mayoría de los mensajes (ley de potencia). Cada
+    conversación tiene su propio periodo de actividad dentro de los últimos
+    'days' días, así la bandeja de entrada tiene un orden real y el archivado
+    (archive_messages) encuentra mensajes antiguos. Como bulk_create no
+    dispara la señal que mantiene Conversation, los resúmenes de la bandeja
+    de entrada se arman aquí. Retorna (mensajes, conversaciones).
+    """
+    if len(user_ids) < 2 or messages <= 0:
+        return 0, 0
+    populares_cum = zipf_cum_weights(len(user_ids), skew)
+    pares = set()
+    for _ in range(conversations * 3):
+        if len(pares) >= conversations:
+            break
+        a = rng.choice(user_ids)
+        b = rng.choices(user_ids, cum_weights=populares_cum)[0]
+        if a != b:
+            pares.add(tuple(sorted((a, b))))
+    pares = sorted(pares)
+
+    # Resumen por par: último remitente, vista previa y no leídos de cada lado
+    resumen = {}
+    before = Message.objects.aggregate(last=Max('id'))['last'] or 0
+
+    now = timezone.now()
+    window = days * 24 * 60 * 60
+
+    def messages_gen():
+        for (a, b), cantidad in zip(pares, _repartir(messages, len(pares), skew, rng)):
+            conv = resumen[(a, b)] = Conversation(user_a_id=a, user_b_id=b)
+            # Segundos antes de 'now', del más antiguo al más reciente
+            desde, hasta = sorted((rng.uniform(0, window), rng.uniform(0, window)), reverse=True)
+            edades = sorted((rng.uniform(hasta, desde) for _ in range(cantidad)), reverse=True)
+            for edad in edades:
+                timestamp = now - timedelta(seconds=edad)
+                sender, recipient = (a, b) if rng.random() < 0.5 else (b, a)
+                content = ' '.join(_palabra(rng) for _ in range(rng.randint(2, 15)))
+                is_read = rng.random() < read_ratio
+                if not is_read:
+                    if recipient == a:
+                        conv.unread_a += 1
+                    else:
+                        conv.unread_b += 1
+                conv.last_preview = content[:140]
+                conv.last_sender_id = sender
+                conv.last_message_at = timestamp
+                yield Message(sender_id=sender, recipient_id=recipient, content=content, is_read=is_read), timestamp
+
+    total = 0
+    ultimo = before
+    for lote in _en_lotes(messages_gen(), batch_size):
+        mensajes, fechas = zip(*lote)
+        Message.objects.bulk_create(mensajes)
+        # auto_now_add pisa las fechas al insertar: se reescriben con un UPDATE por lote.
+        # Los ids se leen de la tabla porque no todos los backends los devuelven en bulk_create.
+        ids = list(Message.objects.filter(id__gt=ultimo).order_by('id').values_list('id', flat=True)[:len(lote)])
+        Message.objects.bulk_update(
+            [Message(id=pk, timestamp=fecha) for pk, fecha in zip(ids, fechas)], ['timestamp'],
+        )
+        ultimo = ids[-1]
+        total += len(lote)
+
+    ultimos = Message.objects.filter(id__gt=before).values('sender_id', 'recipient_id').annotate(last=Max('id'))
+    for row in ultimos:
+        conv = resumen.get(tuple(sorted((row['sender_id'], row['recipient_id']))))
+        if conv is not None:
+            conv.last_message_id = max(conv.last_message_id, row['last'])
+    Conversation.objects.bulk_create(resumen.values(), batch_size=batch_size, ignore_conflicts=True)
+    return total, len(resumen)
+
+
+def seed_scale(users=1000, mangas=10000, chapters=100000, chapters_per_arc=12, pages_per_chapter=20,
+               blobs=8, favorites=50000, follows=10000, messages=100000, conversations=10000,
+               message_days=365, skew=1.1, seed=42, batch_size=2000, log=None):
+    """
+    Catálogo sintético completo para pruebas de carga y de escala.
+
+    Llama a seed_catalog (usuarios, mangas, arcos, capítulos, favoritos,
+    seguidores) y agrega páginas y mensajes. Al final reconstruye una sola vez
+    los datos derivados (índice de búsqueda y estadísticas). Los argumentos
+    son los de seed_catalog más los de seed_panels y seed_messages; con la
+    misma semilla y los mismos tamaños el resultado es idéntico.
+    """
+    log = log or (lambda msg: None)
+    sizes = seed_catalog(users=users, mangas=mangas, chapters=chapters, favorites=favorites, follows=follows,
+                         skew=skew, seed=seed, batch_size=batch_size, log=log,
+                         chapters_per_arc=chapters_per_arc, rebuild=False)
+    rng = random.Random(seed + 1)
+
+    with transaction.atomic():
+        manga_ids = list(Manga.objects.filter(slug__startswith='sintetico-').order_by('-id').values_list('id', flat=True)[:mangas])
+        chapter_ids = list(
+            Chapter.objects.filter(manga_id__gte=min(manga_ids), manga__slug__startswith='sintetico-')
+            .order_by('id').values_list('id', flat=True)
+        ) if manga_ids else []
+        sizes['panels'] = seed_panels(chapter_ids, pages_per_chapter, panel_blobs(blobs, seed), rng, batch_size) \
+            if pages_per_chapter > 0 and blobs > 0 else 0
+        log(f"{sizes['panels']} páginas creadas.")
+
+        user_ids = list(get_user_model().objects.filter(username__startswith='lector').order_by('-id').values_list('id', flat=True)[:users])
+        user_ids.reverse()
+        sizes['messages'], sizes['conversations'] = seed_messages(
+            user_ids, messages, conversations, skew, rng, batch_size, days=message_days)
+        log(f"{sizes['messages']} mensajes creados en {sizes['conversations']} conversaciones.")
+
+        rebuild_derived(batch_size)
+    return sizes
@@ -0,0 +1,33 @@
+from django import template
+
+from catalogo.images import thumbnail_url, placeholder_data_uri, parse_placeholder
+
+register = template.Library()
+
+
+@register.filter
+def thumb(image, size):
+    """
+    URL de la miniatura de una portada o avatar.
+
+    Uso: <img src="{{ manga.portada|thumb:'cover' }}">  (tamaños en catalogo.images.SIZES)
+    """
+    return thumbnail_url(image, size)
+
+
+@register.filter
+def placeholder_bg(value):
+    """
+    Estilo CSS con el placeholder (LQIP) como fondo, visible hasta que carga la imagen.
+
+    Uso: <img src="..." style="{{ manga.portada_lqip|placeholder_bg }}">
+    """
+    uri = placeholder_data_uri(value)
+    return f'background: center / cover no-repeat url({uri});' if uri else ''
+
+
+@register.filter
+def aspect_ratio(value):
+    """Proporción 'ancho / alto' guardada en el placeholder (para reservar el espacio de la imagen)."""
+    parsed = parse_placeholder(value)
+    return f'{parsed[0]} / {parsed[1]}' if parsed else ''
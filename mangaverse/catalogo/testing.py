@@ -0,0 +1,181 @@
+"""
+Utilidades para los tests de rendimiento (catalogo/tests.py y accounts/tests.py).
+
+PerformanceTestCase puebla una vez por clase un catálogo representativo y
+ofrece assertPerformance(), que mide una petición y la compara con la línea
+base guardada en catalogo/perf_baseline.json:
+
+- Consultas: se cuentan en la primera petición con la caché vacía (el caso
+  más caro) y no pueden superar el máximo de la línea base.
+- Tiempo: la mediana de varias peticiones con la caché caliente, dividida por
+  el tiempo de una carga de referencia medida en la misma máquina. Así la
+  comparación es relativa y sirve en cualquier equipo; se admite hasta
+  PERF_TIME_TOLERANCE veces la proporción de la línea base.
+
+Para regenerar la línea base (tras una mejora, o al agregar una vista):
+
+    PERF_UPDATE_BASELINE=1 python manage.py test catalogo accounts
+
+PERF_SKIP_TIMING=1 omite las comprobaciones de tiempo (máquinas muy ruidosas).
+"""
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.template import engines
+from django.test import TestCase, override_settings
+
+from accounts.models import Message
+from monitoring.queries import QueryRecorder
+from .models import Manga, Chapter, Panel, Arc
+from .synthetic import seed_catalog
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'perf_baseline.json'
+PERF_TIME_TOLERANCE = float(os.environ.get('PERF_TIME_TOLERANCE', 3.0))
+UPDATE_BASELINE = os.environ.get('PERF_UPDATE_BASELINE') == '1'
+SKIP_TIMING = os.environ.get('PERF_SKIP_TIMING') == '1'
+# Peticiones cronometradas por vista (se usa la mediana)
+TIMED_RUNS = 5
+
+_calibration = None
+
+
+def calibration_ms():
+    """
+    Milisegundos de una carga de referencia: una consulta simple y el render
+    de una plantilla pequeña, repetidos. Se mide una vez por proceso.
+    """
+    global _calibration
+    if _calibration is None:
+        template = engines['django'].from_string(
+            '{% for i in items %}<li>{{ i|upper }}</li>{% endfor %}'
+        )
+        samples = []
+        for _ in range(7):
+            started = time.perf_counter()
+            for _ in range(20):
+                list(get_user_model().objects.all()[:10])
+                template.render({'items': [f'item {n}' for n in range(200)]})
+            samples.append((time.perf_counter() - started) * 1000)
+        _calibration = statistics.median(samples)
+    return _calibration
+
+
+def load_baseline():
+    if BASELINE_PATH.exists():
+        return json.loads(BASELINE_PATH.read_text(encoding='utf-8'))
+    return {}
+
+
+# El presupuesto de consultas de monitoring/middleware.py se aplica en los tests
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_ENFORCE=True)
+class PerformanceTestCase(TestCase):
+    """
+    TestCase con datos representativos y asserts de consultas y tiempo por vista.
+
+    Datos de la clase: self.creator (dueño de self.manga, con arcos, capítulos
+    y páginas), self.reader (lector con favoritos y mensajes del creador) y
+    un catálogo sintético alrededor.
+    """
+    _baseline = None
+    _measured = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(users=30, mangas=120, chapters=600, favorites=400, follows=80, seed=7, batch_size=500)
+        User = get_user_model()
+        cls.creator = User.objects.create_user('creador', password='clave-segura-123')
+        cls.reader = User.objects.create_user('lector', password='clave-segura-123')
+
+        cls.manga = Manga.objects.create(owner=cls.creator, titulo='Vagabond', autor='Takehiko Inoue',
+                                         genero='seinen', descripcion='Miyamoto Musashi.')
+        arc = Arc.objects.create(manga=cls.manga, title='Kioto', order=1)
+        chapters = [
+            Chapter(manga=cls.manga, arc=arc, title=f'Capítulo {n}', chapter_number=n, slug=f'capitulo-{n}')
+            for n in range(1, 21)
+        ]
+        Chapter.objects.bulk_create(chapters)
+        cls.chapter = Chapter.objects.get(manga=cls.manga, chapter_number=1)
+        # Páginas sin archivo real: bulk_create evita leer imágenes al guardar
+        Panel.objects.bulk_create(
+            Panel(chapter=cls.chapter, image=f'manga_panels/vagabond/capitulo-1/{n}.jpg', position=n * 1024)
+            for n in range(1, 31)
+        )
+
+        cls.reader.profile.favorites.add(*Manga.objects.order_by('id')[:12])
+        cls.reader.profile.following.add(cls.creator.profile)
+        for n in range(30):
+            sender, recipient = (cls.creator, cls.reader) if n % 2 else (cls.reader, cls.creator)
+            Message.objects.create(sender=sender, recipient=recipient, content=f'Mensaje {n}')
+        for user in User.objects.filter(username__startswith='lector').exclude(pk=cls.reader.pk)[:10]:
+            Message.objects.create(sender=user, recipient=cls.reader, content='Hola')
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if cls._baseline is None:
+            PerformanceTestCase._baseline = load_baseline()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if UPDATE_BASELINE and cls._measured:
+            baseline = load_baseline()
+            baseline.update(cls._measured)
+            BASELINE_PATH.write_text(json.dumps(dict(sorted(baseline.items())), indent=2) + '\n', encoding='utf-8')
+            cls._measured.clear()
+
+    def setUp(self):
+        cache.clear()
+
+    def request(self, method, url, **kwargs):
+        return getattr(self.client, method)(url, **kwargs)
+
+    def assertPerformance(self, name, url, method='get', expected_status=200, repeat=True, **kwargs):
+        """
+        Hace la petición y compara consultas y tiempo con la línea base 'name'.
+
+        Con repeat=False (vistas que modifican datos, como el toggle de
+        favoritos) solo se mide la primera petición. Retorna la respuesta.
+        """
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            started = time.perf_counter()
+            response = self.request(method, url, **kwargs)
+            first_ms = (time.perf_counter() - started) * 1000
+        self.assertEqual(response.status_code, expected_status, f"{name}: estado {response.status_code}")
+
+        samples = [first_ms]
+        if repeat:
+            samples = []
+            for _ in range(TIMED_RUNS):
+                started = time.perf_counter()
+                self.request(method, url, **kwargs)
+                samples.append((time.perf_counter() - started) * 1000)
+        ratio = statistics.median(samples) / calibration_ms()
+
+        if UPDATE_BASELINE:
+            self._measured[name] = {'queries': recorder.count, 'time_ratio': round(ratio, 3)}
+            return response
+
+        expected = self._baseline.get(name)
+        if expected is None:
+            self.fail(f"{name} no tiene línea base: corre los tests con PERF_UPDATE_BASELINE=1")
+        repeated = recorder.repeated(5)
+        self.assertLessEqual(
+            recorder.count, expected['queries'],
+            f"{name}: {recorder.count} consultas (máximo {expected['queries']}). "
+            f"Formas repetidas: {repeated[:3]}",
+        )
+        if not SKIP_TIMING:
+            limit = expected['time_ratio'] * PERF_TIME_TOLERANCE
+            self.assertLessEqual(
+                ratio, limit,
+                f"{name}: {ratio:.2f}x la carga de referencia (máximo {limit:.2f}x)",
+            )
+        return response
@@ -1,3 +1,229 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .models import Manga, Chapter, Panel, MangaRecommendation
+from .ordering import move_panels, rebalance, InvalidMove, POSITION_GAP
+from .recommendations import build_recommendations
+from .testing import PerformanceTestCase
+
+
+class CatalogoPerformanceTests(PerformanceTestCase):
+    """
+    Presupuestos de consultas y tiempo de las vistas del catálogo.
+
+    Comparan contra catalogo/perf_baseline.json (ver catalogo/testing.py).
+    """
+
+    def test_home_anonimo(self):
+        self.assertPerformance('catalogo:home:anonimo', reverse('catalogo:home'))
+
+    def test_home_con_sesion(self):
+        self.client.force_login(self.reader)
+        self.assertPerformance('catalogo:home:sesion', reverse('catalogo:home'))
+
+    def test_lista_mangas(self):
+        self.assertPerformance('catalogo:lista-mangas', reverse('catalogo:lista-mangas'))
+
+    def test_lista_mangas_por_genero(self):
+        self.assertPerformance('catalogo:lista-mangas:genero', reverse('catalogo:lista-mangas') + '?genero=seinen')
+
+    def test_manga_detail(self):
+        self.client.force_login(self.reader)
+        response = self.assertPerformance('catalogo:manga-detail',
+                                          reverse('catalogo:manga-detail', args=[self.manga.slug]))
+        self.assertContains(response, '30 págs')
+
+    def test_chapter_detail(self):
+        response = self.assertPerformance(
+            'catalogo:chapter-detail', reverse('catalogo:chapter-detail', args=[self.manga.slug, self.chapter.slug])
+        )
+        self.assertContains(response, 'Página 30')
+
+    def test_search(self):
+        self.assertPerformance('catalogo:search', reverse('catalogo:search') + '?q=ka')
+
+    def test_search_fuzzy(self):
+        self.assertPerformance('catalogo:search:fuzzy', reverse('catalogo:search') + '?q=vagabnd')
+
+    def test_search_suggest(self):
+        response = self.assertPerformance('catalogo:search-suggest', reverse('catalogo:search-suggest') + '?q=Vaga')
+        self.assertEqual(response.json()['results'][0]['title'], 'Vagabond')
+
+    def test_chapter_edit(self):
+        self.client.force_login(self.creator)
+        self.assertPerformance('catalogo:chapter-edit',
+                               reverse('catalogo:chapter-edit', args=[self.manga.slug, self.chapter.slug]))
+
+    def test_reorder_panels(self):
+        self.client.force_login(self.creator)
+        ids = list(self.chapter.panels.values_list('id', flat=True))
+        self.assertPerformance(
+            'catalogo:reorder-panels', reverse('catalogo:reorder-panels'), method='post',
+            data=json.dumps({'panel_ids': [ids[-1]], 'after_id': ids[0]}), content_type='application/json',
+        )
+        order = list(Panel.objects.filter(chapter=self.chapter).values_list('id', flat=True))
+        self.assertEqual(order[:3], [ids[0], ids[-1], ids[1]])
+
+
+class CatalogoCacheTests(PerformanceTestCase):
+    """Los fragmentos cacheados se invalidan al guardar los modelos (catalogo/cache.py)."""
+
+    def test_manga_detail_se_invalida_al_editar_capitulo(self):
+        url = reverse('catalogo:manga-detail', args=[self.manga.slug])
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chapter.title = 'Título renovado'
+            self.chapter.save()
+        self.assertContains(self.client.get(url), 'Título renovado')
+
+    def test_chapter_detail_se_invalida_al_borrar_pagina(self):
+        url = reverse('catalogo:chapter-detail', args=[self.manga.slug, self.chapter.slug])
+        self.assertContains(self.client.get(url), 'Página 30')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chapter.panels.in_reading_order().last().delete()
+        response = self.client.get(url)
+        self.assertContains(response, 'Página 29')
+        self.assertNotContains(response, 'Página 30')
+
+    def test_lista_mangas_se_invalida_al_renombrar_dueno(self):
+        url = reverse('catalogo:lista-mangas') + '?genero=seinen'
+        old_link = 'href="%s"' % reverse('accounts:public_profile', args=['creador'])
+        self.assertContains(self.client.get(url), old_link)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.creator.username = 'mangaka'
+            self.creator.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'href="%s"' % reverse('accounts:public_profile', args=['mangaka']))
+        self.assertNotContains(response, old_link)
+
+    def test_borrado_en_cascada_invalida_una_sola_vez(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Manga.objects.get(pk=self.manga.pk).delete()
+        self.assertEqual(len(callbacks), 1)
+
+
+class CatalogoSharedPageTests(PerformanceTestCase):
+    """La ficha y el lector no dependen del usuario (ver accounts:user_fragment)."""
+
+    def assertSharedPage(self, url):
+        anonymous = self.client.get(url)
+        self.client.force_login(self.creator)
+        owner = self.client.get(url)
+        self.assertEqual(owner.content, anonymous.content)
+        self.assertNotIn('Cookie', owner.get('Vary', ''))
+
+    def test_manga_detail_compartida(self):
+        self.assertSharedPage(reverse('catalogo:manga-detail', args=[self.manga.slug]))
+
+    def test_chapter_detail_compartida(self):
+        self.assertSharedPage(reverse('catalogo:chapter-detail', args=[self.manga.slug, self.chapter.slug]))
+
+
+class CatalogoConditionalGetTests(PerformanceTestCase):
+    """GET condicional: las visitas repetidas reciben 304 sin renderizar (catalogo/cache.py)."""
+
+    def assertNotModified(self, name, url):
+        etag = self.client.get(url)['ETag']
+        return self.assertPerformance(name, url, expected_status=304, HTTP_IF_NONE_MATCH=etag)
+
+    def test_manga_detail_304(self):
+        url = reverse('catalogo:manga-detail', args=[self.manga.slug])
+        response = self.assertNotModified('catalogo:manga-detail:304', url)
+        self.assertIn('no-cache', response['Cache-Control'])
+        # updated_at no cubre las recomendaciones: solo ETag
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    @override_settings(FEED_FANOUT_ASYNC=False)
+    def test_manga_detail_etag_acotado(self):
+        url = reverse('catalogo:manga-detail', args=[self.manga.slug])
+        etag = self.client.get(url)['ETag']
+        # Un capítulo de otro manga no invalida esta ficha
+        other = Manga.objects.exclude(pk=self.manga.pk).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            Chapter.objects.create(manga=other, title='Extra', chapter_number=999, slug='extra')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Nuevas recomendaciones para este manga sí
+        with self.captureOnCommitCallbacks(execute=True):
+            build_recommendations(k=5, min_common=1)
+        self.assertTrue(MangaRecommendation.objects.filter(manga=self.manga).exists())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_chapter_detail_304(self):
+        self.assertNotModified('catalogo:chapter-detail:304',
+                               reverse('catalogo:chapter-detail', args=[self.manga.slug, self.chapter.slug]))
+
+    def test_lista_mangas_304(self):
+        self.assertNotModified('catalogo:lista-mangas:304', reverse('catalogo:lista-mangas') + '?genero=seinen')
+
+    def test_search_suggest_304(self):
+        self.assertNotModified('catalogo:search-suggest:304', reverse('catalogo:search-suggest') + '?q=Vaga')
+
+    def test_borrar_pagina_cambia_validadores(self):
+        urls = [reverse('catalogo:manga-detail', args=[self.manga.slug]),
+                reverse('catalogo:chapter-detail', args=[self.manga.slug, self.chapter.slug])]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        updated_at = self.manga.updated_at
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chapter.panels.in_reading_order().last().delete()
+        for url, etag in zip(urls, etags):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        # La página se propaga al capítulo y al manga
+        self.manga.refresh_from_db()
+        self.assertGreater(self.manga.updated_at, updated_at)
+
+
+class OrderingTests(TestCase):
+    """Reordenamiento de páginas con claves dispersas (catalogo/ordering.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = get_user_model().objects.create_user('creador', password='clave-segura-123')
+        manga = Manga.objects.create(owner=owner, titulo='Vagabond', autor='Takehiko Inoue', genero='seinen')
+        cls.chapter = Chapter.objects.create(manga=manga, title='Capítulo 1', chapter_number=1)
+
+    def make_panels(self, *positions):
+        Panel.objects.bulk_create(
+            Panel(chapter=self.chapter, image=f'manga_panels/{n}.jpg', position=position)
+            for n, position in enumerate(positions)
+        )
+        return list(Panel.objects.filter(chapter=self.chapter).order_by('position').values_list('id', flat=True))
+
+    def order(self):
+        return list(Panel.objects.filter(chapter=self.chapter).order_by('position', 'id').values_list('id', flat=True))
+
+    def test_mover_al_principio(self):
+        a, b, c = self.make_panels(1024, 2048, 3072)
+        self.assertEqual(move_panels(self.chapter, [c]), 1)
+        self.assertEqual(self.order(), [c, a, b])
+
+    def test_mover_al_final(self):
+        a, b, c = self.make_panels(1024, 2048, 3072)
+        self.assertEqual(move_panels(self.chapter, [a], after_id=c), 1)
+        self.assertEqual(self.order(), [b, c, a])
+
+    def test_mover_varias_paginas(self):
+        a, b, c, d, e = self.make_panels(1024, 2048, 3072, 4096, 5120)
+        move_panels(self.chapter, [e, b], after_id=c)
+        self.assertEqual(self.order(), [a, c, e, b, d])
+
+    def test_mover_sin_espacio_reparte_el_capitulo(self):
+        a, x, y, m = self.make_panels(1024, 2048, 2049, 2560)
+        self.assertGreater(move_panels(self.chapter, [m], after_id=x), 0)
+        self.assertEqual(self.order(), [a, x, m, y])
+
+    def test_mover_pagina_ajena(self):
+        a, b = self.make_panels(1024, 2048)
+        with self.assertRaises(InvalidMove):
+            move_panels(self.chapter, [a, 999999], after_id=b)
+        self.assertEqual(self.order(), [a, b])
+
+    def test_rebalance(self):
+        ids = self.make_panels(5, 6, 7, 3000)
+        self.assertEqual(rebalance(self.chapter.pk), 4)
+        positions = list(Panel.objects.filter(chapter=self.chapter).order_by('position').values_list('position', flat=True))
+        self.assertEqual(self.order(), ids)
+        self.assertEqual(positions, [POSITION_GAP * n for n in range(1, 5)])
+        self.assertEqual(rebalance(self.chapter.pk), 0)
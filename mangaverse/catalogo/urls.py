@@ -13,6 +13,9 @@ urlpatterns = [
     path('buscar/', views.search, name='search'),
     path('buscar/sugerencias/', views.search_suggest, name='search-suggest'),
 
+    # Miniaturas de portadas y avatares (caché en disco)
+    path('miniaturas/<str:size>/<path:name>', views.thumbnail, name='thumbnail'),
+
     # --- GESTIÓN DE MANGAS (CRUD) ---
     path('mangas/crear/', views.MangaCreateView.as_view(), name='manga-create'),
     path('mangas/<slug:manga_slug>/editar/', views.MangaUpdateView.as_view(), name='manga-update'),
@@ -1,17 +1,126 @@
 import os
+import time
+import logging
+import numpy as np
+from PIL import Image, ImageOps
 from pdf2image import convert_from_path, convert_from_bytes
 from django.core.files.base import ContentFile
 from io import BytesIO
 from .models import Panel
 
+logger = logging.getLogger(__name__)
+
+# Diferencia máxima entre canales (R, G, B) para considerar gris un píxel
+GRAYSCALE_TOLERANCE = 12
+# Fracción máxima de píxeles con color que admite una página "en blanco y negro"
+GRAYSCALE_MAX_COLOR_FRACTION = 0.002
+# La detección trabaja sobre una copia reducida de la página (lado máximo en px)
+GRAYSCALE_SAMPLE_SIZE = 512
+
+
+def _reduced(image, size=GRAYSCALE_SAMPLE_SIZE):
+    """
+    Copia reducida de la imagen (lado máximo cercano a 'size').
+
+    reduce() genera directamente la versión chica: no se duplica antes el
+    bitmap completo, que en tiras largas o páginas de PDF a 200 dpi pesa
+    decenas de MB.
+    """
+    factor = -(-max(image.size) // size)
+    return image.reduce(factor) if factor > 1 else image.copy()
+
+
+def is_grayscale(image, tolerance=GRAYSCALE_TOLERANCE, max_color_fraction=GRAYSCALE_MAX_COLOR_FRACTION):
+    """
+    Indica si una imagen PIL es, en la práctica, de un solo canal.
+
+    Calcula el histograma de la diferencia entre el canal máximo y el mínimo de
+    cada píxel (vectorizado con NumPy). Los artefactos de compresión dejan
+    diferencias pequeñas; una página a color tiene muchas grandes. Las
+    imágenes con paleta se revisan por sus colores usados, sin reducirlas.
+    """
+    if image.mode in ('1', 'L', 'LA', 'I', 'I;16', 'F'):
+        return True
+    if image.mode == 'P':
+        palette = np.asarray(image.getpalette('RGB'), dtype=np.int16).reshape(-1, 3)
+        counts = image.getcolors(256) or []
+        colored = sum(count for count, index in counts
+                      if palette[index].max() - palette[index].min() > tolerance)
+        return colored <= max_color_fraction * image.width * image.height
+    pixels = np.asarray(_reduced(image).convert('RGB'), dtype=np.int16)
+    spread = pixels.max(axis=2) - pixels.min(axis=2)
+    histogram = np.bincount(spread.ravel(), minlength=256)
+    return histogram[tolerance + 1:].sum() <= max_color_fraction * spread.size
+
+
+def _encode(image, fmt):
+    buffer = BytesIO()
+    if fmt == 'JPEG':
+        image.save(buffer, format='JPEG', quality=85, optimize=True)
+    else:
+        image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def _estimated_saving(image, data):
+    """
+    Bytes que ahorra 'data' (la página en grises) frente a guardarla a color.
+
+    Es una estimación: compara ambas codificaciones de una copia reducida y
+    aplica la proporción al tamaño real, en vez de codificar la página
+    completa dos veces.
+    """
+    sample = _reduced(image).convert('RGB')
+    gray = len(_encode(sample.convert('L'), 'JPEG'))
+    if not gray:
+        return 0
+    return max(round(len(data) * (len(_encode(sample, 'JPEG')) / gray - 1)), 0)
+
+
+def _grayscale_upload(file):
+    """
+    Reescribe un PNG subido como escala de grises si no tiene color.
+
+    Solo se convierten PNG: la conversión es sin pérdida. Un JPEG se guarda
+    tal cual, porque volver a comprimirlo degradaría la página.
+
+    Retorna (archivo, bytes ahorrados). Si la imagen tiene color, ya es de un
+    canal o la versión en grises no resulta más liviana, retorna el original.
+    """
+    try:
+        image = Image.open(file)
+        if image.format != 'PNG' or image.mode in ('1', 'L', 'LA') or not is_grayscale(image):
+            return file, 0
+        image = ImageOps.exif_transpose(image)
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        data = _encode(image.convert('LA' if has_alpha else 'L'), 'PNG')
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return file, 0
+    finally:
+        file.seek(0)
+
+    saved = file.size - len(data)
+    if saved <= 0:
+        return file, 0
+    return ContentFile(data, name=file.name), saved
+
+
 def process_chapter_files(chapter, uploaded_files):
     """
     Procesa una lista de archivos (Imágenes o PDFs).
     Si es imagen: La guarda directamente.
     Si es PDF: Lo convierte a imágenes y guarda cada página como un Panel.
+
+    Las páginas en blanco y negro se guardan con un solo canal (modo 'L'), lo
+    que reduce su peso. Retorna un resumen: páginas creadas, cuántas se
+    guardaron en grises, bytes guardados y bytes ahorrados (estimados en las
+    páginas de PDF).
     """
-    # Calculamos la página de inicio para no sobrescribir si ya hay paneles
-    start_page = chapter.panels.count() + 1
+    from monitoring import metrics
+
+    # Las páginas nuevas se agregan al final (Panel.save asigna la posición)
+    report = {'pages': 0, 'grayscale': 0, 'bytes': 0, 'bytes_saved': 0}
+    started = time.perf_counter()
     
     for file in uploaded_files:
         filename = file.name.lower()
@@ -24,20 +133,25 @@ def process_chapter_files(chapter, uploaded_files):
                 
                 for i, image in enumerate(images):
                     # Convertir imagen PIL a bytes para que Django la entienda
-                    img_byte_arr = BytesIO()
-                    image.save(img_byte_arr, format='JPEG', quality=85)
+                    if is_grayscale(image):
+                        data = _encode(image.convert('L'), 'JPEG')
+                        report['grayscale'] += 1
+                        report['bytes_saved'] += _estimated_saving(image, data)
+                    else:
+                        data = _encode(image, 'JPEG')
                     
                     # Nombre único para cada página
-                    file_name = f"pdf_page_{start_page + i}.jpg"
+                    file_name = f"pdf_page_{i + 1}.jpg"
                     
                     # Crear el objeto Panel
                     Panel.objects.create(
                         chapter=chapter,
-                        page_number=start_page + i,
-                        image=ContentFile(img_byte_arr.getvalue(), name=file_name)
+                        image=ContentFile(data, name=file_name)
                     )
-                # Actualizamos el contador de páginas
-                start_page += len(images)
+                    report['pages'] += 1
+                    report['bytes'] += len(data)
+                    metrics.pages_ingested.inc('pdf')
+                    metrics.ingest_bytes.inc('pdf', amount=len(data))
                 
             except Exception as e:
                 print(f"Error procesando PDF: {e}")
@@ -45,9 +159,23 @@ def process_chapter_files(chapter, uploaded_files):
                 
         # CASO 2: Es una Imagen normal (JPG, PNG, etc.)
         else:
+            image_file, saved = _grayscale_upload(file)
             Panel.objects.create(
                 chapter=chapter,
-                page_number=start_page,
-                image=file
+                image=image_file
             )
-            start_page += 1
\ No newline at end of file
+            report['pages'] += 1
+            report['bytes'] += image_file.size
+            metrics.pages_ingested.inc('image')
+            metrics.ingest_bytes.inc('image', amount=image_file.size)
+            if saved:
+                report['grayscale'] += 1
+                report['bytes_saved'] += saved
+
+    metrics.ingest_duration.observe(time.perf_counter() - started)
+    if report['grayscale']:
+        logger.info(
+            "Capítulo %s: %s de %s páginas guardadas en escala de grises (%s bytes ahorrados).",
+            chapter.pk, report['grayscale'], report['pages'], report['bytes_saved'],
+        )
+    return report
\ No newline at end of file
@@ -4,11 +4,18 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin, UserPassesTestMixin
 from django.urls import reverse, reverse_lazy
 from django.views.generic import CreateView, UpdateView, DeleteView
-from django.http import HttpResponseRedirect, JsonResponse
+from django.http import HttpResponseRedirect, JsonResponse, FileResponse, Http404
+from django.conf import settings
 from django.db.models import Q, Count
 from django.core.paginator import Paginator
+from django.core.files.storage import default_storage
 from .models import Manga, Chapter, Panel, Arc, GENEROS
 from .forms import MangaForm, ChapterForm
+from .ordering import move_panels
+from .images import thumbnail_url, is_allowed, get_thumbnail, placeholder_data_uri
+from .search import manga_search_queryset, genre_facets, genre_choices_with_counts, CountedPaginator, fuzzy_search
+from .cache import (cached, version_string, make_etag, conditional, manga_tag, chapter_tag, genre_tag,
+                    recommendations_tag, CATALOG, POPULARITY)
 from django.views.decorators.http import require_POST
 import json
 from django.contrib.auth import get_user_model
@@ -32,14 +39,24 @@ def pagina_inicio(request):
     1. Los 5 mangas más recientes.
     2. Los 5 mangas más populares (basado en likes).
     3. Si el usuario está autenticado, muestra sus últimos 4 favoritos para acceso rápido.
+
+    Recientes y populares son iguales para todos: se cachean hasta que cambie
+    el catálogo (o los likes, en el caso de los populares).
     """
-    recent_mangas = Manga.objects.order_by('-id')[:5]
-    popular_mangas = Manga.objects.annotate(num_likes=Count('favorited_by')).order_by('-num_likes')[:5]
-    contexto = {'recent_mangas': recent_mangas, 'popular_mangas': popular_mangas}
+    popular_mangas = cached('catalogo:home-popular', [CATALOG, POPULARITY], lambda: list(
+        Manga.objects.select_related('owner').annotate(num_likes=Count('favorited_by')).order_by('-num_likes')[:5]
+    ))
+    contexto = {'popular_mangas': popular_mangas}
     
-    if request.user.is_authenticated and hasattr(request.user, 'profile'):
-        favorites = request.user.profile.favorites.all().order_by('-id')[:4]
-        contexto['favorites'] = favorites
+    if request.user.is_authenticated:
+        if hasattr(request.user, 'profile'):
+            favorites = request.user.profile.favorites.select_related('owner').order_by('-id')[:4]
+            contexto['favorites'] = favorites
+    else:
+        # Los recientes solo se muestran a los visitantes sin sesión
+        contexto['recent_mangas'] = cached('catalogo:home-recent', [CATALOG], lambda: list(
+            Manga.objects.select_related('owner').order_by('-id')[:5]
+        ))
 
     return render(request, 'catalogo/inicio.html', contexto)
 
@@ -48,27 +65,36 @@ def lista_mangas(request):
     Muestra el catálogo completo de mangas disponibles.
     
     Permite filtrar la lista por género mediante parámetros GET en la URL.
+    Los conteos por género se obtienen de una sola consulta agrupada (cacheada).
+    Responde 304 mientras el catálogo no cambie (GET condicional por ETag).
     
     Args:
         request: Objeto HttpRequest. Si contiene 'genero' en GET, filtra los resultados.
     """
     # 1. Obtenemos el parámetro de la URL (si existe)
     genero_filtrado = request.GET.get('genero')
-    
-    # 2. Empezamos con todos los mangas
-    mangas = Manga.objects.all().order_by('titulo')
-    
-    # 3. Si hay filtro, aplicamos
-    if genero_filtrado:
-        mangas = mangas.filter(genero=genero_filtrado)
+
+    def respond():
+        # 2. Empezamos con todos los mangas
+        mangas = Manga.objects.select_related('owner').order_by('titulo')
+        facets = genre_facets()
         
-    context = {
-        'mangas': mangas,
-        'generos': GENEROS,       # Pasamos la lista de opciones para el menú
-        'filtro_actual': genero_filtrado # Para saber cuál botón pintar de activo
-    }
-    
-    return render(request, 'catalogo/lista_mangas.html', context)
+        # 3. Si hay filtro, aplicamos
+        if genero_filtrado:
+            mangas = mangas.filter(genero=genero_filtrado)
+            
+        context = {
+            'mangas': mangas,
+            'generos': genre_choices_with_counts(facets),  # Opciones del menú con su conteo
+            'total': facets['counts'].get(genero_filtrado, 0) if genero_filtrado else facets['total'],
+            'filtro_actual': genero_filtrado, # Para saber cuál botón pintar de activo
+            # La grilla se cachea en el template; se invalida con el género (o el catálogo completo)
+            'fragment_version': version_string(genre_tag(genero_filtrado) if genero_filtrado else CATALOG),
+        }
+        return render(request, 'catalogo/lista_mangas.html', context)
+
+    # Los conteos por género dependen de todo el catálogo, no solo del género filtrado
+    return conditional(request, make_etag([CATALOG]), respond)
 
 def nosotros(request):
     """
@@ -83,6 +109,10 @@ def search(request):
     MEJORA SOCIAL:
     Si la búsqueda comienza con '@' (ej: @vicente), busca un perfil de usuario
     y redirige directamente a su página pública.
+
+    BÚSQUEDA DIFUSA:
+    Con '?fuzzy=1', o cuando la búsqueda exacta no encuentra nada, se buscan
+    títulos y autores parecidos en el índice de trigramas (ej: "Berzerk").
     """
     query = (request.GET.get('q') or '').strip()
     if not query: return redirect('catalogo:lista-mangas')
@@ -101,63 +131,151 @@ def search(request):
             messages.error(request, f"El usuario @{username} no fue encontrado.")
             return redirect('catalogo:home')
 
-    # --- 2. BÚSQUEDA DE MANGAS (Lógica original) ---
-    chapter_manga_ids = Chapter.objects.filter(Q(title__icontains=query)).values_list('manga_id', flat=True)
-    
-    mangas_qs = Manga.objects.filter(
-        Q(titulo__icontains=query) | 
-        Q(descripcion__icontains=query) | 
-        Q(autor__icontains=query) | 
-        Q(id__in=chapter_manga_ids)
-    ).distinct().order_by('titulo')
-    
-    paginator = Paginator(mangas_qs, 12)
+    # --- 2. BÚSQUEDA DE MANGAS ---
+    # Los conteos por género salen de una sola consulta agrupada y cacheada;
+    # el total se reutiliza en el paginador para no repetir el COUNT.
+    genero_filtrado = request.GET.get('genero')
+    facets = genre_facets(query)
+
+    mangas_qs = manga_search_queryset(query).order_by('titulo')
+    if genero_filtrado:
+        mangas_qs = mangas_qs.filter(genero=genero_filtrado)
+        total = facets['counts'].get(genero_filtrado, 0)
+    else:
+        total = facets['total']
+    
+    fuzzy = bool(request.GET.get('fuzzy')) or (total == 0 and not genero_filtrado)
+    if fuzzy:
+        # --- 3. BÚSQUEDA DIFUSA (resultados aproximados, ya ordenados por similitud) ---
+        resultados = fuzzy_search(query)
+        paginator = Paginator(resultados, 12)
+        total = len(resultados)
+    else:
+        paginator = CountedPaginator(mangas_qs, 12, count=total)
     page_obj = paginator.get_page(request.GET.get('page'))
     
     return render(request, 'catalogo/search_results.html', {
         'query': query, 
         'page_obj': page_obj, 
-        'total': mangas_qs.count()
+        'total': total,
+        'fuzzy': fuzzy,
+        'generos': [] if fuzzy else genre_choices_with_counts(facets),
+        'filtro_actual': genero_filtrado,
     })
 
 def search_suggest(request):
     """
     API Endpoint para sugerencias de búsqueda en tiempo real (AJAX).
     
+    Si no hay coincidencias exactas (o se pide '?fuzzy=1') recurre a la búsqueda difusa.
+
     Retorna:
-        JsonResponse: Una lista de diccionarios con título, autor, URL y portada de los mangas coincidentes.
+        JsonResponse: Una lista de diccionarios con título, autor, URL, portada y placeholder
+        (data URI) de la portada de los mangas coincidentes. Con GET condicional:
+        304 mientras el catálogo no cambie.
     """
     q = (request.GET.get('q') or '').strip()
     if not q: return JsonResponse({'results': []})
-    
-    chapter_manga_ids = Chapter.objects.filter(Q(title__icontains=q)).values_list('manga_id', flat=True)
-    qs = Manga.objects.filter(
-        Q(titulo__icontains=q) | Q(descripcion__icontains=q) | Q(autor__icontains=q) | Q(id__in=chapter_manga_ids)
-    ).distinct().order_by('titulo')[:8]
-    
-    results = [{'title': m.titulo, 'author': m.autor or "", 'url': reverse("catalogo:manga-detail", args=[m.slug]), 'cover': m.portada.url if m.portada else ""} for m in qs]
-    return JsonResponse({"results": results})
+
+    def respond():
+        fuzzy = bool(request.GET.get('fuzzy'))
+        qs = [] if fuzzy else list(manga_search_queryset(q).order_by('titulo')[:8])
+        if not qs:
+            qs = fuzzy_search(q, limit=8)
+            fuzzy = True
+        
+        results = [{'title': m.titulo, 'author': m.autor or "", 'url': reverse("catalogo:manga-detail", args=[m.slug]), 'cover': thumbnail_url(m.portada, 'cover-sm'), 'placeholder': placeholder_data_uri(m.portada_lqip)} for m in qs]
+        return JsonResponse({"results": results, "fuzzy": fuzzy})
+
+    return conditional(request, make_etag([CATALOG]), respond)
+
+def thumbnail(request, size, name):
+    """
+    Sirve la miniatura de una portada o avatar, generándola en la primera petición.
+
+    Solo acepta los tamaños de catalogo.images.SIZES. La URL es estable, por
+    lo que la respuesta se puede cachear en el navegador.
+    """
+    if not is_allowed(size, name):
+        raise Http404("Miniatura no disponible")
+    path = get_thumbnail(size, name)
+    if path is None:
+        raise Http404("Imagen no encontrada")
+    try:
+        fh = open(path, 'rb')
+    except FileNotFoundError:
+        # evict() la borró entre get_thumbnail y open: se regenera una vez y,
+        # si vuelve a faltar, se sirve el original
+        path = get_thumbnail(size, name)
+        try:
+            fh = open(path, 'rb') if path else None
+        except FileNotFoundError:
+            fh = None
+        if fh is None:
+            return HttpResponseRedirect(default_storage.url(name))
+    response = FileResponse(fh, content_type='image/webp')
+    response['Cache-Control'] = f'public, max-age={settings.THUMBNAIL_MAX_AGE}'
+    return response
 
 def manga_detail_view(request, manga_slug):
     """
     Muestra la ficha detallada de un manga específico.
     
     Incluye la lista de capítulos ordenados y la estructura de arcos narrativos.
+    La página es igual para todos: favoritos y acciones del dueño se completan
+    en el navegador con accounts:user_fragment.
+
+    GET condicional: el ETag depende del manga (arcos, capítulos y páginas),
+    de sus recomendaciones y de los mangas recomendados que se muestran. No
+    se envía Last-Modified: updated_at no cubre las recomendaciones.
     """
     manga = get_object_or_404(Manga, slug=manga_slug)
-    chapters = manga.chapters.all().order_by('chapter_number')
-    arcs = manga.arcs.all().order_by('order')
-    return render(request, 'catalogo/manga_detail.html', {'manga': manga, 'chapters': chapters, 'arcs': arcs})
+    # Precalculadas por build_recommendations: una lectura por el índice (manga, rank)
+    recommended_ids = cached('catalogo:recommendation-ids', [recommendations_tag(manga.pk)], lambda: list(
+        manga.recommendations.values_list('recommended_id', flat=True)[:settings.RECOMMENDATIONS_TOP_K]
+    ), manga.pk)
+    tags = [manga_tag(manga.pk), recommendations_tag(manga.pk), *(manga_tag(pk) for pk in recommended_ids)]
+
+    def respond():
+        # Páginas por capítulo en la misma consulta (antes: un COUNT por fila en el template)
+        chapters = manga.chapters.select_related('arc').annotate(num_panels=Count('panels')).order_by('chapter_number')
+        arcs = manga.arcs.all().order_by('order')
+        recommendations = cached('catalogo:recommendations', tags, lambda: list(
+            manga.recommendations.select_related('recommended')[:settings.RECOMMENDATIONS_TOP_K]
+        ), manga.pk)
+        return render(request, 'catalogo/manga_detail.html', {
+            'manga': manga, 'chapters': chapters, 'arcs': arcs, 'recommendations': recommendations,
+            # Arcos y capítulos se cachean en el template (ver catalogo/cache.py)
+            'fragment_version': version_string(manga_tag(manga.pk)),
+        })
+
+    return conditional(request, make_etag(tags, manga.updated_at.isoformat()), respond)
 
 def chapter_detail_view(request, manga_slug, chapter_slug):
     """
     Visor de lectura de un capítulo.
     
-    Carga todas las imágenes (Paneles) asociadas al capítulo, ordenadas por número de página.
+    Carga todas las imágenes (Paneles) asociadas al capítulo, ordenadas por número de página,
+    junto con los segmentos de las páginas muy altas.
+
+    GET condicional: responde 304 mientras no cambien el capítulo, sus páginas
+    ni el título del manga.
     """
-    chapter = get_object_or_404(Chapter, manga__slug=manga_slug, slug=chapter_slug)
-    panels = chapter.panels.all().order_by('page_number')
-    return render(request, 'catalogo/chapter_detail.html', {'chapter': chapter, 'panels': panels})
+    chapter = get_object_or_404(Chapter.objects.select_related('manga'), manga__slug=manga_slug, slug=chapter_slug)
+
+    def respond():
+        panels = chapter.panels.in_reading_order().prefetch_related('tiles')
+        return render(request, 'catalogo/chapter_detail.html', {
+            'chapter': chapter, 'panels': panels,
+            # Las páginas se cachean en el template hasta que cambie el capítulo
+            'fragment_version': version_string(chapter_tag(chapter.pk)),
+        })
+
+    # Del manga solo se muestra el título: cambiar otros capítulos no invalida este
+    etag = make_etag([chapter_tag(chapter.pk)], chapter.updated_at.isoformat(), chapter.manga.titulo)
+    # Last-Modified es una fecha: tiene que cubrir también cambios del manga
+    last_modified = max(chapter.updated_at, chapter.manga.updated_at)
+    return conditional(request, etag, respond, last_modified=last_modified)
 
 # --------------------------
 # GESTIÓN Y PERMISOS (CRUD)
@@ -282,8 +400,8 @@ def chapter_edit_upload(request, manga_slug, chapter_slug):
         if 'file' in request.FILES:
             try:
                 # Usamos la misma utilidad. Las nuevas imágenes se agregan al final.
-                process_chapter_files(chapter, [request.FILES['file']])
-                return JsonResponse({'status': 'success'})
+                report = process_chapter_files(chapter, [request.FILES['file']]) or {}
+                return JsonResponse({'status': 'success', **report})
             except Exception as e:
                 return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
@@ -303,7 +421,8 @@ def chapter_edit_upload(request, manga_slug, chapter_slug):
     return render(request, 'catalogo/chapter_edit.html', {
         'form': form,
         'manga': manga,
-        'chapter': chapter
+        'chapter': chapter,
+        'panels': chapter.panels.in_reading_order(),
     })
 
 # --- ARCO CRUD ---
@@ -365,8 +484,8 @@ def chapter_create_upload(request, manga_slug):
             if not chapter_id: return JsonResponse({'error': 'Falta ID'}, status=400)
             chapter = get_object_or_404(Chapter, id=chapter_id, manga=manga)
             try:
-                process_chapter_files(chapter, [request.FILES['file']])
-                return JsonResponse({'status': 'success'})
+                report = process_chapter_files(chapter, [request.FILES['file']]) or {}
+                return JsonResponse({'status': 'success', **report})
             except Exception as e:
                 return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
@@ -428,16 +547,11 @@ def panel_delete(request, panel_id):
         messages.error(request, "No tienes permiso.")
         return redirect('catalogo:chapter-detail', manga_slug=chapter.manga.slug, chapter_slug=chapter.slug)
 
-    # Borramos el panel
+    # Borramos el panel. El número de página se deriva del orden, así que las
+    # demás páginas no se tocan (ver catalogo/ordering.py)
     panel.delete()
-    
-    # Opcional: Reordenar las páginas restantes (Script simple)
-    # Esto evita huecos en la numeración (1, 3, 4...)
-    for index, p in enumerate(chapter.panels.all().order_by('page_number'), start=1):
-        p.page_number = index
-        p.save()
 
-    messages.success(request, "Página eliminada y numeración reordenada.")
+    messages.success(request, "Página eliminada.")
     
     # Volvemos a la misma página de edición
     return redirect('catalogo:chapter-edit', manga_slug=chapter.manga.slug, chapter_slug=chapter.slug)
@@ -446,26 +560,33 @@ def panel_delete(request, panel_id):
 @require_POST
 def reorder_panels(request):
     """
-    Recibe una lista de IDs de paneles en el nuevo orden y actualiza sus page_number.
+    Mueve una o varias páginas de un capítulo (API de reordenamiento).
+
+    Recibe JSON {'panel_ids': [...], 'after_id': id | null}: las páginas
+    indicadas quedan, en ese orden, justo después de 'after_id' (al principio
+    si es null). Solo se escriben las filas movidas y el cambio es atómico.
+    Enviar todas las páginas con 'after_id' null fija el orden completo.
     """
     try:
         data = json.loads(request.body)
-        panel_ids = data.get('panel_ids', [])
+        panel_ids = [int(pk) for pk in data.get('panel_ids', [])]
+        after_id = data.get('after_id')
+        after_id = int(after_id) if after_id not in (None, '') else None
         
         if not panel_ids:
             return JsonResponse({'status': 'error', 'message': 'Lista vacía'}, status=400)
 
         # Verificación de seguridad rápida (tomamos el primer panel para chequear dueño)
-        first_panel = Panel.objects.get(id=panel_ids[0])
-        if request.user != first_panel.chapter.manga.owner and not request.user.is_superuser:
+        first_panel = Panel.objects.select_related('chapter__manga').get(id=panel_ids[0])
+        chapter = first_panel.chapter
+        if request.user != chapter.manga.owner and not request.user.is_superuser:
             return JsonResponse({'status': 'error', 'message': 'Sin permisos'}, status=403)
 
-        # Actualización masiva del orden
-        # Iteramos la lista que nos mandó el frontend (que ya viene ordenada)
-        for index, panel_id in enumerate(panel_ids, start=1):
-            Panel.objects.filter(id=panel_id).update(page_number=index)
-            
-        return JsonResponse({'status': 'success'})
-        
+        # move_panels valida que todas las páginas sean del mismo capítulo
+        moved = move_panels(chapter, panel_ids, after_id=after_id)
+        return JsonResponse({'status': 'success', 'updated': moved})
+
+    except (ValueError, TypeError, Panel.DoesNotExist) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
\ No newline at end of file
@@ -3,6 +3,16 @@ ASGI config for mangaverse project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+El chat en tiempo real (accounts.views.chat_stream) mantiene conexiones
+Server-Sent Events abiertas; para que los mensajes lleguen al instante hay
+que servir el proyecto con un servidor ASGI, por ejemplo:
+
+    uvicorn mangaverse.asgi:application
+
+Al servirse por aquí, el chat usa por defecto el reparto en memoria
+(ver CHAT_PUSH_BACKEND en settings.py). Bajo WSGI el canal se degrada a
+sondeo: cada conexión responde lo pendiente y el navegador reconecta.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +22,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mangaverse.settings')
+# accounts/realtime.py elige el broker del chat según el servidor
+os.environ.setdefault('MANGAVERSE_ASGI', '1')
 
 application = get_asgi_application()
@@ -12,16 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
-
-# --- PARCHES PARA XAMPP (MariaDB 10.4) ---
-
-# 1. Ignorar chequeo de versión
-from django.db.backends.mysql.base import DatabaseWrapper
-DatabaseWrapper.check_database_version_supported = lambda self: None
-
-# 2. Desactivar funciones modernas que MariaDB 10.4 no tiene
-from django.db.backends.mysql.features import DatabaseFeatures
-DatabaseFeatures.can_return_columns_from_insert = False
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -49,18 +40,28 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'catalogo',
-    'accounts'
+    'accounts',
+    'monitoring',
 ]
 
 
 MIDDLEWARE = [
+    # Primero: la latencia medida incluye a todos los demás middlewares
+    'monitoring.middleware.MetricsMiddleware',
+    'monitoring.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # ETag por contenido y 304 para las respuestas sin validadores propios (ej:
+    # las APIs JSON). Las vistas del catálogo responden 304 antes de renderizar
+    # (catalogo/cache.py, conditional)
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Después de la autenticación: necesita request.user para permitir el perfilado a staff
+    'monitoring.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'mangaverse.urls'
@@ -107,6 +108,28 @@ DATABASES = {
     }
 }
 
+# Los tests ('manage.py test') corren sobre SQLite: no necesitan el servidor
+# MySQL de XAMPP y funcionan en cualquier máquina
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+if TESTING:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        }
+    }
+
+# --- PARCHES PARA XAMPP (MariaDB 10.4) ---
+# Solo si se usa MySQL (importar el backend exige tener mysqlclient instalado)
+if DATABASES['default']['ENGINE'] == 'django.db.backends.mysql':
+    # 1. Ignorar chequeo de versión
+    from django.db.backends.mysql.base import DatabaseWrapper
+    DatabaseWrapper.check_database_version_supported = lambda self: None
+
+    # 2. Desactivar funciones modernas que MariaDB 10.4 no tiene
+    from django.db.backends.mysql.features import DatabaseFeatures
+    DatabaseFeatures.can_return_columns_from_insert = False
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -156,6 +179,21 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Miniaturas de portadas y avatares (ver catalogo/images.py)
+THUMBNAIL_CACHE_DIR = BASE_DIR / 'media_cache' / 'thumbs'
+THUMBNAIL_CACHE_MAX_BYTES = 256 * 1024 * 1024
+THUMBNAIL_MAX_AGE = 60 * 60 * 24 * 30
+
+# Páginas muy altas (webtoon): se cortan en segmentos de este alto en píxeles
+# cuando su alto supera PANEL_TILE_MAX_ASPECT veces su ancho
+PANEL_TILE_HEIGHT = 1600
+PANEL_TILE_MAX_ASPECT = 3
+# El corte se hace en un hilo en segundo plano tras subir la página; False lo
+# hace en la misma petición. Páginas de más de PANEL_TILE_MAX_PIXELS no se
+# cortan al subirlas: se procesan con el comando tile_panels.
+PANEL_TILE_ASYNC = True
+PANEL_TILE_MAX_PIXELS = 50_000_000
+
 # Aumentar el límite de archivos subidos por request (Default es 100)
 # Ponle 1000 o más, dependiendo de qué tan largos sean tus capítulos.
 DATA_UPLOAD_MAX_NUMBER_FILES = 100
@@ -168,3 +206,96 @@ X_FRAME_OPTIONS = 'ALLOW-FROM http://127.0.0.1:8000/'
 # CORRECCIÓN 2: Desactiva la protección moderna de "aislamiento" (Django 5+)
 # que puede interferir con iframes cargados localmente (localhost).
 SECURE_CROSS_ORIGIN_OPENER_POLICY = None
+
+
+# Caché
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# En producción con varios workers conviene un backend compartido (Redis/Memcached).
+
+CACHES = {
+    'default': {
+        # LocMemCache de Django que además cuenta aciertos y fallos (monitoring/cache.py)
+        'BACKEND': 'monitoring.cache.LocMemCache',
+        'LOCATION': 'mangaverse',
+    }
+}
+
+# Segundos que vive un dato con etiquetas de caché (catalogo/cache.py). Se
+# invalidan al cambiar los modelos, así que el plazo solo libera espacio.
+CACHE_TAG_TIMEOUT = 60 * 60 * 24
+
+# Recomendaciones por manga que calcula build_recommendations y muestra la ficha
+RECOMMENDATIONS_TOP_K = 8
+
+
+# Chat en tiempo real (Server-Sent Events, ver accounts/realtime.py)
+# 'memory': reparto en memoria. Solo sirve con UN proceso ASGI (uvicorn sin
+#           --workers, daphne): los mensajes no llegan a otros procesos.
+# 'db':     sondeo de la tabla Message; funciona con varios workers y con WSGI.
+# None:     'memory' si se sirve con mangaverse/asgi.py, 'db' en otro caso.
+CHAT_PUSH_BACKEND = None
+CHAT_POLL_INTERVAL = 1.0
+# Segundos que dura cada conexión antes de que el navegador reconecte (solo
+# ASGI: bajo WSGI la conexión ocuparía un worker, así que se responde lo
+# pendiente y el navegador vuelve a preguntar cada CHAT_WSGI_RETRY segundos)
+CHAT_STREAM_TIMEOUT = 25
+CHAT_WSGI_RETRY = 3
+# Mensajes que se pintan al abrir un chat (el resto se carga al hacer scroll)
+CHAT_PAGE_SIZE = 50
+# Archivado (comando archive_messages): mensajes con más de N días, o fuera de
+# los últimos N de cada conversación, pasan a MessageArchive comprimidos
+CHAT_ARCHIVE_AFTER_DAYS = 180
+CHAT_HOT_MESSAGES = 1000
+# Segundos que vive en caché el contador de no leídos de cada usuario
+UNREAD_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+# Feed de novedades (ver accounts/feed.py)
+# Reparto en un hilo en segundo plano; False lo hace dentro de la misma petición
+FEED_FANOUT_ASYNC = True
+FEED_FANOUT_WORKERS = 2
+FEED_FANOUT_BATCH_SIZE = 1000
+# Audiencias mayores no se copian a cada feed: se leen al consultar (pull on read)
+FEED_FANOUT_MAX_AUDIENCE = 10000
+
+
+# Presupuesto de consultas por petición (ver monitoring/middleware.py)
+# Desactivado por defecto: QUERY_BUDGET=1 lo activa en desarrollo, y los
+# tests de rendimiento lo activan siempre (catalogo/testing.py). Con
+# ENFORCE un exceso es un error 500, así que nunca debe quedar en producción.
+QUERY_BUDGET_ENABLED = os.environ.get('QUERY_BUDGET') == '1'
+QUERY_BUDGET_ENFORCE = QUERY_BUDGET_ENABLED
+# Repeticiones de una misma forma de consulta que se reportan como posible N+1
+N_PLUS_ONE_THRESHOLD = 5
+# Máximo de consultas por nombre de URL; el resto usa QUERY_BUDGET_DEFAULT
+QUERY_BUDGET_DEFAULT = 40
+QUERY_BUDGETS = {
+    'catalogo:home': 10,
+    'catalogo:lista-mangas': 8,
+    'catalogo:search': 10,
+    'catalogo:search-suggest': 5,
+    'catalogo:manga-detail': 12,
+    'catalogo:chapter-detail': 10,
+    'accounts:inbox': 8,
+    'accounts:chat_detail': 15,
+    'accounts:profile': 12,
+    'accounts:public_profile': 12,
+    'accounts:feed': 6,
+}
+
+# Perfilado de peticiones con cProfile (ver monitoring/profiling.py)
+# Con PROFILING_ENABLED, un usuario staff perfila una petición con '?_profile=1'
+PROFILING_ENABLED = True
+# Fracción de peticiones perfiladas al azar (0.0 = ninguna; ej. 0.001 en producción)
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_MAX_FILES = 500
+
+# Métricas en formato Prometheus en /metrics/ (monitoring/metrics.py). Acceso
+# con 'Authorization: Bearer <METRICS_TOKEN>' o como usuario staff.
+METRICS_ENABLED = True
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+# Con varios procesos (gunicorn) cada worker vuelca sus totales en esta
+# carpeta y /metrics/ los suma. Vaciarla al desplegar. None: un solo proceso.
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = 10
@@ -0,0 +1,49 @@
+"""
+Backends de caché que cuentan aciertos y fallos (monitoring/metrics.py).
+
+Se usan en CACHES en lugar del backend de Django equivalente:
+
+    'BACKEND': 'monitoring.cache.LocMemCache'     # o monitoring.cache.RedisCache
+
+Las lecturas se agrupan por prefijo de clave: los dos primeros segmentos
+separados por ':' (ej: 'catalogo:facets', 'accounts:unread'), que es como
+este proyecto nombra sus claves. Los fragmentos de {% cache %} se agrupan por
+nombre ('template.cache.<nombre>'), sin el hash de la clave.
+"""
+from django.core.cache.backends import locmem, redis
+
+from . import metrics
+
+_MISSING = object()
+FRAGMENT_PREFIX = 'template.cache.'
+
+
+def key_prefix(key):
+    key = str(key)
+    if key.startswith(FRAGMENT_PREFIX):
+        # template.cache.<nombre>.<md5 de las variables>
+        return key.rsplit('.', 1)[0]
+    return ':'.join(key.split(':', 2)[:2])
+
+
+class InstrumentedCacheMixin:
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version=version)
+        metrics.cache_requests.inc(key_prefix(key), 'miss' if value is _MISSING else 'hit')
+        return default if value is _MISSING else value
+
+
+class LocMemCache(InstrumentedCacheMixin, locmem.LocMemCache):
+    # get_many() de la clase base llama a get() por cada clave: ya se cuenta
+    pass
+
+
+class RedisCache(InstrumentedCacheMixin, redis.RedisCache):
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version=version)
+        for key in keys:
+            metrics.cache_requests.inc(key_prefix(key), 'hit' if key in found else 'miss')
+        return found
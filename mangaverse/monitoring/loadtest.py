@@ -0,0 +1,415 @@
+"""
+Pruebas de carga con recorridos de usuario sobre un servidor local.
+
+Cada usuario virtual es una corrutina con su propia conexión HTTP/1.1
+(keep-alive, cliente mínimo sobre asyncio, sin dependencias externas) y sus
+cookies de sesión. En bucle elige un recorrido según la mezcla configurada,
+lo ejecuta y espera un tiempo de lectura al azar. Cada petición se registra
+con el nombre de su paso (ej: 'manga_detail'), así que el reporte muestra
+rendimiento, percentiles de latencia y errores por paso.
+
+Los datos (mangas, capítulos, usuarios) se leen de la base de datos
+configurada, que debe ser la misma que usa el servidor: normalmente un
+catálogo generado con 'manage.py seed_scale', cuyos usuarios comparten la
+contraseña SYNTHETIC_PASSWORD. Los recorridos 'favorite', 'chat' y 'upload'
+escriben en la base de datos.
+"""
+import asyncio
+import io
+import json
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+from uuid import uuid4
+
+from django.urls import reverse
+
+# Recorridos disponibles y su peso por defecto en la mezcla
+DEFAULT_MIX = {'browse': 25, 'read': 40, 'search': 15, 'favorite': 8, 'chat': 10, 'upload': 2}
+
+
+class HttpError(Exception):
+    pass
+
+
+@dataclass
+class Response:
+    status: int
+    headers: dict
+    body: bytes
+
+
+class HttpClient:
+    """
+    Cliente HTTP/1.1 mínimo: una conexión keep-alive y un cookie jar.
+
+    Reabre la conexión cuando el servidor la cierra (gunicorn con workers
+    'sync' responde siempre con 'Connection: close').
+    """
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.cookies = {}
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+            self.reader = self.writer = None
+
+    async def request(self, method, path, body=b'', headers=None):
+        headers = dict(headers or {})
+        headers.setdefault('Host', f'{self.host}:{self.port}')
+        headers['Content-Length'] = str(len(body))
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        if method != 'GET' and 'csrftoken' in self.cookies:
+            headers.setdefault('X-CSRFToken', self.cookies['csrftoken'])
+        head = f'{method} {self.prefix}{path} HTTP/1.1\r\n' + ''.join(f'{k}: {v}\r\n' for k, v in headers.items())
+        payload = head.encode('latin-1') + b'\r\n' + body
+
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout)
+            try:
+                self.writer.write(payload)
+                await self.writer.drain()
+                return await asyncio.wait_for(self._read_response(method), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError) as exc:
+                # Conexión keep-alive cerrada por el servidor mientras esperaba: un reintento
+                await self.close()
+                if attempt:
+                    raise HttpError(f'conexión cerrada: {exc}') from exc
+
+    async def _read_response(self, method):
+        status_line = await self.reader.readuntil(b'\r\n')
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise HttpError(f'respuesta inválida: {status_line[:80]!r}')
+        headers = {}
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name, value = name.strip().lower(), value.strip()
+            if name == 'set-cookie':
+                cookie = SimpleCookie(value)
+                for key, morsel in cookie.items():
+                    self.cookies[key] = morsel.value
+            headers[name] = value
+
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            body = b''
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if size == 0:
+                    await self.reader.readuntil(b'\r\n')
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self.reader.read()
+            headers['connection'] = 'close'
+
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return Response(status, headers, body)
+
+
+def multipart(fields, files):
+    """Cuerpo multipart/form-data. 'files' es {campo: (nombre, bytes, content type)}."""
+    boundary = uuid4().hex
+    out = io.BytesIO()
+    for name, value in fields.items():
+        out.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, data, content_type) in files.items():
+        out.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                  f'Content-Type: {content_type}\r\n\r\n'.encode())
+        out.write(data + b'\r\n')
+    out.write(f'--{boundary}--\r\n'.encode())
+    return out.getvalue(), f'multipart/form-data; boundary={boundary}'
+
+
+@dataclass
+class Targets:
+    """Datos sobre los que se arman las URLs de los recorridos."""
+    mangas: list          # slugs
+    chapters: list        # (slug del manga, slug del capítulo)
+    readers: list         # usernames
+    uploaders: dict       # username -> slugs de sus mangas
+    words: list           # palabras de los títulos, para las búsquedas
+    genres: list          # códigos de GENEROS
+    page_image: bytes = b''
+
+
+class Stats:
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.journeys = defaultdict(int)
+
+    def record(self, step, elapsed, status=None, error=False):
+        self.latencies[step].append(elapsed)
+        if status is not None:
+            self.statuses[step][status] += 1
+        if error:
+            self.errors[step] += 1
+
+    def report(self, duration):
+        steps = []
+        for step in sorted(self.latencies):
+            values = sorted(self.latencies[step])
+            steps.append({
+                'step': step,
+                'requests': len(values),
+                'errors': self.errors[step],
+                'error_rate': round(self.errors[step] / len(values), 4),
+                'rps': round(len(values) / duration, 2),
+                'p50_ms': round(percentile(values, 50) * 1000, 1),
+                'p95_ms': round(percentile(values, 95) * 1000, 1),
+                'p99_ms': round(percentile(values, 99) * 1000, 1),
+                'max_ms': round(values[-1] * 1000, 1),
+                'status': {str(k): v for k, v in sorted(self.statuses[step].items())},
+            })
+        total = sum(s['requests'] for s in steps)
+        errors = sum(s['errors'] for s in steps)
+        every = sorted(v for values in self.latencies.values() for v in values)
+        return {
+            'duration_s': round(duration, 2),
+            'requests': total,
+            'rps': round(total / duration, 2) if duration else 0,
+            'errors': errors,
+            'error_rate': round(errors / total, 4) if total else 0,
+            'p50_ms': round(percentile(every, 50) * 1000, 1) if every else None,
+            'p95_ms': round(percentile(every, 95) * 1000, 1) if every else None,
+            'p99_ms': round(percentile(every, 99) * 1000, 1) if every else None,
+            'journeys': dict(sorted(self.journeys.items())),
+            'steps': steps,
+        }
+
+
+def percentile(ordered, pct):
+    """Percentil por rango más cercano de una lista ya ordenada."""
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class VirtualUser:
+
+    def __init__(self, number, base_url, targets, stats, rng, think_time, timeout, password):
+        self.number = number
+        self.client = HttpClient(base_url, timeout)
+        self.targets = targets
+        self.stats = stats
+        self.rng = rng
+        self.think_time = think_time
+        self.password = password
+        self.username = None
+
+    async def call(self, step, method, path, body=b'', headers=None, expect=(200,)):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, body, headers)
+        except (OSError, asyncio.TimeoutError, HttpError):
+            self.stats.record(step, time.perf_counter() - started, error=True)
+            await self.client.close()
+            return None
+        self.stats.record(step, time.perf_counter() - started, response.status,
+                          error=response.status not in expect)
+        return response
+
+    async def think(self):
+        if self.think_time:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think_time))
+
+    async def login(self, username):
+        """Inicia sesión con el formulario (obtiene antes la cookie CSRF)."""
+        if self.username == username:
+            return True
+        self.client.cookies.clear()
+        login_url = reverse('accounts:login')
+        await self.call('login_form', 'GET', login_url)
+        body = urlencode({
+            'username': username, 'password': self.password,
+            'csrfmiddlewaretoken': self.client.cookies.get('csrftoken', ''),
+        }).encode()
+        response = await self.call('login', 'POST', login_url, body,
+                                   {'Content-Type': 'application/x-www-form-urlencoded'}, expect=(302,))
+        self.username = username if response is not None and response.status == 302 else None
+        return self.username is not None
+
+    def ajax(self, content_type='application/x-www-form-urlencoded'):
+        return {'Content-Type': content_type, 'X-Requested-With': 'XMLHttpRequest'}
+
+    # --- Recorridos ---
+
+    async def browse(self):
+        """Portada, el listado (completo y filtrado por género) y la ficha de un manga."""
+        await self.call('home', 'GET', reverse('catalogo:home'))
+        await self.think()
+        url = reverse('catalogo:lista-mangas')
+        await self.call('lista_mangas', 'GET', url)
+        await self.think()
+        await self.call('lista_mangas', 'GET', f'{url}?{urlencode({"genero": self.rng.choice(self.targets.genres)})}')
+        await self.think()
+        await self.call('manga_detail', 'GET', reverse('catalogo:manga-detail', args=[self.rng.choice(self.targets.mangas)]))
+
+    async def read(self):
+        """Ficha de un manga y varios capítulos seguidos."""
+        manga_slug, chapter_slug = self.rng.choice(self.targets.chapters)
+        await self.call('manga_detail', 'GET', reverse('catalogo:manga-detail', args=[manga_slug]))
+        for _ in range(self.rng.randint(1, 3)):
+            await self.think()
+            await self.call('chapter_detail', 'GET', reverse('catalogo:chapter-detail', args=[manga_slug, chapter_slug]))
+            manga_slug, chapter_slug = self.rng.choice(self.targets.chapters)
+
+    async def search(self):
+        """Escribe un término letra por letra (sugerencias) y abre los resultados."""
+        term = self.rng.choice(self.targets.words)
+        suggest = reverse('catalogo:search-suggest')
+        for end in range(2, len(term) + 1):
+            await self.call('search_suggest', 'GET', f'{suggest}?{urlencode({"q": term[:end]})}')
+            await asyncio.sleep(self.rng.uniform(0.05, 0.2))  # Ritmo de tecleo
+        await self.call('search', 'GET', f'{reverse("catalogo:search")}?{urlencode({"q": term})}')
+
+    async def favorite(self):
+        """Marca y desmarca un manga como favorito."""
+        if not await self.login(self.rng.choice(self.targets.readers)):
+            return
+        slug = self.rng.choice(self.targets.mangas)
+        await self.call('manga_detail', 'GET', reverse('catalogo:manga-detail', args=[slug]))
+        for _ in range(2):
+            await self.think()
+            await self.call('add_favorite', 'POST', reverse('accounts:add_favorite', args=[slug]), headers=self.ajax())
+
+    async def chat(self):
+        """Bandeja de entrada, una conversación y un par de mensajes."""
+        if not await self.login(self.rng.choice(self.targets.readers)):
+            return
+        other = self.rng.choice([name for name in self.targets.readers if name != self.username] or [self.username])
+        await self.call('inbox', 'GET', reverse('accounts:inbox'))
+        await self.think()
+        chat_url = reverse('accounts:chat_detail', args=[other])
+        await self.call('chat_detail', 'GET', chat_url)
+        for _ in range(self.rng.randint(1, 3)):
+            await self.think()
+            body = urlencode({'content': f'Mensaje de carga {self.rng.randrange(10 ** 6)}'}).encode()
+            await self.call('chat_send', 'POST', chat_url, body, self.ajax())
+            await self.call('unread_count', 'GET', reverse('accounts:unread_count'))
+
+    async def upload(self):
+        """Crea un capítulo en un manga propio y le sube unas páginas."""
+        if not self.targets.uploaders:
+            return
+        username = self.rng.choice(sorted(self.targets.uploaders))
+        if not await self.login(username):
+            return
+        slug = self.rng.choice(self.targets.uploaders[username])
+        url = reverse('catalogo:chapter-create', args=[slug])
+        await self.call('chapter_create_form', 'GET', url)
+        number = self.rng.randrange(10 ** 6, 10 ** 9)
+        body = urlencode({'title': f'Carga {number}', 'chapter_number': number}).encode()
+        response = await self.call('chapter_create', 'POST', url, body, self.ajax())
+        if response is None or response.status != 200:
+            return
+        chapter_id = json.loads(response.body)['chapter_id']
+        for page in range(1, self.rng.randint(2, 5)):
+            body, content_type = multipart(
+                {'chapter_id': chapter_id},
+                {'file': (f'pagina-{page}.png', self.targets.page_image, 'image/png')},
+            )
+            await self.call('chapter_upload', 'POST', url, body, self.ajax(content_type))
+
+    async def run(self, mix, deadline):
+        names, weights = zip(*mix.items())
+        try:
+            while time.perf_counter() < deadline:
+                journey = self.rng.choices(names, weights)[0]
+                self.stats.journeys[journey] += 1
+                await getattr(self, journey)()
+                await self.think()
+        finally:
+            await self.client.close()
+
+
+def load_targets(limit=2000, seed=42):
+    """Mangas, capítulos y usuarios de la base de datos para armar los recorridos."""
+    from django.contrib.auth import get_user_model
+    from PIL import Image
+
+    from catalogo.models import Manga, Chapter, GENEROS
+
+    rng = random.Random(seed)
+    mangas = list(Manga.objects.order_by('id').values_list('slug', 'titulo', 'owner__username')[:limit])
+    chapters = list(Chapter.objects.order_by('id').values_list('manga__slug', 'slug')[:limit * 5])
+    readers = list(get_user_model().objects.filter(username__startswith='lector')
+                   .order_by('id').values_list('username', flat=True)[:limit])
+    uploaders = defaultdict(list)
+    for slug, _, owner in mangas:
+        if owner in readers:
+            uploaders[owner].append(slug)
+    words = sorted({word.lower() for _, titulo, _ in mangas for word in titulo.split() if len(word) >= 3})
+
+    image = Image.new('L', (800, 1150), 255)
+    for y in range(0, 1150, 50):
+        image.paste(rng.randint(0, 255), (0, y, 800, y + 25))
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return Targets(
+        mangas=[slug for slug, _, _ in mangas],
+        chapters=chapters,
+        readers=readers,
+        uploaders=dict(uploaders),
+        words=words or ['manga'],
+        genres=[codigo for codigo, _ in GENEROS],
+        page_image=buffer.getvalue(),
+    )
+
+
+async def run_load(base_url, targets, mix, concurrency=10, duration=60, ramp_up=0, think_time=1.0,
+                   timeout=30, seed=42, password=''):
+    """
+    Corre 'concurrency' usuarios virtuales durante 'duration' segundos.
+
+    Los usuarios arrancan repartidos a lo largo de 'ramp_up' segundos. Retorna
+    el reporte de Stats.report().
+    """
+    stats = Stats()
+    started = time.perf_counter()
+    deadline = started + ramp_up + duration
+
+    async def start(number):
+        if ramp_up:
+            await asyncio.sleep(ramp_up * number / concurrency)
+        user = VirtualUser(number, base_url, targets, stats, random.Random(seed + number),
+                           think_time, timeout, password)
+        await user.run(mix, deadline)
+
+    await asyncio.gather(*(start(n) for n in range(concurrency)))
+    report = stats.report(time.perf_counter() - started)
+    report['config'] = {
+        'url': base_url, 'concurrency': concurrency, 'duration_s': duration, 'ramp_up_s': ramp_up,
+        'think_time_s': think_time, 'mix': mix, 'seed': seed,
+    }
+    return report
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalogo.synthetic import SYNTHETIC_PASSWORD
+from monitoring.loadtest import DEFAULT_MIX, load_targets, run_load
+
+
+def parse_mix(value):
+    """'read=50,browse=30' -> {'read': 50, 'browse': 30}."""
+    mix = {}
+    for part in filter(None, (p.strip() for p in value.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX:
+            raise CommandError(f"Recorrido desconocido '{name}'. Disponibles: {', '.join(DEFAULT_MIX)}.")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f"Peso inválido en '{part}'.")
+    mix = {name: weight for name, weight in mix.items() if weight > 0}
+    if not mix:
+        raise CommandError("La mezcla no tiene ningún recorrido con peso positivo.")
+    return mix
+
+
+class Command(BaseCommand):
+    """
+    Prueba de carga con recorridos de lectores y creadores (monitoring/loadtest.py).
+
+    Corre contra un servidor ya levantado (runserver, gunicorn o uvicorn) que
+    use la misma base de datos, normalmente poblada con seed_scale. Reporta
+    rendimiento (peticiones/s), percentiles de latencia y tasa de errores en
+    total y por paso, y opcionalmente los guarda en JSON.
+
+    Recorridos: browse (portada y listado), read (ficha y capítulos), search
+    (sugerencias al teclear y resultados), favorite, chat y upload (crea un
+    capítulo y sube páginas). Los tres últimos escriben en la base de datos.
+
+    Ejemplo:
+        python manage.py loadtest --url http://127.0.0.1:8000 --concurrency 50 --duration 120 \\
+            --mix read=60,browse=20,search=15,chat=5 --output carga.json
+    """
+    help = "Prueba de carga con usuarios virtuales asyncio contra un servidor local."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="URL base del servidor.")
+        parser.add_argument('--concurrency', type=int, default=10, help="Usuarios virtuales simultáneos.")
+        parser.add_argument('--duration', type=float, default=60, help="Segundos de carga (tras el ramp-up).")
+        parser.add_argument('--ramp-up', type=float, default=0, help="Segundos para arrancar a todos los usuarios.")
+        parser.add_argument('--think-time', type=float, default=1.0,
+                            help="Pausa media entre pasos en segundos (0: sin pausas, máxima presión).")
+        parser.add_argument('--mix', default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+                            help="Pesos de los recorridos, ej: read=60,browse=20,search=20.")
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--password', default=SYNTHETIC_PASSWORD, help="Contraseña de los usuarios 'lector*'.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help="Archivo JSON donde guardar el reporte.")
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        targets = load_targets(seed=options['seed'])
+        if not targets.mangas or not targets.chapters:
+            raise CommandError("No hay mangas ni capítulos: puebla la base de datos (ej: manage.py seed_scale).")
+        if not targets.readers and {'favorite', 'chat', 'upload'} & set(mix):
+            raise CommandError("No hay usuarios 'lector*' para los recorridos con sesión.")
+
+        self.stderr.write(f"{options['concurrency']} usuarios durante {options['duration']:.0f} s contra {options['url']}...")
+        report = asyncio.run(run_load(
+            options['url'], targets, mix,
+            concurrency=options['concurrency'], duration=options['duration'], ramp_up=options['ramp_up'],
+            think_time=options['think_time'], timeout=options['timeout'], seed=options['seed'],
+            password=options['password'],
+        ))
+
+        self.stdout.write(f"{'paso':<20} {'peticiones':>10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+                          f"{'p99 ms':>8} {'max ms':>8} {'errores':>8}")
+        for step in report['steps']:
+            self.stdout.write(
+                f"{step['step']:<20} {step['requests']:>10} {step['rps']:>8} {step['p50_ms']:>8} "
+                f"{step['p95_ms']:>8} {step['p99_ms']:>8} {step['max_ms']:>8} {step['errors']:>8}"
+            )
+        summary = (f"{report['requests']} peticiones en {report['duration_s']} s: {report['rps']} req/s, "
+                   f"p50 {report['p50_ms']} ms, p95 {report['p95_ms']} ms, p99 {report['p99_ms']} ms, "
+                   f"{report['error_rate']:.2%} errores.")
+        self.stdout.write(self.style.SUCCESS(summary) if not report['errors'] else self.style.WARNING(summary))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as out:
+                json.dump(report, out, indent=2)
+            self.stderr.write(f"Reporte guardado en {options['output']}.")
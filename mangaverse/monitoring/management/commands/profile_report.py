@@ -0,0 +1,68 @@
+import io
+import pstats
+import statistics
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring.profiling import PROFILE_SUFFIX, parse_filename, profiles_dir
+
+
+class Command(BaseCommand):
+    """
+    Agrega los perfiles que guarda ProfilingMiddleware en un reporte.
+
+    Muestra, por vista, cuántas peticiones se perfilaron y su tiempo (p50 y
+    máximo), y luego las funciones más costosas sumando todos los perfiles
+    seleccionados.
+
+    Ejemplo:
+        python manage.py profile_report --view manga-detail --hours 24 --limit 30
+    """
+    help = "Reporte de funciones más costosas a partir de los perfiles guardados."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help="Carpeta de perfiles (por defecto, PROFILING_DIR).")
+        parser.add_argument('--view', help="Solo perfiles de vistas cuyo nombre contenga este texto.")
+        parser.add_argument('--hours', type=float, help="Solo perfiles de las últimas N horas.")
+        parser.add_argument('--sort', default='cumulative', choices=['cumulative', 'tottime', 'ncalls'],
+                            help="Orden de las funciones.")
+        parser.add_argument('--limit', type=int, default=25, help="Funciones a mostrar.")
+
+    def handle(self, *args, **options):
+        directory = Path(options['dir']) if options['dir'] else profiles_dir()
+        if not directory.is_dir():
+            raise CommandError(f"No existe la carpeta de perfiles {directory}.")
+        since = datetime.now() - timedelta(hours=options['hours']) if options['hours'] else None
+
+        selected, timings = [], defaultdict(list)
+        for path in sorted(directory.glob(f'*{PROFILE_SUFFIX}')):
+            parsed = parse_filename(path.name)
+            if parsed is None:
+                continue
+            stamp, view, elapsed_ms = parsed
+            if since and stamp < since:
+                continue
+            if options['view'] and options['view'].replace(':', '.') not in view:
+                continue
+            selected.append(path)
+            timings[view].append(elapsed_ms)
+
+        if not selected:
+            self.stdout.write("No hay perfiles que coincidan.")
+            return
+
+        self.stdout.write(f"{len(selected)} perfiles en {directory}\n")
+        self.stdout.write(f"{'vista':<40} {'n':>5} {'p50 ms':>9} {'max ms':>9}")
+        for view, values in sorted(timings.items(), key=lambda item: -sum(item[1])):
+            self.stdout.write(f"{view:<40} {len(values):>5} {statistics.median(values):>9.0f} {max(values):>9}")
+
+        out = io.StringIO()
+        stats = pstats.Stats(str(selected[0]), stream=out)
+        for path in selected[1:]:
+            stats.add(str(path))
+        stats.files = []  # No listar cada archivo en el encabezado del reporte
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(options['limit'])
+        self.stdout.write(out.getvalue())
@@ -0,0 +1,221 @@
+"""
+Registro de métricas en proceso, expuesto en formato de texto de Prometheus.
+
+Cada proceso acumula contadores e histogramas en memoria (un lock y unas
+pocas operaciones por observación). Con varios workers (gunicorn) se define
+METRICS_DIR: cada proceso vuelca sus totales a '<METRICS_DIR>/<pid>-<inicio>.json'
+como máximo cada METRICS_FLUSH_INTERVAL segundos, y el endpoint /metrics/
+suma los archivos de todos los procesos. Los archivos de workers que ya
+terminaron se conservan para que los contadores no retrocedan; la carpeta
+debe vaciarse al desplegar (antes de arrancar gunicorn).
+
+Sin METRICS_DIR el endpoint muestra solo los totales del proceso que atiende.
+
+Métricas definidas aquí (las usan monitoring/middleware.py,
+monitoring/cache.py y catalogo/utils.py):
+
+- mangaverse_http_requests_total{view, method, status}
+- mangaverse_http_request_duration_seconds{view} (histograma)
+- mangaverse_db_queries_per_request{view} (histograma)
+- mangaverse_cache_requests_total{prefix, result}
+- mangaverse_pages_ingested_total{source}, mangaverse_ingest_bytes_total{source}
+- mangaverse_ingest_duration_seconds (histograma)
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+INGEST_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labels):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.samples = {}
+
+    def to_dict(self):
+        return {
+            'kind': self.kind, 'help': self.documentation, 'labels': self.labels,
+            'samples': [[list(key), value] for key, value in self.samples.items()],
+        }
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        with self.registry.lock:
+            self.samples[label_values] = self.samples.get(label_values, 0) + amount
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labels, buckets):
+        super().__init__(registry, name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self.registry.lock:
+            sample = self.samples.get(label_values)
+            if sample is None:
+                # Conteo por bucket (no acumulado; el último es +Inf), suma
+                sample = self.samples[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            sample[0][index] += 1
+            sample[1] += value
+
+    def to_dict(self):
+        data = super().to_dict()
+        data['buckets'] = self.buckets
+        return data
+
+
+class Registry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.started = int(time.time())
+        self.last_flush = 0.0
+
+    def counter(self, name, documentation, labels=()):
+        return self.metrics.setdefault(name, Counter(self, name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self.metrics.setdefault(name, Histogram(self, name, documentation, labels, buckets))
+
+    def snapshot(self):
+        with self.lock:
+            return {name: metric.to_dict() for name, metric in self.metrics.items()}
+
+    # --- Varios procesos ---
+
+    def directory(self):
+        directory = getattr(settings, 'METRICS_DIR', None)
+        return Path(directory) if directory else None
+
+    def maybe_flush(self):
+        """Vuelca los totales del proceso si pasó METRICS_FLUSH_INTERVAL desde la última vez."""
+        if self.directory() is None:
+            return
+        if time.monotonic() - self.last_flush >= getattr(settings, 'METRICS_FLUSH_INTERVAL', 10):
+            self.flush()
+
+    def flush(self):
+        directory = self.directory()
+        if directory is None:
+            return
+        self.last_flush = time.monotonic()
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as out:
+                json.dump(self.snapshot(), out)
+            os.replace(tmp, directory / f'{os.getpid()}-{self.started}.json')
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def collect(self):
+        """Totales de todos los procesos (o solo de este, sin METRICS_DIR)."""
+        directory = self.directory()
+        if directory is None:
+            return self.snapshot()
+        self.flush()
+        merged = {}
+        for path in directory.glob('*.json'):
+            try:
+                snapshot = json.loads(path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                continue  # Archivo a medio reemplazar o dañado: se omite en esta lectura
+            merge(merged, snapshot)
+        return merged
+
+
+def merge(target, snapshot):
+    """Suma 'snapshot' sobre 'target' (ambos con el formato de Registry.snapshot)."""
+    for name, data in snapshot.items():
+        current = target.setdefault(name, dict(data, samples=[]))
+        index = {tuple(key): i for i, (key, _) in enumerate(current['samples'])}
+        for key, value in data['samples']:
+            i = index.get(tuple(key))
+            if i is None:
+                current['samples'].append([key, json.loads(json.dumps(value))])
+                index[tuple(key)] = len(current['samples']) - 1
+            elif data['kind'] == 'histogram':
+                counts, total = current['samples'][i][1]
+                current['samples'][i][1] = [[a + b for a, b in zip(counts, value[0])], total + value[1]]
+            else:
+                current['samples'][i][1] += value
+    return target
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), chr(92) + "n")}"'
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshot):
+    """Texto en formato de exposición de Prometheus (versión 0.0.4)."""
+    lines = []
+    for name in sorted(snapshot):
+        data = snapshot[name]
+        lines.append(f"# HELP {name} {data['help']}")
+        lines.append(f"# TYPE {name} {data['kind']}")
+        for key, value in sorted(data['samples'], key=lambda sample: sample[0]):
+            if data['kind'] == 'histogram':
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(list(data['buckets']) + ['+Inf'], counts):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else _number(float(bound))
+                    lines.append(f"{name}_bucket{_labels(data['labels'], key, [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{_labels(data['labels'], key)} {_number(float(total))}")
+                lines.append(f"{name}_count{_labels(data['labels'], key)} {cumulative}")
+            else:
+                lines.append(f"{name}{_labels(data['labels'], key)} {_number(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    'mangaverse_http_requests_total', "Peticiones HTTP atendidas.", ('view', 'method', 'status'))
+http_latency = registry.histogram(
+    'mangaverse_http_request_duration_seconds', "Duración de las peticiones por vista.", ('view',))
+db_queries = registry.histogram(
+    'mangaverse_db_queries_per_request', "Consultas SQL por petición.", ('view',), buckets=QUERY_BUCKETS)
+cache_requests = registry.counter(
+    'mangaverse_cache_requests_total', "Lecturas de caché por prefijo de clave y resultado (hit/miss).",
+    ('prefix', 'result'))
+pages_ingested = registry.counter(
+    'mangaverse_pages_ingested_total', "Páginas guardadas por process_chapter_files.", ('source',))
+ingest_bytes = registry.counter(
+    'mangaverse_ingest_bytes_total', "Bytes de páginas guardadas por process_chapter_files.", ('source',))
+ingest_duration = registry.histogram(
+    'mangaverse_ingest_duration_seconds', "Duración de cada llamada a process_chapter_files.",
+    buckets=INGEST_BUCKETS)
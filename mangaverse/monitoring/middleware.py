@@ -0,0 +1,114 @@
+"""
+Middleware de presupuesto de consultas por petición.
+
+Se activa con QUERY_BUDGET_ENABLED (en settings, con QUERY_BUDGET=1). Para cada
+petición registra las consultas (monitoring/queries.py) y:
+
+- Agrega los encabezados X-DB-Queries, X-DB-Time-Ms y X-DB-Repeated (cantidad
+  de formas de consulta repetidas al menos N_PLUS_ONE_THRESHOLD veces).
+- Escribe en el log 'monitoring.queries' una advertencia por cada N+1
+  probable y cuando se excede el presupuesto.
+- Si QUERY_BUDGET_ENFORCE es True (desarrollo y tests, nunca en
+  producción) lanza QueryBudgetExceeded cuando una vista supera su
+  presupuesto, para que el exceso se vea en desarrollo y en los tests.
+
+Los presupuestos se configuran por nombre de URL (con namespace):
+
+    QUERY_BUDGETS = {'catalogo:manga-detail': 12, 'accounts:inbox': 8}
+    QUERY_BUDGET_DEFAULT = 30   # None: sin límite para las vistas no listadas
+
+MetricsMiddleware (METRICS_ENABLED) alimenta el registro de monitoring/metrics.py
+en todas las peticiones: cantidad, latencia y consultas por vista.
+"""
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+from .queries import QueryCounter, QueryRecorder
+
+logger = logging.getLogger('monitoring.queries')
+
+# Otros métodos se agrupan como 'OTHER' (el cliente decide el método)
+HTTP_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryBudgetMiddleware:
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.budgets = getattr(settings, 'QUERY_BUDGETS', {})
+        self.default_budget = getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+        self.threshold = getattr(settings, 'N_PLUS_ONE_THRESHOLD', 5)
+        self.enforce = getattr(settings, 'QUERY_BUDGET_ENFORCE', False)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        # En las respuestas en streaming las consultas del generador ocurren
+        # después: solo se cuenta lo que hizo la vista
+        self.report(request, response, recorder)
+        return response
+
+    def report(self, request, response, recorder):
+        response['X-DB-Queries'] = str(recorder.count)
+        response['X-DB-Time-Ms'] = f'{recorder.duration * 1000:.1f}'
+        repeated = recorder.repeated(self.threshold)
+        response['X-DB-Repeated'] = str(len(repeated))
+
+        view = request.resolver_match.view_name if request.resolver_match else request.path
+        for shape, times in repeated:
+            logger.warning("Posible N+1 en %s: %s consultas con la forma %s", view, times, shape[:300])
+
+        budget = self.budgets.get(view, self.default_budget)
+        if budget is None or recorder.count <= budget:
+            return
+        message = f"{view} ejecutó {recorder.count} consultas (presupuesto: {budget})"
+        logger.warning(message)
+        if self.enforce and not getattr(response, 'streaming', False):
+            raise QueryBudgetExceeded(message)
+
+
+class MetricsMiddleware:
+    """
+    Registra la latencia, el estado y las consultas de cada petición.
+
+    Va primero en MIDDLEWARE para que la latencia incluya al resto de los
+    middlewares. Las vistas se etiquetan por nombre de URL (nunca por la ruta,
+    que tiene ids y haría crecer las series sin límite).
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        view = request.resolver_match.view_name if request.resolver_match else '<sin ruta>'
+        method = request.method if request.method in HTTP_METHODS else 'OTHER'
+        metrics.http_requests.inc(view, method, str(response.status_code))
+        metrics.http_latency.observe(elapsed, view)
+        metrics.db_queries.observe(counter.count, view)
+        metrics.registry.maybe_flush()
+        return response
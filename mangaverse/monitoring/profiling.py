@@ -0,0 +1,105 @@
+"""
+Perfilado de peticiones bajo demanda (cProfile), pensado para producción.
+
+ProfilingMiddleware envuelve la vista y el render de la plantilla con
+cProfile cuando:
+
+- un usuario staff agrega '?_profile=1' a la URL (o el encabezado
+  'X-Profile: 1'), o
+- la petición cae en la muestra aleatoria PROFILING_SAMPLE_RATE (0.0 a 1.0).
+
+Cada perfil se guarda en PROFILING_DIR como
+'<fecha>_<vista>_<milisegundos>ms_<pid>.prof' (formato pstats); el comando
+profile_report los agrega en un reporte de funciones más costosas. Solo se
+conservan los PROFILING_MAX_FILES más recientes.
+
+Fuera de las peticiones perfiladas el costo es una comparación y un número
+aleatorio. cProfile no admite dos perfiles a la vez en el mismo proceso: si
+ya hay uno activo (otro hilo), la petición sigue sin perfilar.
+"""
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+PROFILE_SUFFIX = '.prof'
+_FILENAME = re.compile(r'^(?P<stamp>\d{8}T\d{6})_(?P<view>.+)_(?P<ms>\d+)ms_(?P<pid>\d+)\.prof$')
+
+_lock = threading.Lock()
+
+
+def profiles_dir():
+    return Path(getattr(settings, 'PROFILING_DIR', Path(settings.BASE_DIR) / 'profiles'))
+
+
+def parse_filename(name):
+    """Retorna (fecha, vista, milisegundos) de un archivo de perfil, o None."""
+    match = _FILENAME.match(name)
+    if not match:
+        return None
+    return datetime.strptime(match['stamp'], '%Y%m%dT%H%M%S'), match['view'], int(match['ms'])
+
+
+class ProfilingMiddleware:
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        self.max_files = getattr(settings, 'PROFILING_MAX_FILES', 500)
+        self.directory = profiles_dir()
+
+    def __call__(self, request):
+        if not self.should_profile(request) or not _lock.acquire(blocking=False):
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        try:
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        finally:
+            _lock.release()
+        filename = self.save(request, profiler, elapsed_ms)
+        if getattr(request, 'user', None) is not None and request.user.is_staff:
+            response['X-Profile-File'] = filename
+        return response
+
+    def should_profile(self, request):
+        requested = request.GET.get('_profile') == '1' or request.headers.get('X-Profile') == '1'
+        if requested and getattr(request, 'user', None) is not None and request.user.is_staff:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def save(self, request, profiler, elapsed_ms):
+        """Escribe el perfil (de forma atómica) y recorta los más antiguos. Retorna el nombre del archivo."""
+        view = request.resolver_match.view_name if request.resolver_match else 'sin-vista'
+        view = re.sub(r'[^\w.-]+', '.', view.replace(':', '.'))
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+        filename = f'{stamp}_{view}_{round(elapsed_ms)}ms_{os.getpid()}{PROFILE_SUFFIX}'
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / f'.{filename}.tmp'
+        profiler.dump_stats(tmp)
+        os.replace(tmp, self.directory / filename)
+        self.prune()
+        return filename
+
+    def prune(self):
+        files = sorted(self.directory.glob(f'*{PROFILE_SUFFIX}'), key=lambda path: path.name)
+        for path in files[:max(len(files) - self.max_files, 0)]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,76 @@
+"""
+Registro de las consultas SQL que ejecuta una petición.
+
+QueryRecorder se instala con connection.execute_wrapper() (funciona con
+DEBUG=False, a diferencia de connection.queries) y acumula por petición:
+cantidad de consultas, tiempo total en la base de datos y cuántas veces se
+repite cada "forma" de consulta (la SQL sin valores). Muchas consultas con la
+misma forma son la huella típica de un N+1: un acceso a una relación dentro
+de un bucle del template.
+"""
+import re
+import time
+from collections import Counter
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """
+    Forma de una consulta: la SQL sin literales y con las listas IN colapsadas.
+
+    Dos consultas que solo difieren en sus parámetros (ej: el id del bucle)
+    tienen la misma forma.
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+class QueryCounter:
+    """
+    Envoltorio para connection.execute_wrapper() que solo cuenta y cronometra consultas.
+
+    Es lo bastante barato para usarse en todas las peticiones (métricas).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class QueryRecorder(QueryCounter):
+    """
+    Como QueryCounter, pero además cuenta las repeticiones de cada forma de consulta.
+
+    Uso:
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            ...
+        recorder.count, recorder.duration, recorder.repeated(5)
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.shapes[fingerprint(sql)] += 1
+        return super().__call__(execute, sql, params, many, context)
+
+    def repeated(self, threshold):
+        """Formas que se ejecutaron al menos 'threshold' veces (probables N+1), de más a menos."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
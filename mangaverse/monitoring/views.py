@@ -0,0 +1,27 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.cache import never_cache
+
+from . import metrics
+
+
+def _authorized(request):
+    """Permite el acceso con 'Authorization: Bearer <METRICS_TOKEN>' o a un usuario staff."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    header = request.headers.get('Authorization', '')
+    if token and header.startswith('Bearer ') and hmac.compare_digest(header[7:], token):
+        return True
+    return request.user.is_authenticated and request.user.is_staff
+
+
+@never_cache
+def metrics_view(request):
+    """Métricas de la aplicación en el formato de texto de Prometheus."""
+    if not _authorized(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics.render(metrics.registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )